@@ -13,11 +13,14 @@ colorama.init()
 
 LOGGING_LEVEL = logging.INFO
 ROOT_LOGGER = None
+# Set OVARENA_AUTO_INSTALL=1 to install requirements on import (slow, off by default)
+AUTO_INSTALL = os.environ.get("OVARENA_AUTO_INSTALL", "0") == "1"
 
 
 def __setup():
-    # Install requirements silently
-    os.system(f"pip install -r {__workdir__}/requirements.txt --quiet --no-cache-dir")
+    # Install requirements silently, only if asked to
+    if AUTO_INSTALL:
+        os.system(f"pip install -r {__workdir__}/requirements.txt --quiet --no-cache-dir")
 
     # Set logging level
     global LOGGING_LEVEL
@@ -1,21 +1,36 @@
 from src.server.arena_agent import SyncAgent
 from src.server.arena_manager import ArenaManager
+from src.server.metrics import REGISTRY
+from src.server.state_machine import StateProfiler
 import dotenv
 import os
 
 if __name__ == '__main__':
     dotenv.load_dotenv()
+    if os.getenv("METRICS_PORT"):
+        REGISTRY.serve(int(os.getenv("METRICS_PORT")))
+    profiler = StateProfiler(sample_interval_ms=1).start() if os.getenv("PROFILE_FILE") else None
 
-    with SyncAgent(
-        os.getenv("USER"),
-        os.getenv("ARENA"),
-        os.getenv("LOGIN"),
-        os.getenv("PASSWORD"),
-        os.getenv("SERVER"),
-        int(os.getenv("PORT"))
-    ) as agent:
-        with ArenaManager(agent) as arena_manager:
-            agent.set_context(arena_manager)
-            arena_manager.game_loop()
-            print("End of game loop")
-            agent.disconnect()
+    try:
+        with SyncAgent(
+            os.getenv("USER"),
+            os.getenv("ARENA"),
+            os.getenv("LOGIN"),
+            os.getenv("PASSWORD"),
+            os.getenv("SERVER"),
+            int(os.getenv("PORT"))
+        ) as agent:
+            with ArenaManager(agent) as arena_manager:
+                agent.set_context(arena_manager)
+                arena_manager.set_profiler(profiler)
+                if os.getenv("HOT_RELOAD"):
+                    arena_manager.enable_hot_reload(float(os.getenv("HOT_RELOAD")))
+                arena_manager.game_loop()
+                print("End of game loop")
+                agent.disconnect()
+    finally:
+        if os.getenv("METRICS_FILE"):
+            REGISTRY.dump(os.getenv("METRICS_FILE"))
+        if profiler is not None:
+            profiler.stop()
+            profiler.dump_folded(os.getenv("PROFILE_FILE"))
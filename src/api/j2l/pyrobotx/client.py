@@ -22,12 +22,12 @@ __workdir__ = os.path.dirname(os.path.abspath(__file__))
 __libdir__ = os.path.dirname(__workdir__)
 sys.path.append(__libdir__)
 
-os.system("export LANG=en_US.UTF-8")
-os.system("pip install paho-mqtt pillow requests")
+# Set OVARENA_AUTO_INSTALL=1 to install dependencies on import (slow, off by default)
+if (os.environ.get("OVARENA_AUTO_INSTALL", "0") == "1"):
+    os.system("pip install paho-mqtt pillow requests")
 
 import random
 import copy
-import requests
 import uuid
 import time
 import traceback
@@ -35,14 +35,22 @@ import threading
 import io
 import json
 from paho.mqtt.client import Client
-from datetime import datetime
-from PIL import Image
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 from pyrobotx.robot import IRobot, RobotEvent
+from pyrobotx.codec import ICodec, getCodec
+from pyrobotx.router import TopicHandler, TopicRouter
+from pyrobotx.pool import BrokerConnectionPool, SharedClient, newPahoClient
 import pymusx.converter as msx
 import pychromatx.converter as cmx
 import pyanalytx.logger as anx
+import pyrobotx.clock as clk
+from pyrobotx.scheduler import AdaptiveScheduler
+from pyrobotx.session import SessionRecorder
+from pyrobotx.events import Dispatch, EventBus, EventListener
+
+if TYPE_CHECKING:  # PIL is only loaded once an image is received
+    from PIL import Image
 
 
 class DefaultClientSettings:
@@ -51,35 +59,17 @@ class DefaultClientSettings:
     isConnectedTimeout = 10000  # In msecs
     dtTx = 100  # In msecs
     dtPing = 5000  # In msecs
-    dtSleepUpdate = 300  # In msecs
+    dtSleepUpdate = 300  # In msecs, if not adaptiveUpdate
+    adaptiveUpdate = True  # Update as soon as a state is received, and back off while idle
+    dtUpdateMin = 20  # In msecs, min period between 2 adaptive updates, to not flood the broker
+    dtUpdateMax = 1000  # In msecs, max period between 2 adaptive updates while idle
+    updateBackoff = 2.0  # Growth of the adaptive update period while idle
     batteryMax = 3900  # In mV
     batteryMin = 3500  # In mV
 
 
-class EventObservable:
-    def __init__(self, events: list[str]):
-        self.__onEventCallbacks: dict[str, Callable[[Any, str, Any], None] or None] = {}
-        for eventName in events:
-            self.__onEventCallbacks[eventName] = None
-
-    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> None:
-        if (eventName not in self.__onEventCallbacks):
-            anx.warning("⚠️ Cannot add event listener for event " + eventName)
-            anx.warning("⚠️ Can only add event on " + str(self.__onEventCallbacks.keys()))
-            return
-        self.__onEventCallbacks[eventName] = callback
-
-    def notify(self, eventName: str, value: Any or None = None) -> None:
-        if (eventName not in self.__onEventCallbacks):
-            anx.warning("⚠️ Cannot notify event " + eventName)
-            anx.warning("⚠️ Can only notify event on " + str(self.__onEventCallbacks.keys()))
-            return
-        if (self.__onEventCallbacks[eventName] != None):
-            try:
-                self.__onEventCallbacks[eventName](self, eventName, value)
-            except Exception as e:
-                anx.debug("⚠️ Exception during " + eventName + " event notification : " + str(e))
-                anx.debug(traceback.format_exc())
+class EventObservable(EventBus):
+    """Notifies several listeners per event, see pyrobotx.events.EventBus"""
 
 
 class RobotEventManager(EventObservable):
@@ -95,7 +85,7 @@ class RobotEventManager(EventObservable):
             anx.error("⚠️ Exception during _onUpdated call : " + str(e))
             anx.error(traceback.format_exc())
 
-    def onImageReceived(self, img: Image):
+    def onImageReceived(self, img: 'Image.Image'):
         try:
             self.__robot._onImageReceived(img)
             self.notify(RobotEvent.imageReceived, img)
@@ -484,7 +474,7 @@ class RobotPrinter:
 
 class CameraReader:
     def __init__(self, imgOutputPath):
-        self.__camImg: Image = None
+        self.__camImg: 'Image.Image' = None
         self.__prevImgRx: int = 0
         self.__camImgOutputPath = imgOutputPath
         self.__bufImgComplete = []
@@ -493,12 +483,12 @@ class CameraReader:
         self.__bufImgOffset = 0
         self.__bufImgExpectedLength = 0
         self.__dealImgAsChunk = False
-        self.__startTime = datetime.now()
+        self.__startTime = clk.clock.now()
 
     def setOuputPath(self, path=str or None):
         self.__camImgOutputPath = path
 
-    def getImage(self) -> Image:
+    def getImage(self) -> 'Image.Image':
         return self.__camImg
 
     def onFullImageReceived(self, data: bytes):
@@ -539,6 +529,7 @@ class CameraReader:
         """Swap buf img and write into file, then return the number of bytes read"""
         lenImage = len(self.__bufImgComplete)
         try:
+            from PIL import Image  # Lazy loaded, only needed once an image is received
             with self.__bufImgMutex:
                 if (len(self.__bufImgComplete) > 0):
                     if (self.__dealImgAsChunk):
@@ -546,7 +537,7 @@ class CameraReader:
                     else:
                         self.__camImg = Image.open(io.BytesIO(self.__bufImgComplete))
                     self.__bufImgComplete = []
-                    self.__prevImgRx = (datetime.now() - self.__startTime).total_seconds() * 1000
+                    self.__prevImgRx = (clk.clock.now() - self.__startTime) / clk.NS_PER_MS
                     if (self.__camImgOutputPath != None):
                         try:
                             self.__camImg.save(self.__camImgOutputPath)
@@ -628,16 +619,23 @@ class OvaClientHttp(IRobot):
         self.__events: RobotEventManager = RobotEventManager(self)
         self.__cameraReader = CameraReader(imgOutputPath)
         self.__printer = RobotPrinter(self, welcomePrint)
-        self.__prevTx: int = datetime.fromtimestamp(0)
+        self.__prevTx: int = clk.NEVER
         self.__dtTxToWait: int = DefaultClientSettings.dtTx
-        self.__prevRxFromRobot: int = datetime.fromtimestamp(0)
+        self.__prevRxFromRobot: int = clk.NEVER
         self.__robotSensorsStateRoute = routeSensors
         self.__robotCamRoute = routeCamera
         self.__robotControlRoute = routeActuators
         self.__wasConnectedToRobot = False
 
-    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> None:
-        self.__events.addEventListener(eventName, callback)
+    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int = 0,
+                         dispatch: str = Dispatch.sync, loop=None) -> EventListener or None:
+        return self.__events.addEventListener(eventName, callback, priority, dispatch, loop)
+
+    def removeEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None] or EventListener) -> bool:
+        return self.__events.removeEventListener(eventName, callback)
+
+    def getListenerStats(self, eventName: str or None = None) -> list[dict[str, Any]]:
+        return self.__events.getListenerStats(eventName)
 
     def connect(self) -> bool:
         anx.warning("Connect not implemented for ova http client")
@@ -651,18 +649,17 @@ class OvaClientHttp(IRobot):
         return False
 
     def isConnectedToRobot(self) -> bool:
-        dtRx = (datetime.now() - self.__prevRxFromRobot).total_seconds() * 1000
-        return dtRx < DefaultClientSettings.isConnectedTimeout
+        dtRx = clk.clock.now() - self.__prevRxFromRobot
+        return dtRx < DefaultClientSettings.isConnectedTimeout * clk.NS_PER_MS
 
     def update(self, enableSleep=True):
         self.__events.onUpdated()
-        now = datetime.now()
+        now = clk.clock.tick()
         self._onUpdateSensors(self.__url + self.__robotSensorsStateRoute, now)
         if (self.__cameraEnabled):
             self._onUpdateCamera(self.__url + self.__robotCamRoute, now)
         # Tx requests
-        dtTx = (now - self.__prevTx).total_seconds() * 1000
-        if (dtTx > self.__dtTxToWait):
+        if (now - self.__prevTx > self.__dtTxToWait * clk.NS_PER_MS):
             self.__prevTx = now
             self._onUpdateRequests(self.__url + self.__robotControlRoute, self.__robotActuatorsRequest, now)
         if (enableSleep):
@@ -758,8 +755,9 @@ class OvaClientHttp(IRobot):
 
     def _onUpdateSensors(self, url: str, now=None):
         if (now == None):
-            now = datetime.now()
+            now = clk.clock.now()
         try:
+            import requests  # Lazy loaded, only needed by http clients
             r = requests.get(url)
             if (r.status_code != 200):
                 anx.warning("Return " + str(r.status_code) + " during tx " + url)
@@ -787,8 +785,9 @@ class OvaClientHttp(IRobot):
 
     def _onUpdateCamera(self, url: str, now=None):
         if (now == None):
-            now = datetime.now()
+            now = clk.clock.now()
         try:
+            import requests  # Lazy loaded, only needed by http clients
             r = requests.get(url)
             if (r.status_code != 200):
                 anx.warning("Return " + str(r.status_code) + " during tx " + url)
@@ -807,14 +806,15 @@ class OvaClientHttp(IRobot):
 
     def _onUpdateRequests(self, url: str, request: RobotRequestBuilder, now=None):
         if (now == None):
-            now = datetime.now()
+            now = clk.clock.now()
         try:
             content = request.toDict()
             if (len(content) > 0):
                 anx.debug("📡 Tx request to " + url + " : " + str(content))
-                beforePost = datetime.now()
+                beforePost = clk.clock.now()
+                import requests  # Lazy loaded, only needed by http clients
                 r = requests.post(url, json=content)
-                dtPost = (datetime.now() - beforePost).total_seconds() * 1000
+                dtPost = clk.clock.elapsedMs(beforePost, clk.clock.now())
                 if (r.status_code != 200):
                     anx.warning("Return " + str(r.status_code) + " during tx " + url + " after " + str(dtPost) + "ms")
                 else:
@@ -914,11 +914,12 @@ class OvaClientHttpV1(OvaClientHttp):
 
     def _onUpdateRequests(self, url: str, request: RobotRequestBuilder, now=None):
         if (now == None):
-            now = datetime.now()
+            now = clk.clock.now()
         try:
             if (len(request.toDict()) > 0):
                 url = request.toURI(url)
                 anx.debug("📡 Tx request " + url)
+                import requests  # Lazy loaded, only needed by http clients
                 r = requests.get(url)
                 if (r.status_code != 200):
                     anx.warning("Return " + str(r.status_code) + " during tx " + url)
@@ -963,7 +964,9 @@ class OvaClientMqtt(IRobot):
     def __init__(self, robotId: str or None = None, arena: str or None = None, username: str or None = None,
                  password: str or None = None, server: str or None = None, port: int = 1883,
                  imgOutputPath: str or None = "img.jpeg", autoconnect: bool = True, useProxy: bool = True,
-                 verbosity: int = 3, clientId: str or None = None, welcomePrint=True):
+                 verbosity: int = 3, clientId: str or None = None, welcomePrint=True,
+                 codec: str or ICodec or None = None, pool: BrokerConnectionPool or None = None,
+                 record: str or None = None):
         """
         Build a mqtt client to communicate with an ova robot through a mqtt broker
 
@@ -995,9 +998,13 @@ class OvaClientMqtt(IRobot):
         * `verbosity` - The level of logs as an int. See Verbosity class for more info.
         * `imgOutputPath` - The path (either absolute or relative) where to save camera image on each update call
         * `welcomePrint` - True to print a nice message in the begining to welcome and guide you
+        * `codec` - The payload serialization: "json" (default, using orjson if installed), or "msgpack"/"cbor" if the broker peers support it
+        * `pool` - A BrokerConnectionPool to share one broker connection between many clients, instead of opening one per client
+        * `record` - The path of a session file where to record every message received, to replay it offline (see pyrobotx.session)
         """
         anx.setVerbosity(verbosity)
         self.__printer = RobotPrinter(self, welcomePrint)
+        self.__codec: ICodec = getCodec(codec)
         if (arena == None or username == None or password == None or server == None):
             print("Enter your credentials to connect to your robot")
         while (robotId == None or len(robotId) > 32 or len(robotId) == 0):
@@ -1011,7 +1018,7 @@ class OvaClientMqtt(IRobot):
             username = input("🧑 username: ")
         if (password == None):
             password = input("🔑 password: ")
-        self.__startTime = datetime.now()
+        self.__startTime = clk.clock.now()
 
         userLogin = ""
         try:
@@ -1050,11 +1057,16 @@ class OvaClientMqtt(IRobot):
         self.__bufArenaState = []
         self.__arenaState = {}
         self.__rxFromArena: bool = False
-        self.__prevRxFromRobot: int = datetime.fromtimestamp(0)
-        self.__prevRxFromArena: int = datetime.fromtimestamp(0)
-        self.__prevTx: int = datetime.fromtimestamp(0)
-        self.__prevPing: int = datetime.fromtimestamp(0)
+        self.__prevRxFromRobot: int = clk.NEVER
+        self.__prevRxFromArena: int = clk.NEVER
+        self.__prevTx: int = clk.NEVER
+        self.__prevPing: int = clk.NEVER
         self.__dtTxToWait: int = DefaultClientSettings.dtTx
+        self.__scheduler: AdaptiveScheduler or None = None
+        if (DefaultClientSettings.adaptiveUpdate):
+            # Only the update period adapts, requests are still sent at most every dtTx
+            self.__scheduler = AdaptiveScheduler(DefaultClientSettings.dtUpdateMin, DefaultClientSettings.dtUpdateMax,
+                                                 DefaultClientSettings.updateBackoff)
         self.__useProxy = useProxy
         self.__isConnectedToBroker: bool = False
         self.__serverAddress: str = server
@@ -1071,17 +1083,82 @@ class OvaClientMqtt(IRobot):
         self.__topicPlayerRequest: str = ""
         self.__topicRobotRequest: str = ""
         self.__topicsToSubcribe = []
-        self.__client: Client or None = None
+        self.__router: TopicRouter = TopicRouter()
+        self.__robotTopicHandlers: list[tuple[str, TopicHandler]] = []
+        self.__client: Client or SharedClient or None = None
+        self.__pool: BrokerConnectionPool or None = pool
+        self.__recorder: SessionRecorder or None = None
+        self.__trafficObserver = None
         self.__useClientThreadLoop: bool = True
         self.__clientThreadLoop: threading.Thread or None = None
+        if (record != None):
+            self.startRecording(record)
         self.__changeRobot(robotId, autoconnect)
 
-    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> None:
-        self.__events.addEventListener(eventName, callback)
+    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int = 0,
+                         dispatch: str = Dispatch.sync, loop=None) -> EventListener or None:
+        return self.__events.addEventListener(eventName, callback, priority, dispatch, loop)
+
+    def removeEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None] or EventListener) -> bool:
+        return self.__events.removeEventListener(eventName, callback)
+
+    def getListenerStats(self, eventName: str or None = None) -> list[dict[str, Any]]:
+        return self.__events.getListenerStats(eventName)
+
+    def addTopicHandler(self, topic: str, handler: TopicHandler) -> None:
+        """
+        Calls handler(topic, payload) for each message received on topic,
+        which may contain mqtt wildcards (e.g. robotx/clients/state/+ for all robots)
+        """
+        self.__router.add(topic, handler)
+        if (topic not in self.__topicsToSubcribe):
+            self.__topicsToSubcribe.append(topic)
+            if (self.__isConnectedToBroker):
+                self.__client.subscribe(topic)
+
+    def removeTopicHandler(self, topic: str, handler: TopicHandler or None = None) -> None:
+        """
+        Stops calling handler (or all handlers if None) for messages received on topic
+        """
+        self.__router.remove(topic, handler)
+        if (topic in self.__topicsToSubcribe and topic not in self.__router.subscriptions()):
+            self.__topicsToSubcribe.remove(topic)
+            if (self.__isConnectedToBroker):
+                self.__client.unsubscribe(topic)
+
+    def startRecording(self, path: str) -> SessionRecorder:
+        """
+        Records every message received from now to a session file,
+        which can be replayed offline with pyrobotx.session.SessionReplayer
+        """
+        self.stopRecording()
+        metadata = {"arena": self.__arena, "clientId": self.__id, "robotId": self.__idRobot,
+                    "codec": self.__codec.name}
+        self.__recorder = SessionRecorder(path, metadata)
+        anx.info("⏺️ Recording " + str(self.__id) + " session to " + path)
+        return self.__recorder
+
+    def stopRecording(self) -> None:
+        recorder, self.__recorder = self.__recorder, None
+        if (recorder != None):
+            recorder.close()
+            anx.info("⏹️ Recorded " + str(recorder.messages) + " message(s) of " + str(self.__id))
+
+    def setTrafficObserver(self, observer) -> None:
+        """
+        Reports the broker traffic to observer, or stops if None. The observer must have
+        - onRx(topic, size) called for each message received,
+        - onDecoded(topic, durationNs) called after decoding a state,
+        - onTx(topic, size) called for each message published.
+        It is called from the mqtt thread for rx, so it must be fast and thread safe.
+        """
+        self.__trafficObserver = observer
 
     def connect(self) -> bool:
         if self.__isLoopStarted and self.__isConnectedToBroker:
             return False
+        if (self.__client == None):
+            self.__newClient()
         if (self.__username is not None and self.__password is not None):
             self.__client.username_pw_set(self.__username, self.__password)
         try:
@@ -1100,7 +1177,8 @@ class OvaClientMqtt(IRobot):
                 else:
                     self.__clientThreadLoop = threading.Thread(target=self.__clientLoop)
                     self.__clientThreadLoop.start()
-            time.sleep(2)
+            if (self.__isConnectedToBroker == False):  # Already connected if sharing a pooled connection
+                time.sleep(2)
             return rc == 0
         except:
             return False
@@ -1117,23 +1195,29 @@ class OvaClientMqtt(IRobot):
                 anx.info("🔴 Stopped mqtt thread loop")
             else:
                 self.__clientThreadLoop.join()
+        if (self.__pool != None and self.__client != None):
+            self.__pool.release(self.__client)
+            self.__client = None
 
     def isConnectedToArena(self) -> bool:
-        dtRx = (datetime.now() - self.__prevRxFromArena).total_seconds() * 1000
-        return self.__isConnectedToBroker and dtRx < DefaultClientSettings.isConnectedTimeout
+        dtRx = clk.clock.now() - self.__prevRxFromArena
+        return self.__isConnectedToBroker and dtRx < DefaultClientSettings.isConnectedTimeout * clk.NS_PER_MS
 
     def isConnectedToRobot(self) -> bool:
-        dtRx = (datetime.now() - self.__prevRxFromRobot).total_seconds() * 1000
-        return self.__isConnectedToBroker and dtRx < DefaultClientSettings.isConnectedTimeout
+        dtRx = clk.clock.now() - self.__prevRxFromRobot
+        return self.__isConnectedToBroker and dtRx < DefaultClientSettings.isConnectedTimeout * clk.NS_PER_MS
 
     def update(self, enableSleep=True) -> None:
         if (self.__isConnectedToBroker == False):
             self.connect()
+        now = clk.clock.tick()
         self.__events.onUpdated()
+        isBusy = False
 
         # Rx states and stream
         if (self.__rxFromRobot):
             self.__rxFromRobot = False
+            isBusy = True
             # Triggers on connected event
             if (self.__isConnectedToRobot == False):
                 self.__isConnectedToRobot = True
@@ -1155,6 +1239,7 @@ class OvaClientMqtt(IRobot):
             self.__events.onRobotDisconnected()
         if (self.__rxFromPlayer):
             self.__rxFromPlayer = False
+            isBusy = True
             try:
                 with self.__bufPlayerStateMutex:
                     if (self.__bufPlayerState != self.__playerState):
@@ -1166,6 +1251,7 @@ class OvaClientMqtt(IRobot):
                 anx.debug("⚠️ Rx player state corrupted. Fail to swap buffer.")
         if (self.__rxFromArena):
             self.__rxFromArena = False
+            isBusy = True
             # Triggers on connected event
             if (self.__isConnectedToArena == False):
                 self.__isConnectedToArena = True
@@ -1184,9 +1270,8 @@ class OvaClientMqtt(IRobot):
             self.__events.onArenaDisconnected(self.__arena)
 
         # Tx requests
-        dtTx = (datetime.now() - self.__prevTx).total_seconds() * 1000
-        if (dtTx > self.__dtTxToWait):
-            self.__prevTx = datetime.now()
+        if (now - self.__prevTx > self.__dtTxToWait * clk.NS_PER_MS):
+            self.__prevTx = now
             robotReqTopicsToPub = [self.__topicPlayerRequest]
             if (self.__useProxy == False):
                 robotReqTopicsToPub.append(self.__topicRobotRequest)
@@ -1199,30 +1284,39 @@ class OvaClientMqtt(IRobot):
                 request, topicsToPub = req
                 if (len(request) == 0):
                     continue
-                payloadStr = json.dumps(request)
-                payloadBytes = str.encode(payloadStr)
+                isBusy = True
+                payloadBytes = self.__codec.encode(request)
                 for topic in topicsToPub:
                     anx.debug("📡 Tx " + str(self.__id) + " to topic " + str(topic) + ": " + str(
                         len(payloadBytes)) + " byte(s)")
-                    self.__client.publish(topic, payloadBytes)
+                    self.__publish(topic, payloadBytes)
 
             self.__reqArena = {}
             self.__reqPlayer = {}
             self.__robotActuatorsRequest.reset()
 
         # Ping server
-        dtPing = (datetime.now() - self.__prevPing).total_seconds() * 1000
-        if (dtPing > DefaultClientSettings.dtPing):
-            self.__prevPing = datetime.now()
-            payloadStr = json.dumps({"ping": True})
-            payloadBytes = str.encode(payloadStr)
+        if (now - self.__prevPing > DefaultClientSettings.dtPing * clk.NS_PER_MS):
+            self.__prevPing = now
+            payloadBytes = self.__codec.encode({"ping": True})
             topicsToPub = [self.__topicPlayerRequest]
             for topic in topicsToPub:
                 anx.debug("📡 Ping " + str(self.__id))
-                self.__client.publish(topic, payloadBytes)
+                self.__publish(topic, payloadBytes)
 
         if (enableSleep):
-            time.sleep(DefaultClientSettings.dtSleepUpdate / 1000)
+            if (self.__scheduler != None):
+                self.__scheduler.wait(isBusy)
+            else:
+                time.sleep(DefaultClientSettings.dtSleepUpdate / 1000)
+
+    def wakeUp(self) -> None:
+        """
+        Ends the wait of an adaptive update as soon as possible,
+        e.g. after sending requests from another thread
+        """
+        if (self.__scheduler != None):
+            self.__scheduler.wake()
 
     def getRobotId(self) -> str:
         return self.__idRobot
@@ -1251,7 +1345,7 @@ class OvaClientMqtt(IRobot):
     def getTimestamp(self) -> int:
         t = self.__robotSensorsState.getTimestamp()
         if (t == 0):
-            return (self.__prevRxFromArena - self.__startTime).total_seconds() * 1000
+            return (self.__prevRxFromArena - self.__startTime) / clk.NS_PER_MS
         return t
 
     def getImageWidth(self) -> int:
@@ -1311,9 +1405,14 @@ class OvaClientMqtt(IRobot):
 
     def requestPlayer(self, key, value) -> None:
         self.__reqPlayer[key] = value
+        self.wakeUp()
+
+    def isPlayerRequestPending(self, key) -> bool:
+        return key in self.__reqPlayer
 
     def requestArena(self, key, value) -> None:
         self.__reqArena[key] = value
+        self.wakeUp()
 
     def prompt(self, jsonReq: str) -> bool:
         try:
@@ -1329,7 +1428,7 @@ class OvaClientMqtt(IRobot):
         anx.info("⏳ Connecting to robot " + str(robotId) + " ...")
         self.disconnect()
         self.__idRobot: str = robotId
-        self.__prevRxFromRobot: int = datetime.fromtimestamp(0)
+        self.__prevRxFromRobot: int = clk.NEVER
         self.__topicImgStream: str = "optx/clients/stream/" + self.__idRobot
         self.__topicRobotState: str = "robotx/clients/state/" + self.__idRobot
         self.__topicPlayerState: str = "ludx/clients/state/" + self.__arena + "/" + self.__id
@@ -1337,16 +1436,46 @@ class OvaClientMqtt(IRobot):
         self.__topicArenaRequest: str = "ludx/server/request/" + self.__arena
         self.__topicPlayerRequest: str = "ludx/clients/request/" + self.__arena + "/" + self.__id
         self.__topicRobotRequest: str = "robotx/clients/request/" + self.__idRobot
-        self.__topicsToSubcribe = [self.__topicImgStream, self.__topicRobotState, self.__topicPlayerState,
-                                   self.__topicArenaState]
-        self.__client: Client = Client(self.__id, userdata=self)
+        # Only the built-in topics follow the robot, the handlers added with addTopicHandler are kept
+        for topic, handler in self.__robotTopicHandlers:
+            self.__router.remove(topic, handler)
+        self.__robotTopicHandlers = [
+            (self.__topicImgStream, lambda topic, payload: self.__onChunkImageReceived(payload)),
+            (self.__topicRobotState, lambda topic, payload: self.__onSensorsReceived(payload)),
+            (self.__topicPlayerState, lambda topic, payload: self.__onPlayerStateReceived(payload)),
+            (self.__topicArenaState, lambda topic, payload: self.__onArenaStateReceived(payload))
+        ]
+        for topic, handler in self.__robotTopicHandlers:
+            self.__router.add(topic, handler)
+        self.__topicsToSubcribe = self.__router.subscriptions()
+        self.__newClient()
+        if (autoconnect):
+            self.connect()
+
+    def __newClient(self):
+        if (self.__pool != None):
+            self.__client = self.__pool.client(self.__id, self, self.__serverAddress, self.__serverPort,
+                                               self.__username, self.__password)
+        else:
+            self.__client = newPahoClient(self.__id, userdata=self)
         self.__client.on_message = OvaClientMqtt.__onMessage
         self.__client.on_connect = OvaClientMqtt.__onConnect
         self.__client.on_disconnect = OvaClientMqtt.__onDisconnect
         self.__client.on_subscribe = OvaClientMqtt.__onSubscribe
         self.__client.on_unsubscribe = OvaClientMqtt.__onUnsubscribe
-        if (autoconnect):
-            self.connect()
+
+    def __publish(self, topic: str, payload: bytes) -> None:
+        self.__client.publish(topic, payload)
+        if (self.__trafficObserver != None):
+            self.__trafficObserver.onTx(topic, len(payload))
+
+    def __decode(self, topic: str, data: bytes) -> Any:
+        if (self.__trafficObserver == None):
+            return self.__codec.decode(data)
+        start = clk.clock.now()
+        decoded = self.__codec.decode(data)
+        self.__trafficObserver.onDecoded(topic, clk.clock.now() - start)
+        return decoded
 
     def __clientLoop(self):
         anx.info("🟢 Started mqtt loop")
@@ -1364,74 +1493,73 @@ class OvaClientMqtt(IRobot):
         """Called when rx payload on image topic"""
         if (self.__cameraReader.onChunkImageReceived(data)):
             self.__rxFromRobot = True
+            self.wakeUp()
 
     def __onSensorsReceived(self, data: bytes):
         """Called when rx payload on sensors topic"""
-        self.__prevRxFromRobot = datetime.now()
+        self.__prevRxFromRobot = clk.clock.now()
         newState = {}
         # Parse json payload
         try:
             payloadLen = len(data)
             if (payloadLen <= 0):
                 return
-            payloadStr = data.decode()
-            newState = json.loads(payloadStr)
-            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s): " + payloadStr)
+            newState = self.__decode(self.__topicRobotState, data)
+            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s)")
         except:
-            anx.debug("⚠️ Rx state failed to parse json")
+            anx.debug("⚠️ Rx state failed to parse " + self.__codec.name)
         with self.__bufRobotStateMutex:
             self.__bufRobotState = newState
             self.__rxFromRobot = True
+            self.wakeUp()
 
     def __onPlayerStateReceived(self, data: bytes):
         """Called when rx payload on player state topic"""
-        self.__prevRxFromArena = datetime.now()
+        self.__prevRxFromArena = clk.clock.now()
         newState = {}
         # Parse json payload
         try:
             payloadLen = len(data)
             if (payloadLen <= 0):
                 return
-            payloadStr = data.decode()
-            newState = json.loads(payloadStr)
-            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s): " + payloadStr)
+            newState = self.__decode(self.__topicPlayerState, data)
+            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s)")
         except:
-            anx.debug("⚠️ Rx state failed to parse json")
+            anx.debug("⚠️ Rx state failed to parse " + self.__codec.name)
         with self.__bufPlayerStateMutex:
             self.__bufPlayerState = newState
             self.__rxFromPlayer = True
+            self.wakeUp()
 
     def __onArenaStateReceived(self, data: bytes):
         """Called when rx payload on arena state topic"""
-        self.__prevRxFromArena = datetime.now()
+        self.__prevRxFromArena = clk.clock.now()
         newState = {}
         # Parse json payload
         try:
             payloadLen = len(data)
             if (payloadLen <= 0):
                 return
-            payloadStr = data.decode()
-            newState = json.loads(payloadStr)
-            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s): " + payloadStr)
+            newState = self.__decode(self.__topicArenaState, data)
+            anx.debug("📡 Rx state of " + str(payloadLen) + " byte(s)")
         except:
-            anx.debug("⚠️ Rx state failed to parse json")
+            anx.debug("⚠️ Rx state failed to parse " + self.__codec.name)
         with self.__bufArenaStateMutex:
             self.__bufArenaState = newState
             self.__rxFromArena = True
+            self.wakeUp()
 
     def __onMessage(client, userdata, message):
         """Called when rx message from mqtt broker"""
         rxTopic = message.topic
         rxPayload = message.payload
-        if (rxTopic == userdata.__topicImgStream):
-            userdata.__onChunkImageReceived(rxPayload)
-        elif (rxTopic == userdata.__topicRobotState):
-            userdata.__onSensorsReceived(rxPayload)
-        elif (rxTopic == userdata.__topicPlayerState):
-            userdata.__onPlayerStateReceived(rxPayload)
-        elif (rxTopic == userdata.__topicArenaState):
-            userdata.__onArenaStateReceived(rxPayload)
-        else:
+        recorder = userdata.__recorder
+        if (recorder != None):
+            recorder.record(rxTopic, rxPayload)
+        observer = userdata.__trafficObserver
+        if (observer != None):
+            observer.onRx(rxTopic, len(rxPayload))
+        if (userdata.__router.dispatch(rxTopic, rxPayload) == False):
             anx.debug("📡 Rx " + userdata.__id + " on topic " + rxTopic + ": " + str(len(rxPayload)) + " byte(s)")
 
     def __onConnect(client, userdata, flags, rc):
@@ -1443,7 +1571,7 @@ class OvaClientMqtt(IRobot):
                 for topic in userdata.__topicsToSubcribe:
                     anx.info("⏳ Subscribing " + userdata.__id + " to topic " + topic)
                     userdata.__client.subscribe(topic)
-                pingRequest = json.dumps({"ping": True})
+                pingRequest = userdata.__codec.encode({"ping": True})
                 topicsToPub = [userdata.__topicPlayerRequest]
                 if (userdata.__useProxy == False):
                     topicsToPub.append(userdata.__topicRobotRequest)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import time
+from typing import Callable
+
+NS_PER_MS = 1000000
+# Timestamp of something which never happened, older than any monotonic timestamp
+NEVER = -(1 << 62)
+
+
+def msToNs(ms: float) -> int:
+    return int(ms * NS_PER_MS)
+
+
+class Clock:
+    """
+    Monotonic clock in integer nanoseconds, insensitive to wall-clock jumps.
+    tick() caches the current time once per update, so that the timing checks
+    of an update loop compare integers instead of calling the system clock.
+    """
+
+    def __init__(self, source: Callable[[], int] = time.monotonic_ns):
+        self.__source = source
+        self.__start = source()
+        self.__ticked = self.__start
+
+    def now(self) -> int:
+        """Returns the current time in ns"""
+        return self.__source()
+
+    def tick(self) -> int:
+        """Refreshes and returns the cached time in ns"""
+        self.__ticked = self.__source()
+        return self.__ticked
+
+    @property
+    def ticked(self) -> int:
+        """Returns the time in ns of the last tick"""
+        return self.__ticked
+
+    @property
+    def start(self) -> int:
+        """Returns the time in ns when the clock was created"""
+        return self.__start
+
+    def elapsedMs(self, since: int, now: int or None = None) -> float:
+        """Returns the ms elapsed since the given time in ns, until now or the last tick"""
+        if (now == None):
+            now = self.__ticked
+        return (now - since) / NS_PER_MS
+
+    def sinceStartMs(self, timestamp: int or None = None) -> float:
+        """Returns the ms elapsed between the creation of the clock and timestamp (or now)"""
+        if (timestamp == None):
+            timestamp = self.__source()
+        return (timestamp - self.__start) / NS_PER_MS
+
+
+clock = Clock()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import json
+import time
+from typing import Any
+
+
+class ICodec:
+    """
+    Serializes mqtt payloads.
+    decode accepts the raw message payload (bytes, bytearray or memoryview)
+    and must not copy it into an intermediate str when the backend can avoid it.
+    """
+    name: str = ""
+
+    def encode(self, obj: Any) -> bytes:
+        """To be overidden"""
+        ...
+
+    def decode(self, data: bytes or bytearray or memoryview) -> Any:
+        """To be overidden"""
+        ...
+
+
+class JsonCodec(ICodec):
+    """
+    Json codec, using orjson if installed (x5-x10 faster), else the standard json module.
+    Both backends parse bytes directly, without decoding the payload into a str first.
+    """
+    name = "json"
+
+    def __init__(self, useOrjson: bool = True):
+        self.__orjson = None
+        if (useOrjson):
+            try:
+                import orjson
+                self.__orjson = orjson
+            except ImportError:
+                pass
+
+    @property
+    def backend(self) -> str:
+        return "orjson" if self.__orjson != None else "json"
+
+    def encode(self, obj: Any) -> bytes:
+        if (self.__orjson != None):
+            try:
+                return self.__orjson.dumps(obj, option=self.__orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # Values orjson cannot serialize (e.g. integers over 64 bits)
+        return json.dumps(obj).encode()
+
+    def decode(self, data: bytes or bytearray or memoryview) -> Any:
+        if (self.__orjson != None):
+            return self.__orjson.loads(data)
+        if (isinstance(data, memoryview)):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class MsgpackCodec(ICodec):
+    """
+    Binary codec using msgpack (pip install msgpack), to use only if both ends support it
+    """
+    name = "msgpack"
+
+    def __init__(self):
+        import msgpack
+        self.__packb = msgpack.packb
+        self.__unpackb = msgpack.unpackb
+
+    def encode(self, obj: Any) -> bytes:
+        return self.__packb(obj, use_bin_type=True)
+
+    def decode(self, data: bytes or bytearray or memoryview) -> Any:
+        return self.__unpackb(data, raw=False, strict_map_key=False)
+
+
+class CborCodec(ICodec):
+    """
+    Binary codec using cbor2 (pip install cbor2), to use only if both ends support it
+    """
+    name = "cbor"
+
+    def __init__(self):
+        import cbor2
+        self.__dumps = cbor2.dumps
+        self.__loads = cbor2.loads
+
+    def encode(self, obj: Any) -> bytes:
+        return self.__dumps(obj)
+
+    def decode(self, data: bytes or bytearray or memoryview) -> Any:
+        return self.__loads(data)
+
+
+__codecs = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+    CborCodec.name: CborCodec,
+}
+
+
+def getCodec(codec: str or ICodec or None = None) -> ICodec:
+    """
+    Returns the codec instance for the given name (json, msgpack or cbor).
+    Raises ValueError if the codec is unknown or its package is not installed.
+    """
+    if (codec == None):
+        return JsonCodec()
+    if (isinstance(codec, ICodec)):
+        return codec
+    if (codec not in __codecs):
+        raise ValueError("Unknown codec " + str(codec) + ", expecting one of " + str(list(__codecs.keys())))
+    try:
+        return __codecs[codec]()
+    except ImportError as e:
+        raise ValueError("Codec " + str(codec) + " is not installed: " + str(e)) from e
+
+
+def availableCodecs() -> list[str]:
+    """
+    Returns the names of the codecs which can be used on this machine
+    """
+    available = []
+    for name in __codecs:
+        try:
+            getCodec(name)
+            available.append(name)
+        except ValueError:
+            pass
+    return available
+
+
+def typicalArenaState(gridColumns: int = 40, gridRows: int = 40, nProfiles: int = 4, nPlayers: int = 16) -> dict:
+    """
+    Returns an arena state as sent by the arena: the rules with the map and per profile arrays
+    """
+    players = {}
+    for i in range(nPlayers):
+        players["player" + str(i)] = {"x": i % gridColumns, "y": i // gridColumns, "dir": i % 4,
+                                      "life": 100, "ammo": 10, "score": i * 1.5, "team": i % 2,
+                                      "profile": i % nProfiles, "led": [0, 255, 0]}
+    return {
+        "gridColumns": gridColumns, "gridRows": gridRows, "pause": False, "info": "🏁 Round 1",
+        "map": [[(x * 7 + y * 13) % 5 for x in range(gridColumns)] for y in range(gridRows)],
+        "mapFriction": [1, 0, 0.5, 0.1, 1, 0],
+        "mapImgs": ["", "wall.png", "slow.png", "trap.png", "battery.png", ""],
+        "profiles": ["ova", "ova_fast", "ova_tank", "ova_scout"][:nProfiles],
+        "range": [3] * nProfiles, "dtMove": [300] * nProfiles, "dtFire": [1000] * nProfiles,
+        "lifeIni": [100] * nProfiles, "ammoIni": [10] * nProfiles, "hitFire": [10] * nProfiles,
+        "players": players,
+    }
+
+
+def benchmark(state: dict or None = None, codecs: list[str] or None = None, repeat: int = 100) -> dict:
+    """
+    Returns, for each codec, the payload size in bytes and the mean encode/decode times in µs
+    """
+    if (state == None):
+        state = typicalArenaState()
+    results = {}
+    candidates = [("json(std)", JsonCodec(useOrjson=False))]
+    for name in (codecs if codecs != None else availableCodecs()):
+        codec = getCodec(name)
+        label = codec.backend if isinstance(codec, JsonCodec) else name
+        if (label not in ("json", "json(std)")):
+            candidates.append((label, codec))
+    for label, codec in candidates:
+        payload = codec.encode(state)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            codec.encode(state)
+        encodeTime = (time.perf_counter() - start) / repeat * 1e6
+        view = memoryview(payload)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            codec.decode(view)
+        decodeTime = (time.perf_counter() - start) / repeat * 1e6
+        results[label] = {"bytes": len(payload), "encodeUs": round(encodeTime, 1), "decodeUs": round(decodeTime, 1)}
+    return results
+
+
+if __name__ == "__main__":
+    for size in (20, 40, 100):
+        print(str(size) + "x" + str(size) + " arena state:")
+        for label, result in benchmark(typicalArenaState(size, size)).items():
+            print("  " + label + ": " + str(result))
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import os
+import sys
+
+__workdir__ = os.path.dirname(os.path.abspath(__file__))
+__libdir__ = os.path.dirname(__workdir__)
+sys.path.append(__libdir__)
+
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import pyanalytx.logger as anx
+import pyrobotx.clock as clk
+
+
+class Dispatch:
+    sync = "sync"  # Called on the notifying thread (the update thread)
+    thread = "thread"  # Called on the thread pool of the bus
+    asyncio = "asyncio"  # Called on the given asyncio loop, coroutine functions are awaited there
+
+
+class DefaultEventSettings:
+    slowCallbackMs = 50  # In msecs, a sync callback taking longer stalls the update loop
+    slowCallbackWarningPeriodMs = 5000  # In msecs, min period between 2 slow warnings of a same listener
+    threadPoolSize = 4
+
+
+class EventListener:
+    """
+    A callback subscribed to an event, with its latency stats
+    """
+
+    def __init__(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int,
+                 dispatch: str, loop: asyncio.AbstractEventLoop or None):
+        self.eventName = eventName
+        self.callback = callback
+        self.priority = priority
+        self.dispatch = dispatch
+        self.loop = loop
+        self.calls = 0
+        self.errors = 0
+        self.totalMs = 0.0
+        self.maxMs = 0.0
+        self.lastMs = 0.0
+        self.prevSlowWarning = clk.NEVER
+        self.__mutex = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return getattr(self.callback, "__qualname__", repr(self.callback))
+
+    def record(self, durationMs: float, failed: bool) -> None:
+        with self.__mutex:
+            self.calls += 1
+            self.errors += int(failed)
+            self.totalMs += durationMs
+            self.lastMs = durationMs
+            self.maxMs = max(self.maxMs, durationMs)
+
+    def stats(self) -> dict[str, Any]:
+        with self.__mutex:
+            return {
+                "event": self.eventName, "listener": self.name, "priority": self.priority,
+                "dispatch": self.dispatch, "calls": self.calls, "errors": self.errors,
+                "meanMs": self.totalMs / self.calls if self.calls > 0 else 0.0,
+                "maxMs": self.maxMs, "lastMs": self.lastMs,
+            }
+
+
+class EventBus:
+    """
+    Notifies every listener of an event, by decreasing priority then subscription order.
+    Listeners are called synchronously, on a thread pool, or on an asyncio loop.
+    The latency of each listener is measured, and a warning is logged
+    when a synchronous listener stalls the notifying thread.
+    """
+
+    def __init__(self, events: list[str]):
+        self.__listeners: dict[str, tuple[EventListener, ...]] = {}
+        for eventName in events:
+            self.__listeners[eventName] = ()
+        self.__mutex = threading.Lock()
+        self.__executor: ThreadPoolExecutor or None = None
+
+    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int = 0,
+                         dispatch: str = Dispatch.sync,
+                         loop: asyncio.AbstractEventLoop or None = None) -> EventListener or None:
+        if (eventName not in self.__listeners):
+            anx.warning("⚠️ Cannot add event listener for event " + eventName)
+            anx.warning("⚠️ Can only add event on " + str(self.__listeners.keys()))
+            return None
+        if (dispatch not in (Dispatch.sync, Dispatch.thread, Dispatch.asyncio)):
+            raise ValueError("Unknown dispatch " + str(dispatch))
+        if (dispatch == Dispatch.asyncio and loop == None):
+            raise ValueError("An asyncio loop is required to dispatch on asyncio")
+        listener = EventListener(eventName, callback, priority, dispatch, loop)
+        with self.__mutex:
+            listeners = list(self.__listeners[eventName]) + [listener]
+            # Sorting is stable, so listeners of same priority keep their subscription order
+            listeners.sort(key=lambda l: -l.priority)
+            self.__listeners[eventName] = tuple(listeners)
+        return listener
+
+    def removeEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None] or EventListener) -> bool:
+        """
+        Removes the listener (or every listener of the callback), and returns False if not found
+        """
+        with self.__mutex:
+            listeners = self.__listeners.get(eventName, ())
+            kept = tuple(l for l in listeners if l is not callback and l.callback != callback)
+            self.__listeners[eventName] = kept
+            return len(kept) != len(listeners)
+
+    def getListenerStats(self, eventName: str or None = None) -> list[dict[str, Any]]:
+        """
+        Returns the latency stats of the listeners of an event, or of all events
+        """
+        with self.__mutex:
+            events = [eventName] if eventName != None else list(self.__listeners)
+            listeners = [l for name in events for l in self.__listeners.get(name, ())]
+        return [l.stats() for l in listeners]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the thread pool of the bus, if any
+        """
+        with self.__mutex:
+            executor, self.__executor = self.__executor, None
+        if (executor != None):
+            executor.shutdown(wait=wait)
+
+    def notify(self, eventName: str, value: Any or None = None) -> None:
+        if (eventName not in self.__listeners):
+            anx.warning("⚠️ Cannot notify event " + eventName)
+            anx.warning("⚠️ Can only notify event on " + str(self.__listeners.keys()))
+            return
+        for listener in self.__listeners[eventName]:
+            if (listener.dispatch == Dispatch.sync):
+                self.__call(listener, eventName, value)
+                if (listener.lastMs > DefaultEventSettings.slowCallbackMs):
+                    self.__warnSlow(listener)
+            elif (listener.dispatch == Dispatch.thread):
+                self.__getExecutor().submit(self.__call, listener, eventName, value)
+            else:
+                self.__callSoon(listener, eventName, value)
+
+    def __call(self, listener: EventListener, eventName: str, value: Any) -> None:
+        start = clk.clock.now()
+        failed = False
+        try:
+            listener.callback(self, eventName, value)
+        except Exception as e:
+            failed = True
+            anx.debug("⚠️ Exception during " + eventName + " event notification : " + str(e))
+            anx.debug(traceback.format_exc())
+        listener.record((clk.clock.now() - start) / clk.NS_PER_MS, failed)
+
+    def __callSoon(self, listener: EventListener, eventName: str, value: Any) -> None:
+        if (asyncio.iscoroutinefunction(listener.callback)):
+            async def run():
+                start = clk.clock.now()
+                failed = False
+                try:
+                    await listener.callback(self, eventName, value)
+                except Exception as e:
+                    failed = True
+                    anx.debug("⚠️ Exception during " + eventName + " event notification : " + str(e))
+                listener.record((clk.clock.now() - start) / clk.NS_PER_MS, failed)
+
+            asyncio.run_coroutine_threadsafe(run(), listener.loop)
+        else:
+            listener.loop.call_soon_threadsafe(self.__call, listener, eventName, value)
+
+    def __getExecutor(self) -> ThreadPoolExecutor:
+        with self.__mutex:
+            if (self.__executor == None):
+                self.__executor = ThreadPoolExecutor(DefaultEventSettings.threadPoolSize,
+                                                     thread_name_prefix="pyrobotx-events")
+            return self.__executor
+
+    def __warnSlow(self, listener: EventListener) -> None:
+        now = clk.clock.now()
+        if (now - listener.prevSlowWarning < DefaultEventSettings.slowCallbackWarningPeriodMs * clk.NS_PER_MS):
+            return
+        listener.prevSlowWarning = now
+        anx.warning("🐢 Listener " + listener.name + " of event " + listener.eventName + " took " + str(
+            round(listener.lastMs, 1)) + "ms and stalls the update loop, consider a thread or asyncio dispatch")
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import os
+import sys
+
+__workdir__ = os.path.dirname(os.path.abspath(__file__))
+__libdir__ = os.path.dirname(__workdir__)
+sys.path.append(__libdir__)
+
+import threading
+from typing import Any, Callable
+
+from paho.mqtt.client import Client
+
+from pyrobotx.router import TopicRouter
+import pyanalytx.logger as anx
+
+
+class DefaultPoolSettings:
+    maxClientsPerConnection = 50  # Logical clients sharing one socket
+    connectTimeout = 5.0  # In secs
+    reconnectDelayMin = 1  # In secs
+    reconnectDelayMax = 30  # In secs
+
+
+def newPahoClient(clientId: str, userdata: Any = None) -> Client:
+    """
+    Returns a paho client using the v1 callbacks API, whatever the paho version
+    """
+    try:
+        from paho.mqtt.client import CallbackAPIVersion
+        return Client(CallbackAPIVersion.VERSION1, clientId, userdata=userdata)
+    except ImportError:  # paho-mqtt < 2.0
+        return Client(clientId, userdata=userdata)
+
+
+class BrokerConnection:
+    """
+    One socket and network thread to a broker, shared by many logical clients.
+    Subscriptions are reference counted, and restored after a reconnection.
+    """
+
+    def __init__(self, clientId: str, server: str, port: int, username: str or None, password: str or None,
+                 clientFactory: Callable[[str, Any], Any] = newPahoClient):
+        self.__server = server
+        self.__port = port
+        self.__router = TopicRouter()
+        self.__topicRefs: dict[str, int] = {}
+        self.__leases: list["SharedClient"] = []
+        self.__mutex = threading.RLock()
+        self.__isConnected = False
+        self.__isLoopStarted = False
+        self.__client = clientFactory(clientId, self)
+        if (username is not None and password is not None):
+            self.__client.username_pw_set(username, password)
+        self.__client.on_message = BrokerConnection.__onMessage
+        self.__client.on_connect = BrokerConnection.__onConnect
+        self.__client.on_disconnect = BrokerConnection.__onDisconnect
+        if (hasattr(self.__client, "reconnect_delay_set")):
+            self.__client.reconnect_delay_set(DefaultPoolSettings.reconnectDelayMin,
+                                              DefaultPoolSettings.reconnectDelayMax)
+
+    @property
+    def isConnected(self) -> bool:
+        return self.__isConnected
+
+    @property
+    def refCount(self) -> int:
+        return len(self.__leases)
+
+    def lease(self, clientId: str, userdata: Any) -> "SharedClient":
+        with self.__mutex:
+            shared = SharedClient(self, clientId, userdata)
+            self.__leases.append(shared)
+            return shared
+
+    def connect(self) -> int:
+        with self.__mutex:
+            rc = 0
+            if (self.__isConnected == False):
+                anx.info("⏳ Connecting shared connection to broker " + self.__server + ":" + str(self.__port) + " ...")
+                self.__client._connect_timeout = DefaultPoolSettings.connectTimeout
+                rc = self.__client.connect(self.__server, self.__port)
+            if (self.__isLoopStarted == False):
+                self.__client.loop_start()
+                self.__isLoopStarted = True
+            return rc
+
+    def close(self) -> None:
+        with self.__mutex:
+            anx.info("⏳ Closing shared connection to broker " + self.__server + ":" + str(self.__port))
+            if (self.__isConnected):
+                self.__client.disconnect()
+            if (self.__isLoopStarted):
+                self.__client.loop_stop()
+                self.__isLoopStarted = False
+            self.__isConnected = False
+
+    def release(self, shared: "SharedClient") -> int:
+        """
+        Removes a logical client, and returns the number of logical clients left
+        """
+        with self.__mutex:
+            if (shared in self.__leases):
+                self.__leases.remove(shared)
+            return len(self.__leases)
+
+    def subscribe(self, topic: str, handler: Callable[[str, Any], None]) -> None:
+        with self.__mutex:
+            self.__router.add(topic, handler)
+            self.__topicRefs[topic] = self.__topicRefs.get(topic, 0) + 1
+            if (self.__topicRefs[topic] == 1 and self.__isConnected):
+                self.__client.subscribe(topic)
+
+    def unsubscribe(self, topic: str, handler: Callable[[str, Any], None]) -> None:
+        with self.__mutex:
+            if (topic not in self.__topicRefs):
+                return
+            self.__router.remove(topic, handler)
+            self.__topicRefs[topic] -= 1
+            if (self.__topicRefs[topic] <= 0):
+                del self.__topicRefs[topic]
+                if (self.__isConnected):
+                    self.__client.unsubscribe(topic)
+
+    def publish(self, topic: str, payload: Any):
+        return self.__client.publish(topic, payload)
+
+    def __onMessage(client, userdata, message):
+        userdata.__router.dispatch(message.topic, message)
+
+    def __onConnect(client, userdata, flags, rc):
+        if (rc != 0):
+            anx.error("❌ FAIL to connect shared connection to broker")
+            return
+        with userdata.__mutex:
+            userdata.__isConnected = True
+            for topic in userdata.__topicRefs:
+                client.subscribe(topic)  # Restore subscriptions after a reconnection
+            leases = list(userdata.__leases)
+        anx.info("🟢 Shared connection to broker connected for " + str(len(leases)) + " client(s)")
+        for shared in leases:
+            shared._onConnectionChanged(True, flags, rc)
+
+    def __onDisconnect(client, userdata, rc):
+        with userdata.__mutex:
+            userdata.__isConnected = False
+            leases = list(userdata.__leases)
+        anx.info("🔴 Shared connection to broker disconnected")
+        for shared in leases:
+            shared._onConnectionChanged(False, None, rc)
+
+
+class SharedClient:
+    """
+    Logical client of a BrokerConnection, with the subset of the paho client API used by OvaClientMqtt
+    """
+
+    def __init__(self, connection: BrokerConnection, clientId: str, userdata: Any):
+        self.__connection = connection
+        self.__clientId = clientId
+        self.__userdata = userdata
+        self.__handlers: dict[str, Callable[[str, Any], None]] = {}
+        self.__isActive = False
+        self.on_message = None
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_subscribe = None
+        self.on_unsubscribe = None
+        self._connect_timeout = DefaultPoolSettings.connectTimeout
+
+    @property
+    def connection(self) -> BrokerConnection:
+        return self.__connection
+
+    def username_pw_set(self, username: str, password: str or None = None) -> None:
+        """Credentials are the ones of the shared connection"""
+        ...
+
+    def connect(self, host: str = None, port: int = None, *args, **kwargs) -> int:
+        self.__isActive = True
+        wasConnected = self.__connection.isConnected
+        rc = self.__connection.connect()
+        if (wasConnected):
+            self._onConnectionChanged(True, None, 0)
+        return rc
+
+    def disconnect(self, *args, **kwargs) -> int:
+        for topic in list(self.__handlers):
+            self.unsubscribe(topic)
+        if (self.__isActive):
+            self.__isActive = False
+            if (self.on_disconnect != None):
+                self.on_disconnect(self, self.__userdata, 0)
+        return 0
+
+    def loop_start(self) -> int:
+        """The network loop is the one of the shared connection"""
+        return 0
+
+    def loop_stop(self, *args, **kwargs) -> int:
+        return 0
+
+    def loop(self, timeout: float = 1.0, *args, **kwargs) -> int:
+        return 0
+
+    def subscribe(self, topic: str, *args, **kwargs):
+        if (topic in self.__handlers):
+            return (0, None)
+        handler = self.__onMessage
+        self.__handlers[topic] = handler
+        self.__connection.subscribe(topic, handler)
+        return (0, None)
+
+    def unsubscribe(self, topic: str, *args, **kwargs):
+        handler = self.__handlers.pop(topic, None)
+        if (handler != None):
+            self.__connection.unsubscribe(topic, handler)
+        return (0, None)
+
+    def publish(self, topic: str, payload: Any = None, *args, **kwargs):
+        return self.__connection.publish(topic, payload)
+
+    def __onMessage(self, topic: str, message: Any) -> None:
+        if (self.__isActive and self.on_message != None):
+            self.on_message(self, self.__userdata, message)
+
+    def _onConnectionChanged(self, isConnected: bool, flags, rc) -> None:
+        """Called by the shared connection when connected or disconnected"""
+        if (self.__isActive == False):
+            return
+        if (isConnected and self.on_connect != None):
+            self.on_connect(self, self.__userdata, flags, rc)
+        elif (isConnected == False and self.on_disconnect != None):
+            self.on_disconnect(self, self.__userdata, rc)
+
+
+class BrokerConnectionPool:
+    """
+    Shares broker connections between clients using the same server, port and credentials.
+    Each connection serves up to maxClientsPerConnection logical clients,
+    and is closed when its last logical client is released.
+    """
+
+    def __init__(self, maxClientsPerConnection: int = DefaultPoolSettings.maxClientsPerConnection,
+                 clientFactory: Callable[[str, Any], Any] = newPahoClient):
+        if (maxClientsPerConnection < 1):
+            raise ValueError("maxClientsPerConnection must be at least 1")
+        self.__maxClientsPerConnection = maxClientsPerConnection
+        self.__clientFactory = clientFactory
+        self.__connections: dict[tuple, list[BrokerConnection]] = {}
+        self.__mutex = threading.Lock()
+
+    def client(self, clientId: str, userdata: Any, server: str, port: int, username: str or None = None,
+               password: str or None = None) -> SharedClient:
+        """
+        Returns a logical client on a shared connection to the broker
+        """
+        key = (server, port, username, password)
+        with self.__mutex:
+            connections = self.__connections.setdefault(key, [])
+            available = [c for c in connections if c.refCount < self.__maxClientsPerConnection]
+            if (len(available) > 0):
+                connection = min(available, key=lambda c: c.refCount)
+            else:
+                poolId = "pool-" + str(len(connections)) + "-" + str(clientId)
+                connection = BrokerConnection(poolId, server, port, username, password, self.__clientFactory)
+                connections.append(connection)
+            return connection.lease(clientId, userdata)
+
+    def release(self, shared: SharedClient) -> None:
+        """
+        Disconnects a logical client, and closes its connection if it was the last one
+        """
+        shared.disconnect()
+        connection = shared.connection
+        with self.__mutex:
+            if (connection.release(shared) > 0):
+                return
+            for key, connections in list(self.__connections.items()):
+                if (connection in connections):
+                    connections.remove(connection)
+                    if (len(connections) == 0):
+                        del self.__connections[key]
+        connection.close()
+
+    def connectionCount(self) -> int:
+        with self.__mutex:
+            return sum(len(connections) for connections in self.__connections.values())
+
+    def clientCount(self) -> int:
+        with self.__mutex:
+            return sum(c.refCount for connections in self.__connections.values() for c in connections)
+
+
+defaultPool = BrokerConnectionPool()
@@ -10,9 +10,10 @@
 # Designed with 💖 by Jusdeliens
 # Under CC BY-NC-ND 3.0 licence 
 # https://creativecommons.org/licenses/by-nc-nd/3.0/ 
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
-from PIL import Image
+if TYPE_CHECKING:  # PIL is only loaded by clients receiving images
+    from PIL import Image
 
 
 class RobotEvent:
@@ -28,10 +29,26 @@ class RobotEvent:
 
 
 class IRobot:
-    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> None:
+    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int = 0,
+                         dispatch: str = "sync", loop=None) -> Any:
         """
         Subscribe to event to call the specified callback
-        as soon as a event occurs
+        as soon as a event occurs.
+        Several callbacks can listen to the same event, called by decreasing priority.
+        dispatch can be "sync" (on the update thread), "thread" (on a thread pool)
+        or "asyncio" (on the given asyncio loop)
+        """
+        ...
+
+    def removeEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> bool:
+        """
+        Unsubscribe the callback from event
+        """
+        ...
+
+    def getListenerStats(self, eventName: str or None = None) -> list[dict[str, Any]]:
+        """
+        Returns the calls, errors and latencies (mean, max, last in ms) of each listener
         """
         ...
 
@@ -339,6 +356,12 @@ class IRobot:
         """
         ...
 
+    def isPlayerRequestPending(self, key: str) -> bool:
+        """
+        Returns whether a player request is still buffered, not sent yet by update()
+        """
+        ...
+
     def _onConnectedToRobot(self) -> None:
         """
         Called on update() call when the client is connected to the robot
@@ -432,7 +455,7 @@ class IRobot:
         """
         ...
 
-    def _onImageReceived(self, img: Image) -> None:
+    def _onImageReceived(self, img: 'Image.Image') -> None:
         """
         Called on update() call each time new complete image is received from the robot.
         In order to use this method, follow these steps:
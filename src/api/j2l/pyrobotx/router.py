@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import threading
+from typing import Any, Callable
+
+TopicHandler = Callable[[str, Any], None]
+RESOLVED_CACHE_SIZE = 4096  # Max number of topics whose handlers are cached
+
+
+def isWildcard(topic: str) -> bool:
+    return "+" in topic or "#" in topic
+
+
+def topicMatches(subscription: str, topic: str) -> bool:
+    """
+    Returns True if topic matches the subscription, which may contain mqtt wildcards (+ and #)
+    """
+    subLevels = subscription.split("/")
+    topicLevels = topic.split("/")
+    for i, subLevel in enumerate(subLevels):
+        if (subLevel == "#"):
+            return i == len(subLevels) - 1
+        if (i >= len(topicLevels)):
+            return False
+        if (subLevel != "+" and subLevel != topicLevels[i]):
+            return False
+    return len(subLevels) == len(topicLevels)
+
+
+class TopicRouter:
+    """
+    Dispatches mqtt messages to the handlers of their topic.
+    Exact topics are found in a dict, and the handlers matching a topic through
+    wildcard subscriptions are resolved once, then cached until subscriptions change.
+    """
+
+    def __init__(self):
+        self.__exact: dict[str, list[TopicHandler]] = {}
+        self.__wildcards: list[tuple[str, TopicHandler]] = []
+        self.__resolved: dict[str, tuple[TopicHandler, ...]] = {}
+        self.__mutex = threading.Lock()
+
+    def add(self, subscription: str, handler: TopicHandler) -> None:
+        """
+        Calls handler(topic, payload) for each message matching subscription
+        """
+        with self.__mutex:
+            if (isWildcard(subscription)):
+                self.__wildcards.append((subscription, handler))
+            else:
+                self.__exact.setdefault(subscription, []).append(handler)
+            self.__resolved = {}
+
+    def remove(self, subscription: str, handler: TopicHandler or None = None) -> None:
+        """
+        Removes the handler of subscription, or all its handlers if handler is None
+        """
+        with self.__mutex:
+            if (isWildcard(subscription)):
+                self.__wildcards = [(sub, h) for sub, h in self.__wildcards
+                                    if sub != subscription or (handler != None and h != handler)]
+            elif (subscription in self.__exact):
+                handlers = [h for h in self.__exact[subscription] if handler != None and h != handler]
+                if (len(handlers) > 0):
+                    self.__exact[subscription] = handlers
+                else:
+                    del self.__exact[subscription]
+            self.__resolved = {}
+
+    def subscriptions(self) -> list[str]:
+        """
+        Returns the topics to subscribe to, without duplicates
+        """
+        with self.__mutex:
+            return list(dict.fromkeys(list(self.__exact) + [sub for sub, _ in self.__wildcards]))
+
+    def __resolve(self, topic: str) -> tuple[TopicHandler, ...]:
+        handlers = self.__resolved.get(topic)
+        if (handlers != None):
+            return handlers
+        with self.__mutex:
+            handlers = tuple(self.__exact.get(topic, ())) + tuple(
+                h for sub, h in self.__wildcards if topicMatches(sub, topic))
+            if (len(self.__resolved) >= RESOLVED_CACHE_SIZE):
+                self.__resolved = {}
+            self.__resolved[topic] = handlers
+        return handlers
+
+    def dispatch(self, topic: str, payload: Any) -> bool:
+        """
+        Calls the handlers of topic, and returns False if there is none
+        """
+        handlers = self.__resolve(topic)
+        for handler in handlers:
+            handler(topic, payload)
+        return len(handlers) > 0
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import os
+import sys
+
+__workdir__ = os.path.dirname(os.path.abspath(__file__))
+__libdir__ = os.path.dirname(__workdir__)
+sys.path.append(__libdir__)
+
+import threading
+import time
+
+import pyrobotx.clock as clk
+
+
+class AdaptiveScheduler:
+    """
+    Paces an update loop:
+    - after a busy update (state received or request sent), the next one starts after dtMin,
+    - while idle, the period grows by backoff after each update, up to dtMax,
+    - wake() ends the wait as soon as dtMin has elapsed, e.g. when a new state is received.
+    dtMin is the max update rate, so that the broker is never flooded.
+    """
+
+    def __init__(self, dtMin: float = 20, dtMax: float = 1000, backoff: float = 2.0,
+                 clock: clk.Clock = clk.clock):
+        if (dtMin <= 0 or dtMax < dtMin or backoff < 1):
+            raise ValueError("Expecting 0 < dtMin <= dtMax and backoff >= 1")
+        self.__dtMin = clk.msToNs(dtMin)
+        self.__dtMax = clk.msToNs(dtMax)
+        self.__backoff = backoff
+        self.__clock = clock
+        self.__period = self.__dtMin
+        self.__prevUpdate = clk.NEVER
+        self.__event = threading.Event()
+
+    @property
+    def periodMs(self) -> float:
+        """Returns the current period between 2 updates in ms"""
+        return self.__period / clk.NS_PER_MS
+
+    def wake(self) -> None:
+        """Starts the next update as soon as the max rate allows it"""
+        self.__event.set()
+
+    def wait(self, busy: bool) -> float:
+        """
+        Waits for the next update, and returns the time waited in ms
+        """
+        if (busy or self.__event.is_set()):
+            self.__period = self.__dtMin
+        else:
+            self.__period = min(int(self.__period * self.__backoff), self.__dtMax)
+        start = self.__clock.now()
+        if (self.__prevUpdate != clk.NEVER):
+            earliest = self.__prevUpdate + self.__dtMin
+            if (earliest > start):
+                time.sleep((earliest - start) / 1e9)
+            remaining = self.__prevUpdate + self.__period - self.__clock.now()
+            if (remaining > 0):
+                self.__event.wait(remaining / 1e9)
+        self.__event.clear()
+        self.__prevUpdate = self.__clock.now()
+        return (self.__prevUpdate - start) / clk.NS_PER_MS
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import os
+import sys
+
+__workdir__ = os.path.dirname(os.path.abspath(__file__))
+__libdir__ = os.path.dirname(__workdir__)
+sys.path.append(__libdir__)
+
+import json
+import struct
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator, NamedTuple
+
+import pyrobotx.clock as clk
+from pyrobotx.pool import BrokerConnectionPool
+
+# File layout:
+#   MAGIC, then <I metadata length, then the metadata as json
+#   then frames: <I chunk length, then a chunk of one zlib stream, flushed after each message
+#   each decompressed message: <qHI (timestamp in ns since the start, topic length, payload length), topic, payload
+MAGIC = b"OVAREC1\n"
+_lengthFormat = struct.Struct("<I")
+_messageFormat = struct.Struct("<qHI")
+
+
+class RecordedMessage(NamedTuple):
+    timestamp: int  # In ns since the start of the recording
+    topic: str
+    payload: bytes
+
+
+class SessionRecorder:
+    """
+    Appends timestamped mqtt messages to a compact session file.
+    Messages are compressed in a single zlib stream, flushed after each message,
+    so that the file stays readable up to the last message if the process stops.
+    """
+
+    def __init__(self, path: str, metadata: dict[str, Any] or None = None, level: int = 6,
+                 clock: clk.Clock = clk.clock):
+        self.__clock = clock
+        self.__start = clock.now()
+        self.__mutex = threading.Lock()
+        self.__compressor = zlib.compressobj(level)
+        self.__messages = 0
+        self.__file = open(path, "wb")
+        header = json.dumps(metadata or {}).encode()
+        self.__file.write(MAGIC + _packLength(len(header)) + header)
+
+    @property
+    def messages(self) -> int:
+        return self.__messages
+
+    @property
+    def closed(self) -> bool:
+        return self.__file.closed
+
+    def record(self, topic: str, payload: bytes or bytearray or memoryview, timestamp: int or None = None) -> None:
+        """
+        Appends a message, received now or at the given monotonic timestamp in ns
+        """
+        if (timestamp == None):
+            timestamp = self.__clock.now()
+        topicBytes = topic.encode()
+        payload = bytes(payload)
+        with self.__mutex:
+            if (self.__file.closed):
+                return
+            message = _packMessage(timestamp - self.__start, len(topicBytes), len(payload)) + topicBytes + payload
+            chunk = self.__compressor.compress(message) + self.__compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.__file.write(_packLength(len(chunk)) + chunk)
+            # Out of the write buffer too, so that a crash keeps every recorded message
+            self.__file.flush()
+            self.__messages += 1
+
+    def close(self) -> None:
+        with self.__mutex:
+            if (self.__file.closed == False):
+                self.__file.flush()
+                self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _packLength(length: int) -> bytes:
+    return _lengthFormat.pack(length)
+
+
+def _packMessage(timestamp: int, topicLength: int, payloadLength: int) -> bytes:
+    return _messageFormat.pack(timestamp, topicLength, payloadLength)
+
+
+def readSessionMetadata(path: str) -> dict[str, Any]:
+    with open(path, "rb") as file:
+        return _readHeader(file)
+
+
+def _readHeader(file) -> dict[str, Any]:
+    if (file.read(len(MAGIC)) != MAGIC):
+        raise ValueError("Not a session recording: " + str(file.name))
+    length, = _lengthFormat.unpack(file.read(_lengthFormat.size))
+    return json.loads(file.read(length))
+
+
+def readSession(path: str) -> Iterator[RecordedMessage]:
+    """
+    Yields the recorded messages, ignoring a last message truncated by a crash
+    """
+    decompressor = zlib.decompressobj()
+    with open(path, "rb") as file:
+        _readHeader(file)
+        while True:
+            rawLength = file.read(_lengthFormat.size)
+            if (len(rawLength) < _lengthFormat.size):
+                return
+            length, = _lengthFormat.unpack(rawLength)
+            chunk = file.read(length)
+            if (len(chunk) < length):
+                return
+            message = decompressor.decompress(chunk)
+            timestamp, topicLength, payloadLength = _messageFormat.unpack_from(message)
+            offset = _messageFormat.size
+            topic = message[offset:offset + topicLength].decode()
+            offset += topicLength
+            yield RecordedMessage(timestamp, topic, message[offset:offset + payloadLength])
+
+
+class OfflineBroker:
+    """
+    In-process broker to replay sessions without network.
+    Clients built with its pool receive the messages published to the broker,
+    and what they publish is kept in published, e.g. to check the requests of an arbiter.
+    """
+
+    def __init__(self):
+        self.__clients: list[OfflineBroker.Client] = []
+        self.published: list[tuple[str, bytes]] = []
+        self.pool = BrokerConnectionPool(clientFactory=self.__newClient)
+
+    class Client:
+        """
+        Subset of the paho client API used by BrokerConnection
+        """
+
+        def __init__(self, broker: "OfflineBroker", clientId: str, userdata: Any):
+            self.broker = broker
+            self.clientId = clientId
+            self.userdata = userdata
+            self.on_message = self.on_connect = self.on_disconnect = None
+            self.isConnected = False
+
+        def username_pw_set(self, username, password=None):
+            ...
+
+        def reconnect_delay_set(self, minDelay, maxDelay):
+            ...
+
+        def connect(self, host, port, *args, **kwargs):
+            return 0
+
+        def loop_start(self):
+            if (self.isConnected == False):
+                self.isConnected = True
+                self.on_connect(self, self.userdata, {}, 0)
+
+        def loop_stop(self, *args, **kwargs):
+            ...
+
+        def disconnect(self, *args, **kwargs):
+            if (self.isConnected):
+                self.isConnected = False
+                self.on_disconnect(self, self.userdata, 0)
+
+        def subscribe(self, topic, *args, **kwargs):
+            return (0, None)
+
+        def unsubscribe(self, topic, *args, **kwargs):
+            return (0, None)
+
+        def publish(self, topic, payload=None, *args, **kwargs):
+            self.broker.published.append((topic, bytes(payload) if payload != None else b""))
+
+    def __newClient(self, clientId: str, userdata: Any) -> "OfflineBroker.Client":
+        client = OfflineBroker.Client(self, clientId, userdata)
+        self.__clients.append(client)
+        return client
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        """
+        Delivers a message to the connected clients
+        """
+        message = SimpleNamespace(topic=topic, payload=payload)
+        for client in list(self.__clients):
+            if (client.isConnected):
+                client.on_message(client, client.userdata, message)
+
+
+class SessionReplayer:
+    """
+    Feeds recorded messages back, at real time (speed 1), faster (speed > 1) or at max speed (speed None)
+    """
+
+    def __init__(self, path: str, speed: float or None = None, clock: clk.Clock = clk.clock,
+                 sleep: Callable[[float], None] = time.sleep):
+        if (speed != None and speed <= 0):
+            raise ValueError("Replay speed must be positive, or None for max speed")
+        self.__path = path
+        self.__speed = speed
+        self.__clock = clock
+        self.__sleep = sleep
+        self.metadata = readSessionMetadata(path)
+
+    def replay(self, deliver: Callable[[str, bytes], None],
+               onMessage: Callable[[RecordedMessage], None] or None = None) -> int:
+        """
+        Calls deliver(topic, payload) for each message, then onMessage(message) if given,
+        and returns the number of messages replayed
+        """
+        count = 0
+        start = self.__clock.now()
+        for message in readSession(self.__path):
+            if (self.__speed != None):
+                delay = start + message.timestamp / self.__speed - self.__clock.now()
+                if (delay > 0):
+                    self.__sleep(delay / 1e9)
+            deliver(message.topic, message.payload)
+            if (onMessage != None):
+                onMessage(message)
+            count += 1
+        return count
@@ -25,6 +25,8 @@ sys.path.append(__libdir__)
 
 import pyrobotx.client as rbx
 import pyanalytx.logger as anx
+import pytactx.firepath as fpx
+import pytactx.sources as srx
 from typing import Any, Callable
 import copy
 import traceback
@@ -393,25 +395,20 @@ class IAgent:
         ...
 
 
-def exploreSourcesDirs(rootpath, subdirs=[], takeOnlyExts=['.py', '.json'], dontTakeExts=[],
-                       dontTakeFolders=["venv", "j2l"], takeHidden=False, recursive=True, explored={}):
+def exploreSourcesDirs(rootpath, subdirs=None, takeOnlyExts=('.py', '.json'), dontTakeExts=(),
+                       dontTakeFolders=("venv", "j2l"), takeHidden=False, recursive=True, explored=None):
+    if (subdirs == None):
+        subdirs = []
+    if (explored == None):
+        explored = {}
     dirpath = os.path.join(rootpath, *subdirs)
     filenames = os.listdir(dirpath)
     for filefullname in filenames:
         filefullpath = os.path.join(dirpath, filefullname)
         filename, fileext = os.path.splitext(filefullname)
-        if (fileext in dontTakeExts):
-            continue  # Not blacklist exts
-        if (len(fileext) > 0 and len(takeOnlyExts) > 0 and fileext not in takeOnlyExts):
-            continue  # Only whitelist exts
-        if (recursive == False and len(fileext) == 0):
-            continue  # Recursive folder
-        if (len(filename) >= 2 and filename[0] == "." and filename[1] != "." and takeHidden == False):
-            continue  # No hidden folder
-        if (filename in dontTakeFolders and len(fileext) == 0):
-            continue  # No env folder
-        if (len(filename) >= 2 and filename[0] == "_" and filename[1] == "_" and takeHidden == False):
-            continue  # No hidden folder
+        if (not srx.isSourceTaken(filename, fileext, takeOnlyExts, dontTakeExts, dontTakeFolders,
+                                  takeHidden, recursive)):
+            continue
         if (len(fileext) == 0):  # Recursive folder explore
             subdirsRecursive = subdirs.copy()
             subdirsRecursive.append(filefullname)
@@ -429,7 +426,7 @@ def exploreSourcesDirs(rootpath, subdirs=[], takeOnlyExts=['.py', '.json'], dont
     return explored
 
 
-def fetchSources(dirpath=None):
+def findSourcesRoot(dirpath=None):
     if (dirpath == None):
         dirpath = __workdir__
     # Find main.py
@@ -444,30 +441,39 @@ def fetchSources(dirpath=None):
         anx.debug("main.py not found")
         return None
     anx.debug("Found main.py from agent.py at depth " + str(-depth))
-    # Explorer all folders from main.py
-    srcs = exploreSourcesDirs(dirpath)
-    return srcs
+    return dirpath
+
+
+def fetchSources(dirpath=None):
+    dirpath = findSourcesRoot(dirpath)
+    if (dirpath == None):
+        return None
+    # Explorer all folders from main.py, only reading files changed since the last run
+    return srx.SourcesSnapshot(dirpath).scan()
 
 
 class Agent(IAgent):
+    listenerPriority = 100  # Priority of the agent listeners on robot events
     def __init__(self, playerId: str or None = None, arena: str or None = None, username: str or None = None,
                  password: str or None = None, server: str or None = None, port: int = 1883,
                  imgOutputPath: str or None = "img.jpeg", autoconnect: bool = True, waitArenaConnection: bool = True,
                  verbosity: int = 3, robotId: str or None = "_", welcomePrint: bool = True,
-                 sourcesdir: str or None = None):
+                 sourcesdir: str or None = None, connectionPool: rbx.BrokerConnectionPool or None = None,
+                 record: str or None = None, robot: rbx.IRobot or None = None):
         while (playerId == None or len(playerId) > 32 or len(playerId) == 0):
             playerId = input("👾 id (< 12 characters): ")
-        while (server == None or len(server) == 0):
+        # A given robot (e.g. a simulated one) needs no broker credentials
+        while (robot == None and (server == None or len(server) == 0)):
             server = input("🌐 url: ")
             port = int(input("📫 port: "))
-        if (arena == None):
+        if (arena == None and robot == None):
             arena = input("🎲 arena: ")
-        if (username == None):
+        if (username == None and robot == None):
             username = input("🧑 username: ")
-        if (password == None):
+        if (password == None and robot == None):
             password = getpass("🔑 password: ")
 
-        if (welcomePrint):
+        if (welcomePrint and robot == None):
             passwordParam = (base64.b64encode(password.encode('utf-8'))).decode('utf-8')
             print("Hi there 👋")
             print(
@@ -482,7 +488,13 @@ class Agent(IAgent):
 
         IAgent.__init__(self)
         self.__sourcesDir: str or None = sourcesdir
-        self.__firstArenaRx: bool = False
+        # Sources are only uploaded to a real arena
+        self.__firstArenaRx: bool or None = False if robot == None else None
+        self.__sourcesTarget: str = str(server) + ":" + str(port) + "/" + str(arena) + "/" + str(playerId)
+        self.__sourcesFuture = None
+        self.__sourcesSnapshot: srx.SourcesSnapshot or None = None
+        # Sources requested, marked as sent once the request left the client
+        self.__sourcesSending: dict[str, tuple] or None = None
         self.__playerReqBuf: dict[str, Any] = {}
         self.__firepath: Callable[[int], int] or None = None
         self.__playerKeyToAttribute = {
@@ -526,12 +538,16 @@ class Agent(IAgent):
         self.__onAttributeChangeCallbacks: dict[str, Callable[[Agent, str, Any, Any], None]] = {}
         for attribute in self.__playerKeyToAttribute.values():
             self.__onAttributeChangeCallbacks[attribute[0]] = []
-        self.robot: rbx.IRobot = rbx.OvaClientMqtt(robotId, arena, username, password, server, port, imgOutputPath,
-                                                   autoconnect, True, verbosity, playerId, False)
-        self.robot.addEventListener(rbx.RobotEvent.updated, self._onUpdated)
-        self.robot.addEventListener(rbx.RobotEvent.robotConnected, self._onRobotConnected)
-        self.robot.addEventListener(rbx.RobotEvent.playerChanged, self._onPlayerChanged)
-        self.robot.addEventListener(rbx.RobotEvent.arenaChanged, self._onArenaChanged)
+        if (robot == None):
+            robot = rbx.OvaClientMqtt(robotId, arena, username, password, server, port, imgOutputPath,
+                                      autoconnect, True, verbosity, playerId, False,
+                                      pool=connectionPool, record=record)
+        self.robot: rbx.IRobot = robot
+        # Agent listeners run first, so that user listeners see the agent up to date
+        self.robot.addEventListener(rbx.RobotEvent.updated, self._onUpdated, Agent.listenerPriority)
+        self.robot.addEventListener(rbx.RobotEvent.robotConnected, self._onRobotConnected, Agent.listenerPriority)
+        self.robot.addEventListener(rbx.RobotEvent.playerChanged, self._onPlayerChanged, Agent.listenerPriority)
+        self.robot.addEventListener(rbx.RobotEvent.arenaChanged, self._onArenaChanged, Agent.listenerPriority)
         if (waitArenaConnection):
             print("⌛🌐 ", end="")
             while self.isConnectedToArena() == False or len(self.game) == 0:
@@ -662,59 +678,37 @@ class Agent(IAgent):
     def _onUpdated(self, eventSrc: Any, eventName: str, eventValue: Any):
         if (self.__firstArenaRx != None and self.__firstArenaRx == True):
             self.__firstArenaRx = None
-            self.robot.requestPlayer("nExe", fetchSources(self.__sourcesDir))
+            self.__sourcesFuture = self.__fetchSourcesAsync()
+        if (self.__sourcesSending != None and self.robot.isPlayerRequestPending('nExe') == False):
+            srx.markSentAsync(self.__sourcesSnapshot, self.__sourcesTarget, self.__sourcesSending)
+            self.__sourcesSending = None
+        if (self.__sourcesFuture != None and self.__sourcesFuture.done()):
+            if (self.__sourcesFuture.exception() == None):
+                self.__sourcesSending = self.__sourcesFuture.result()
+                self.__playerReqBuf['nExe'] = self.__sourcesSending
+            self.__sourcesFuture = None
         if ('fire' in self.__playerReqBuf and self.__firepath != None):
-            x = self.x
-            y = self.y
-            gridDim = self.gridColumns * self.gridRows
-            t = 0
-            pts = []
-            while (x >= 0 and x < self.gridColumns and y >= 0 and y < self.gridRows and t < gridDim):
-                if (self.dir == 0):
-                    fx = self.y - int(round(self.__firepath(x - self.x)))
-                    n = len(pts)
-                    for yfx in range(y - 1, fx - 1, -1):
-                        pts.append((x, yfx))
-                    if (n == len(pts)):
-                        pts.append((x, y))
-                    y = fx
-                    x = x + 1
-                elif (self.dir == 1):
-                    fx = self.x - int(round(self.__firepath(self.y - y)))
-                    n = len(pts)
-                    for xfx in range(x - 1, fx - 1, -1):
-                        pts.append((xfx, y))
-                    if (n == len(pts)):
-                        pts.append((x, y))
-                    x = fx
-                    y = y - 1
-                elif (self.dir == 2):
-                    fx = self.y + int(round(self.__firepath(self.x - x)))
-                    n = len(pts)
-                    for yfx in range(y + 1, fx + 1, 1):
-                        pts.append((x, yfx))
-                    if (n == len(pts)):
-                        pts.append((x, y))
-                    y = fx
-                    x = x - 1
-                elif (self.dir == 3):
-                    fx = self.x + int(round(self.__firepath(y - self.y)))
-                    n = len(pts)
-                    for xfx in range(x + 1, fx + 1, 1):
-                        pts.append((xfx, y))
-                    if (n == len(pts)):
-                        pts.append((x, y))
-                    x = fx
-                    y = y + 1
-                else:
-                    break
-                t = t + 1
+            pts = list(fpx.computeFirepath(self.__firepath, self.x, self.y, self.dir,
+                                           self.gridColumns, self.gridRows))
             anx.debug("Firing: " + str(pts))
             self.__playerReqBuf['fire'] = pts
         for requestKey, requestValue in self.__playerReqBuf.items():
             self.robot.requestPlayer(requestKey, requestValue)
         self.__playerReqBuf = {}
 
+    def __fetchSourcesAsync(self):
+        """
+        Sends the sources not sent yet during this run, computed in background
+        not to delay the first updates on large projects
+        """
+        rootpath = findSourcesRoot(self.__sourcesDir)
+        if (rootpath == None):
+            self.__playerReqBuf['nExe'] = None
+            return None
+        if (self.__sourcesSnapshot == None or self.__sourcesSnapshot.rootpath != rootpath):
+            self.__sourcesSnapshot = srx.SourcesSnapshot(rootpath)
+        return srx.fetchSourcesAsync(self.__sourcesSnapshot, self.__sourcesTarget)
+
     def __afterRobotConnected(self):
         self.robot.setMotorSpeed(0, 0)
 
@@ -841,19 +835,21 @@ class AgentFr(IAgentFr):
     def __init__(self, nom: str or None = None, arene: str or None = None, username: str or None = None,
                  password: str or None = None, url: str or None = None, port: int = 1883,
                  fluxImage: str or None = "img.jpeg", autoconnect: bool = True, proxy: bool = True, verbosite: int = 3,
-                 robotId: str or None = "_", welcomePrint=True, sourcesdir: str or None = None):
+                 robotId: str or None = "_", welcomePrint=True, sourcesdir: str or None = None,
+                 robot: rbx.IRobot or None = None):
         while (nom == None or len(nom) > 32 or len(nom) == 0):
             nom = input("👾 pseudo (< 12 caracteres): ")
-        while (url == None or len(url) == 0):
+        # Un robot fourni (ex: simule) n'a pas besoin des identifiants du broker
+        while (robot == None and (url == None or len(url) == 0)):
             url = input("🌐 url: ")
             port = int(input("📫 port: "))
-        if (arene == None):
+        if (arene == None and robot == None):
             arene = input("🎲 arene: ")
-        if (username == None):
+        if (username == None and robot == None):
             username = input("🧑 identifiant: ")
-        if (password == None):
+        if (password == None and robot == None):
             password = getpass("🔑 mot de passe: ")
-        if (welcomePrint):
+        if (welcomePrint and robot == None):
             passwordParam = (base64.b64encode(password.encode('utf-8'))).decode('utf-8')
             print("Hey 👋")
             print(
@@ -879,7 +875,7 @@ class AgentFr(IAgentFr):
             "isGamePaused": "jeuEnPause", "gridColumns": "tailleGrilleColonnes", "gridRows": "tailleGrilleLignes"
         }
         self.__agent = Agent(nom, arene, username, password, url, port, fluxImage, autoconnect, proxy, verbosite,
-                             robotId, False, sourcesdir)
+                             robotId, False, sourcesdir, robot=robot)
         self.robot = self.__agent.robot
 
     def connecter(self) -> bool:
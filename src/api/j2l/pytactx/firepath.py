@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
+
+# For each dir from 0 (east) to 3 (south):
+# (axis along which the bullet goes (0 for x, 1 for y), sign along this axis, sign of the firepath offset)
+__dirToAxes = {
+    0: (0, 1, -1),
+    1: (1, -1, -1),
+    2: (0, -1, 1),
+    3: (1, 1, 1),
+}
+
+
+def sampleFirepath(firepath: Callable[[int], int], n: int) -> np.ndarray:
+    """
+    Returns the rounded values of firepath(0) ... firepath(n-1) as an int array.
+    Tries to call the firepath once on the whole array, else calls it for each sample.
+    Only an array of n values is taken from the whole array call: a single value
+    (e.g. a constant or random firepath) may differ from one sample to another.
+    """
+    samples = np.arange(n)
+    try:
+        values = firepath(samples)
+    except (TypeError, ValueError):
+        values = None
+    if (not isinstance(values, np.ndarray) or values.shape != (n,)):
+        values = np.array([firepath(int(k)) for k in samples], dtype=float).reshape(n)
+    return np.rint(values.astype(float)).astype(np.int64)
+
+
+def rasterizeFirepath(firepath: Callable[[int], int], x: int, y: int, dir: int,
+                      gridColumns: int, gridRows: int) -> tuple:
+    """
+    Returns the (x,y) cells crossed by a bullet fired from x,y towards dir,
+    following the firepath offset, until it leaves the grid.
+    """
+    if (dir not in __dirToAxes or x < 0 or x >= gridColumns or y < 0 or y >= gridRows):
+        return ()
+    axis, alongSign, offsetSign = __dirToAxes[dir]
+    along0, perp0 = (x, y) if axis == 0 else (y, x)
+    alongSize, perpSize = (gridColumns, gridRows) if axis == 0 else (gridRows, gridColumns)
+    n = alongSize - along0 if alongSign > 0 else along0 + 1
+    perp = np.empty(n + 1, dtype=np.int64)
+    perp[0] = perp0
+    perp[1:] = perp0 + offsetSign * sampleFirepath(firepath, n)
+    # Stop at the first step starting out of the grid
+    out = (perp[:n] < 0) | (perp[:n] >= perpSize)
+    nSteps = int(np.argmax(out)) if out.any() else n
+    if (nSteps == 0):
+        return ()
+    start = offsetSign * perp[:nSteps]
+    end = offsetSign * perp[1:nSteps + 1]
+    # Each step draws a line from start to end, or only its own cell if not moving forward
+    lengths = np.maximum(end - start, 0)
+    counts = np.maximum(lengths, 1)
+    steps = np.repeat(np.arange(nSteps), counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    perps = np.where(np.repeat(lengths > 0, counts),
+                     offsetSign * (np.repeat(start, counts) + 1 + offsets),
+                     np.repeat(perp[:nSteps], counts))
+    alongs = along0 + alongSign * steps
+    xs, ys = (alongs, perps) if axis == 0 else (perps, alongs)
+    return tuple(zip(xs.tolist(), ys.tolist()))
+
+
+@lru_cache(maxsize=256)
+def __cachedFirepath(firepath, x, y, dir, gridColumns, gridRows) -> tuple:
+    return rasterizeFirepath(firepath, x, y, dir, gridColumns, gridRows)
+
+
+def computeFirepath(firepath: Callable[[int], int], x: int, y: int, dir: int,
+                    gridColumns: int, gridRows: int) -> tuple:
+    """
+    Same as rasterizeFirepath, cached by (firepath, x, y, dir, gridColumns, gridRows).
+    Reuse the same firepath function between fires to benefit from the cache.
+    """
+    try:
+        return __cachedFirepath(firepath, x, y, dir, gridColumns, gridRows)
+    except TypeError:  # Unhashable firepath
+        return rasterizeFirepath(firepath, x, y, dir, gridColumns, gridRows)
+
+
+computeFirepath.cache_info = __cachedFirepath.cache_info
+computeFirepath.cache_clear = __cachedFirepath.cache_clear
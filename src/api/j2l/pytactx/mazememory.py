@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+"""
+Memory of the maze cells a bot has seen, and planner of the shortest known paths.
+
+Cells are kept in a grid of tile values, UNKNOWN (-1) until observed. Paths are planned
+ with D* Lite: unknown cells are assumed walkable, and when observations change the cost
+ of some cells, only the part of the search these cells affect is repaired, so
+ replanning at each step costs much less than a new search.
+Entering a cell costs 1 / friction of its tile (see the mapFriction rule), 1 if unknown.
+"""
+
+import heapq
+from typing import Any, Iterable
+
+import numpy as np
+
+UNKNOWN = -1
+FLOOR = 0
+DEFAULT_FRICTION = (1, 0, 0.5, 0.1, 1, 0)
+
+_inf = float("inf")
+
+
+def discOffsets(radius: int) -> tuple:
+    """
+    Returns the (dy, dx) offsets of the cells within radius of a center cell
+    """
+    span = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(span, span, indexing="ij")
+    inside = dy * dy + dx * dx <= radius * radius
+    return dy[inside], dx[inside]
+
+
+class MazeMemory:
+    """
+    Grid of the observed cells of a maze, with a D* Lite planner towards a goal cell.
+    Cells are (x, y) tuples, the grid is indexed as [y, x] like the arena map.
+    """
+
+    def __init__(self, gridColumns: int, gridRows: int, friction: Iterable[float] = DEFAULT_FRICTION,
+                 unknownCost: float = 1.0):
+        self.columns = gridColumns
+        self.rows = gridRows
+        self.grid = np.full((gridRows, gridColumns), UNKNOWN, dtype=np.int8)
+        friction = [float(f) for f in friction]
+        self.__tileCost = [1.0 / f if f > 0 else _inf for f in friction]
+        self.__unknownCost = unknownCost
+        self.__cost = [unknownCost] * (gridColumns * gridRows)
+        finite = [c for c in self.__tileCost if c != _inf]
+        self.__minCost = min(finite + [unknownCost])
+        self.__goal = None
+        self.__start = None
+        self.__last = None
+        self.__km = 0.0
+        self.__g = None
+        self.__rhs = None
+        self.__open = {}
+        self.__heap = []
+        self.__changed = []
+        # Number of cells expanded by the searches, to follow the cost of replanning
+        self.expanded = 0
+
+    # --- Observations ---
+
+    def isKnown(self, x: int, y: int) -> bool:
+        return 0 <= x < self.columns and 0 <= y < self.rows and self.grid[y, x] != UNKNOWN
+
+    def tile(self, x: int, y: int) -> int:
+        """
+        Returns the tile of the cell, UNKNOWN if not observed yet
+        """
+        return int(self.grid[y, x])
+
+    def isWalkable(self, x: int, y: int) -> bool:
+        """
+        Returns True if the cell is in the grid and not known to be blocked
+        """
+        return 0 <= x < self.columns and 0 <= y < self.rows and self.__cost[y * self.columns + x] != _inf
+
+    def __costOf(self, tile: int) -> float:
+        if (tile == UNKNOWN):
+            return self.__unknownCost
+        if (tile < 0 or tile >= len(self.__tileCost)):
+            return _inf
+        return self.__tileCost[tile]
+
+    def observeCell(self, x: int, y: int, tile: int) -> bool:
+        """
+        Records the tile of a cell, returns True if it was not known as such
+        """
+        if (x < 0 or x >= self.columns or y < 0 or y >= self.rows or self.grid[y, x] == tile):
+            return False
+        self.grid[y, x] = tile
+        cell = y * self.columns + x
+        cost = self.__costOf(tile)
+        if (cost != self.__cost[cell]):
+            self.__cost[cell] = cost
+            self.__changed.append(cell)
+        return True
+
+    def observe(self, x: int, y: int, radius: int, tiles) -> int:
+        """
+        Records the tiles of the map within radius of (x, y), as seen by the bot from there.
+        Returns the number of cells that changed.
+        """
+        tiles = np.asarray(tiles)
+        if (tiles.ndim != 2 or tiles.size == 0):
+            return 0
+        dy, dx = discOffsets(max(0, int(radius)))
+        ys, xs = dy + int(y), dx + int(x)
+        rows, columns = min(self.rows, tiles.shape[0]), min(self.columns, tiles.shape[1])
+        inside = (xs >= 0) & (xs < columns) & (ys >= 0) & (ys < rows)
+        ys, xs = ys[inside], xs[inside]
+        seen = tiles[ys, xs].astype(np.int8)
+        changed = np.flatnonzero(self.grid[ys, xs] != seen)
+        for i in changed.tolist():
+            self.observeCell(int(xs[i]), int(ys[i]), int(seen[i]))
+        return len(changed)
+
+    def observeRange(self, agentsInRange: dict) -> int:
+        """
+        Records the cells of the agents in range (e.g. Agent.range) as walkable, if unknown.
+        Returns the number of cells that changed.
+        """
+        changed = 0
+        if (agentsInRange == None):
+            return changed
+        for state in agentsInRange.values():
+            if (isinstance(state, dict) == False or "x" not in state or "y" not in state):
+                continue
+            x, y = int(state["x"]), int(state["y"])
+            if (self.isKnown(x, y) == False):
+                changed += self.observeCell(x, y, FLOOR)
+        return changed
+
+    def observeAgent(self, agent: Any, radius: int or None = None) -> int:
+        """
+        Records what an Agent sees from its position: the map around it, and the agents in range.
+        The radius defaults to the range rule of the agent's profile.
+        """
+        if (radius == None):
+            ranges = agent.game.get("range", [0]) if isinstance(agent.game, dict) else [0]
+            profile = agent.profile if agent.profile < len(ranges) else 0
+            radius = ranges[profile] if len(ranges) > 0 else 0
+        changed = self.observe(agent.x, agent.y, radius, agent.map) if agent.map else 0
+        return changed + self.observeRange(agent.range)
+
+    def attach(self, agent: Any, radius: int or None = None) -> None:
+        """
+        Observes the agent each time it moves or its range changes
+        """
+        def onChanged(eventSrc, attributeName, valueBefore, valueAfter):
+            self.observeAgent(eventSrc, radius)
+        for attributeName in ("x", "y", "range"):
+            agent.addEventListener(attributeName, onChanged)
+
+    def locate(self, tile: int) -> list:
+        """
+        Returns the (x, y) cells known to hold the tile (e.g. the battery)
+        """
+        ys, xs = np.nonzero(self.grid == tile)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def frontier(self) -> list:
+        """
+        Returns the known walkable cells next to an unknown cell, the targets of exploration
+        """
+        known = self.grid != UNKNOWN
+        walkable = known & np.isfinite(np.array(self.__cost, dtype=float).reshape(self.grid.shape))
+        nextToUnknown = np.zeros_like(known)
+        nextToUnknown[1:, :] |= ~known[:-1, :]
+        nextToUnknown[:-1, :] |= ~known[1:, :]
+        nextToUnknown[:, 1:] |= ~known[:, :-1]
+        nextToUnknown[:, :-1] |= ~known[:, 1:]
+        ys, xs = np.nonzero(walkable & nextToUnknown)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def nearestFrontier(self, x: int, y: int) -> tuple or None:
+        """
+        Returns the frontier cell the fewest known walkable steps away from (x, y), None if explored
+        """
+        columns, cells = self.columns, self.columns * self.rows
+        grid = self.grid.ravel()
+        cost = self.__cost
+        start = y * columns + x
+        seen = {start}
+        queue = [start]
+        for cell in queue:
+            cx = cell % columns
+            neighbours = (cell - columns, cell + columns,
+                          cell - 1 if cx > 0 else -1, cell + 1 if cx < columns - 1 else -1)
+            if (grid[cell] != UNKNOWN and any(0 <= n < cells and grid[n] == UNKNOWN for n in neighbours)):
+                return (cx, cell // columns)
+            for n in neighbours:
+                if (0 <= n < cells and n not in seen and grid[n] != UNKNOWN and cost[n] != _inf):
+                    seen.add(n)
+                    queue.append(n)
+        return None
+
+    # --- D* Lite ---
+
+    @property
+    def goal(self) -> tuple or None:
+        return None if self.__goal == None else (self.__goal % self.columns, self.__goal // self.columns)
+
+    def setGoal(self, x: int, y: int) -> None:
+        """
+        Plans towards a new goal cell, from scratch
+        """
+        cells = self.columns * self.rows
+        self.__goal = y * self.columns + x
+        self.__start = self.__last = None
+        self.__km = 0.0
+        self.__g = [_inf] * cells
+        self.__rhs = [_inf] * cells
+        self.__rhs[self.__goal] = 0.0
+        self.__open = {}
+        self.__heap = []
+        self.__changed = []
+        self.__push(self.__goal, (self.__h(self.__goal), 0.0))
+
+    def __h(self, cell: int) -> float:
+        """
+        Manhattan distance from the start to the cell, times the cheapest cost
+        """
+        if (self.__start == None):
+            return 0.0
+        columns = self.columns
+        return (abs(cell % columns - self.__start % columns)
+                + abs(cell // columns - self.__start // columns)) * self.__minCost
+
+    def __key(self, cell: int) -> tuple:
+        best = min(self.__g[cell], self.__rhs[cell])
+        return (best + self.__h(cell) + self.__km, best)
+
+    def __push(self, cell: int, key: tuple) -> None:
+        self.__open[cell] = key
+        heapq.heappush(self.__heap, (key, cell))
+
+    def __top(self) -> tuple:
+        """
+        Returns the smallest (key, cell) of the open list, dropping outdated entries
+        """
+        heap = self.__heap
+        while heap:
+            key, cell = heap[0]
+            if (self.__open.get(cell) == key):
+                return key, cell
+            heapq.heappop(heap)
+        return (_inf, _inf), None
+
+    def __neighbours(self, cell: int) -> tuple:
+        columns, cells = self.columns, self.columns * self.rows
+        x = cell % columns
+        return tuple(n for n in (cell - columns, cell + columns,
+                                 cell - 1 if x > 0 else -1, cell + 1 if x < columns - 1 else -1)
+                     if 0 <= n < cells)
+
+    def __updateVertex(self, cell: int) -> None:
+        if (cell != self.__goal):
+            g, cost = self.__g, self.__cost
+            self.__rhs[cell] = min((cost[n] + g[n] for n in self.__neighbours(cell)), default=_inf)
+        self.__open.pop(cell, None)
+        if (self.__g[cell] != self.__rhs[cell]):
+            self.__push(cell, self.__key(cell))
+
+    def __computeShortestPath(self) -> None:
+        start = self.__start
+        g, rhs = self.__g, self.__rhs
+        while True:
+            key, cell = self.__top()
+            if (cell == None or (key >= self.__key(start) and rhs[start] == g[start])):
+                return
+            self.expanded += 1
+            newKey = self.__key(cell)
+            if (key < newKey):
+                self.__push(cell, newKey)
+            elif (g[cell] > rhs[cell]):
+                g[cell] = rhs[cell]
+                del self.__open[cell]
+                for n in self.__neighbours(cell):
+                    self.__updateVertex(n)
+            else:
+                g[cell] = _inf
+                self.__updateVertex(cell)
+                for n in self.__neighbours(cell):
+                    self.__updateVertex(n)
+
+    def __replan(self, x: int, y: int) -> None:
+        self.__start = y * self.columns + x
+        if (self.__last == None):
+            self.__last = self.__start
+            # Keys of the cells queued before the start was known lacked the heuristic
+            for cell in list(self.__open):
+                self.__push(cell, self.__key(cell))
+        elif (self.__last != self.__start):
+            # Keys already queued were computed from the previous start
+            self.__km += self.__h(self.__last)
+            self.__last = self.__start
+        if (len(self.__changed) > 0):
+            changed, self.__changed = self.__changed, []
+            for cell in set(changed):
+                # Entering the cell costs differently: its neighbours' best moves change
+                for n in self.__neighbours(cell):
+                    self.__updateVertex(n)
+        self.__computeShortestPath()
+
+    def distanceToGoal(self, x: int, y: int) -> float:
+        """
+        Returns the cost of the shortest known path from (x, y) to the goal, inf if none
+        """
+        if (self.__goal == None):
+            return _inf
+        self.__replan(x, y)
+        return self.__g[self.__start]
+
+    def nextStep(self, x: int, y: int) -> tuple or None:
+        """
+        Returns the next cell to move to from (x, y) towards the goal, None if at the goal or stuck
+        """
+        if (self.__goal == None or self.distanceToGoal(x, y) == _inf or self.__start == self.__goal):
+            return None
+        g, cost = self.__g, self.__cost
+        best = min(self.__neighbours(self.__start), key=lambda n: cost[n] + g[n])
+        return (best % self.columns, best // self.columns)
+
+    def planPath(self, x: int, y: int) -> list:
+        """
+        Returns the cells of the shortest known path from (x, y), excluded, to the goal
+        """
+        path = []
+        if (self.__goal == None or self.distanceToGoal(x, y) == _inf):
+            return path
+        g, cost = self.__g, self.__cost
+        cell = self.__start
+        while cell != self.__goal and len(path) < self.columns * self.rows:
+            cell = min(self.__neighbours(cell), key=lambda n: cost[n] + g[n])
+            path.append((cell % self.columns, cell // self.columns))
+        return path
+
+    def explore(self, x: int, y: int) -> tuple or None:
+        """
+        Returns the next cell to move to from (x, y) to discover the maze, None once explored.
+        The goal is the nearest frontier cell, until it is reached or no longer a frontier.
+        """
+        goal = self.goal
+        if (goal == None or goal == (x, y) or self.__isFrontier(*goal) == False):
+            goal = self.nearestFrontier(x, y)
+            if (goal == None):
+                return None
+            if (goal == (x, y)):
+                # Step into an unknown neighbour to reveal it
+                for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if (self.isWalkable(nx, ny) and self.isKnown(nx, ny) == False):
+                        return (nx, ny)
+            self.setGoal(*goal)
+        return self.nextStep(x, y)
+
+    def __isFrontier(self, x: int, y: int) -> bool:
+        if (self.isKnown(x, y) == False or self.isWalkable(x, y) == False):
+            return False
+        return any(0 <= nx < self.columns and 0 <= ny < self.rows and self.isKnown(nx, ny) == False
+                   for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)))
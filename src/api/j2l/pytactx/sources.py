@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#                           ██╗██████╗ ██╗
+#                           ██║╚════██╗██║
+#                           ██║ █████╔╝██║
+#                      ██   ██║██╔═══╝ ██║
+#                      ╚█████╔╝███████╗███████╗
+#                       ╚════╝ ╚══════╝╚══════╝
+#                       https://jusdeliens.com
+#
+# Designed with 💖 by Jusdeliens
+# Under CC BY-NC-ND 3.0 licence
+# https://creativecommons.org/licenses/by-nc-nd/3.0/
+
+import os
+import sys
+
+__workdir__ = os.path.dirname(os.path.abspath(__file__))
+__libdir__ = os.path.dirname(__workdir__)
+sys.path.append(__libdir__)
+
+import pyanalytx.logger as anx
+import base64
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+CACHE_DIRNAME = "__pycache__"
+CACHE_FILENAME = "pytactx_sources.json"
+CACHE_VERSION = 2
+
+
+def isSourceTaken(filename: str, fileext: str, takeOnlyExts=('.py', '.json'), dontTakeExts=(),
+                  dontTakeFolders=("venv", "j2l"), takeHidden=False, recursive=True) -> bool:
+    """
+    Returns True if the file or folder should be part of the sources
+    """
+    if (fileext in dontTakeExts):
+        return False  # Not blacklist exts
+    if (len(fileext) > 0 and len(takeOnlyExts) > 0 and fileext not in takeOnlyExts):
+        return False  # Only whitelist exts
+    if (recursive == False and len(fileext) == 0):
+        return False  # Recursive folder
+    if (len(filename) >= 2 and filename[0] == "." and filename[1] != "." and takeHidden == False):
+        return False  # No hidden folder
+    if (filename in dontTakeFolders and len(fileext) == 0):
+        return False  # No env folder
+    if (len(filename) >= 2 and filename[0] == "_" and filename[1] == "_" and takeHidden == False):
+        return False  # No hidden folder
+    return True
+
+
+class SourcesSnapshot:
+    """
+    Snapshot of the sources of a project, indexed by content hash.
+    Files are only read and encoded again when their mtime or size changed,
+    and the index is saved in the project __pycache__ to be reused on the next start.
+    The hashes of the files already sent to each arena are only kept in memory,
+    so that a new run sends all its sources (e.g. to an arena reset meanwhile),
+    then only the files changed since its last send.
+    """
+
+    def __init__(self, rootpath: str, cachePath: str or None = None, **filters):
+        self.__rootpath = rootpath
+        if (cachePath == None):
+            cachePath = os.path.join(rootpath, CACHE_DIRNAME, CACHE_FILENAME)
+        self.__cachePath = cachePath
+        self.__filters = filters
+        self.__files: dict[str, list] = {}
+        self.__sent: dict[str, dict[str, str]] = {}
+        self.__mutex = threading.Lock()
+        self.__load()
+
+    @property
+    def rootpath(self) -> str:
+        return self.__rootpath
+
+    @property
+    def cachePath(self) -> str:
+        return self.__cachePath
+
+    def __load(self) -> None:
+        try:
+            with open(self.__cachePath, "r", encoding="utf-8") as cache:
+                content = json.load(cache)
+            if (content.get("version") != CACHE_VERSION):
+                return
+            self.__files = content["files"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.__files = {}
+
+    def save(self) -> None:
+        """
+        Writes the index in the cache file, silently ignored if not writable
+        """
+        with self.__mutex:
+            content = {"version": CACHE_VERSION, "files": self.__files}
+        try:
+            os.makedirs(os.path.dirname(self.__cachePath), exist_ok=True)
+            tmpPath = self.__cachePath + ".tmp"
+            with open(tmpPath, "w", encoding="utf-8") as cache:
+                json.dump(content, cache)
+            os.replace(tmpPath, self.__cachePath)
+        except OSError as e:
+            anx.debug("Cannot save sources cache " + self.__cachePath + ": " + str(e))
+
+    def __walk(self, subdirs: list[str], found: dict[str, tuple]) -> None:
+        dirpath = os.path.join(self.__rootpath, *subdirs)
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                filename, fileext = os.path.splitext(entry.name)
+                if (not isSourceTaken(filename, fileext, **self.__filters)):
+                    continue
+                if (len(fileext) == 0):  # Recursive folder explore
+                    if (entry.is_dir()):
+                        self.__walk(subdirs + [entry.name], found)
+                    continue
+                stat = entry.stat()
+                key = entry.path.replace(self.__rootpath, "")
+                found[key] = (subdirs, filename, fileext, entry.path, stat)
+
+    def __index(self, key: str, subdirs, filename, fileext, filepath, stat) -> list:
+        cached = self.__files.get(key)
+        if (cached != None and cached[4] == stat.st_mtime and cached[5] == stat.st_size):
+            return cached
+        with open(filepath, "rb") as src:
+            content = src.read()
+        # Decode then encode as before, to send the same bytes as the original exploration
+        content = content.decode("utf-8").encode("utf-8")
+        return [subdirs, filename, fileext, stat.st_ctime, stat.st_mtime, stat.st_size,
+                hashlib.blake2b(content, digest_size=16).hexdigest(),
+                (base64.b64encode(content)).decode('utf-8')]
+
+    def scan(self) -> dict[str, tuple]:
+        """
+        Returns all the sources as {path: (subdirs, filename, fileext, ctime, mtime, base64)}
+        only reading the files changed since the previous scan
+        """
+        found: dict[str, tuple] = {}
+        self.__walk([], found)
+        files = {key: self.__index(key, *value) for key, value in found.items()}
+        with self.__mutex:
+            self.__files = files
+        return {key: SourcesSnapshot.__toSource(entry) for key, entry in files.items()}
+
+    def delta(self, target: str) -> dict[str, tuple]:
+        """
+        Returns the sources changed since the last ones marked as sent to target
+        """
+        sources = self.scan()
+        with self.__mutex:
+            sent = self.__sent.get(target, {})
+            return {key: source for key, source in sources.items()
+                    if sent.get(key) != self.__files[key][6]}
+
+    def markSent(self, target: str, sources: dict[str, tuple]) -> None:
+        """
+        Records that the given sources were sent to target
+        """
+        with self.__mutex:
+            sent = self.__sent.setdefault(target, {})
+            for key in sources:
+                if (key in self.__files):
+                    sent[key] = self.__files[key][6]
+
+    def forget(self, target: str or None = None) -> None:
+        """
+        Forgets what was sent to target (or to all targets), to send all the sources again
+        """
+        with self.__mutex:
+            if (target == None):
+                self.__sent = {}
+            else:
+                self.__sent.pop(target, None)
+
+    @staticmethod
+    def __toSource(entry: list) -> tuple:
+        subdirs, filename, fileext, ctime, mtime, _size, _hash, b64 = entry
+        return (list(subdirs), filename, fileext, ctime, mtime, b64)
+
+
+def fetchSourcesAsync(snapshot: SourcesSnapshot, target: str) -> Future:
+    """
+    Computes the sources delta for target in a background thread.
+    The returned future gives the delta, to mark as sent (see markSentAsync) once actually sent.
+    """
+    future = Future()
+
+    def run():
+        if (not future.set_running_or_notify_cancel()):
+            return
+        try:
+            future.set_result(snapshot.delta(target))
+        except Exception as e:
+            anx.warning("⚠️ Cannot fetch sources: " + str(e))
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="pytactx-sources", daemon=True).start()
+    return future
+
+
+def markSentAsync(snapshot: SourcesSnapshot, target: str, sources: dict[str, tuple]) -> threading.Thread:
+    """
+    Records that the sources were sent to target, and saves the files index in a background thread
+    """
+    snapshot.markSent(target, sources)
+    thread = threading.Thread(target=snapshot.save, name="pytactx-sources", daemon=True)
+    thread.start()
+    return thread
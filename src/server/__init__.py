@@ -2,5 +2,5 @@
 Server package
 """
 
-__export__ = ["models", "state_machine", "arena_manager", "manager_interface"]
+__export__ = ["models", "state_machine", "arena_manager", "manager_interface", "metrics", "replay", "spatial", "monsters", "simulator", "tournament", "rules", "reloader", "timers"]
 
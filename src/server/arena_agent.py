@@ -6,6 +6,7 @@ import time
 from typing import Any
 
 from src.api.j2l.pytactx.agent import Agent
+from src.server.metrics import REGISTRY, TrafficMetrics
 
 
 class SyncAgent(Agent):
@@ -13,10 +14,15 @@ class SyncAgent(Agent):
     Handles event from agent and copy callbacks to Manager
     """
 
-    def __init__(self, user, arena, login, password, server, port):
+    def __init__(self, user, arena, login, password, server, port, **agent_kwargs):
+        """
+        :param agent_kwargs: extra Agent arguments, e.g. record="session.ovarec" to record
+         every message received and replay it offline (see src.server.replay)
+        """
         self.__logger = logging.getLogger("ArenaAgent")
         self.__context = None
-        super().__init__(user, arena, login, password, server, port)
+        super().__init__(user, arena, login, password, server, port, **agent_kwargs)
+        self.robot.setTrafficObserver(TrafficMetrics(REGISTRY))
 
     def set_context(self, context):
         from .arena_manager import ArenaManager
@@ -64,6 +70,11 @@ class SyncAgent(Agent):
         if self.__context:
             self.__context._on_update("robots count changed", valueBefore, valueAfter)
 
+    def _onRangeChanged(self, valueBefore: dict[str, Any], valueAfter: dict[str, Any]):
+        super()._onRangeChanged(valueBefore, valueAfter)
+        if self.__context:
+            self.__context.update_known_maps(valueAfter)
+
     def __enter__(self):
         """
         Connect to the server.
@@ -81,6 +92,7 @@ class SyncAgent(Agent):
         Disconnect from the server.
         """
         self.__logger.info("Disconnecting from server")
+        self.robot.stopRecording()
         self.disconnect()
         self.__logger.info("Disconnected from server")
         return True
@@ -5,22 +5,39 @@ Apply the rules of the arena.
 """
 from __future__ import annotations
 
-import json
 import logging
 import os
 from copy import copy
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Set, Tuple, Union
 
 import colorama
+import numpy as np
 
 import root_config
 from src.server.manager_interface import IManager
+from src.server.maze import DistanceField, Maze, ScoreRules, distance_field, generate_maze, grid_digest
+from src.server.maze.pathfinding import PathFinder
+from src.server.metrics import REGISTRY
 from src.server.models.player import Player
+from src.server.models.player_state import PlayerState
+from src.server.models.player_table import PlayerTable
+from src.server.monsters import MonsterController
+from src.server.reloader import ConfigReloader
+from src.server.rules import diff_rules, load_rules
+from src.server.spatial import SpatialGrid
 from src.server.state_machine import StateMachine, StateMachineConfig
+from src.server.state_machine.profiler import StateProfiler
 from src.server.state_machine.states.possible_states import StateEnum
+from src.server.timers import Timer, TimerWheel
 
 __current_dir__ = os.path.dirname(os.path.abspath(__file__))
 
+SCORE_TICK_MS = 100
+
+_UPDATE_SECONDS = REGISTRY.histogram("arbiter_update_seconds",
+                                     "Time to handle an arena update, by game state", ("state",))
+_RULES_SECONDS = REGISTRY.histogram("arbiter_rules_apply_seconds", "Time to apply rules to the arena")
+
 
 def _init_logger():
     colorama.init()
@@ -54,8 +71,29 @@ class ArenaManager(IManager):
         self._logger.setLevel(root_config.LOGGING_LEVEL)
         self.__start_time = 0
         self.__paused_time = 0
+        self.__timers = TimerWheel()
+        self.__match_end: Timer | None = None
+        self.__time_up = False
+        self.__score_rules = ScoreRules()
+        # Runtime state of the registered players, scored on each tick of the game,
+        #  with their collisions and profile seen, and who moved or collided since the last tick
+        self.__table = PlayerTable()
+        self.__collisions: Dict[str, int] = {}
+        self.__profiles: Dict[str, int] = {}
+        self.__moved: Set[str] = set()
+        self.__collided: Set[str] = set()
+        self.__grid_seen: Tuple[Any, np.ndarray | None] = (None, None)
         self.__game_running = False
-        self.__registered_players: List[Player] = []
+        self.__registered_players: List[PlayerState] = []
+        self.__players_by_name: Dict[str, PlayerState] = {}
+        self.__spatial = SpatialGrid()
+        self.__monsters: MonsterController | None = None
+        self.__monsters_started = False
+        self.__monsters_sent: List[Dict[str, Any]] = []
+        self.__maze: Maze | None = None
+        # The last map seen with its digest, and its distance fields by friction and dtMove
+        self.__map_seen: Tuple[Any, str] = (None, "")
+        self.__fields: Dict[Tuple[Tuple[float, ...], float], DistanceField | None] = {}
         self.__arena_rules_keys = set(agent.game.keys())
         self.__state_machine = StateMachine(self).define_states(StateMachineConfig())
         super().__init__(agent, self.__state_machine)
@@ -68,10 +106,10 @@ class ArenaManager(IManager):
 
         # define the rules of the arena
         self.display("🔴 Arène en cours de construction ")
-        with open(os.path.join(__current_dir__, "rules.json"), "r", encoding="utf-8") as json_file:
-            rules = json.load(json_file)
-            self.__update_rules(rules)
-            self.__time_limit = int(rules["timeLimit"])
+        self.__reloader: ConfigReloader | None = None
+        rules = load_rules(os.path.join(__current_dir__, "rules.json"))
+        self.__update_rules(rules)
+        self.__time_limit = int(rules["timeLimit"])
         self.restart()
         # change manager's State to wait for players
         self.display("En attente des joueurs...")
@@ -86,10 +124,14 @@ class ArenaManager(IManager):
         self._logger.debug(f"on_update : {self.state} => {other.__class__.__name__} "
                            f"Received : {event} : {value}")
         # Let curent state handle the update
-        self.__update_timers()
-        if isinstance(value, dict):
-            self.__update_rules(value)
-        self.__state_machine.handle()
+        with _UPDATE_SECONDS.time(state=self.state):
+            if self.__reloader is not None:
+                # Between two handlers: a safe point to apply a new configuration
+                self.__reloader.poll()
+            self.__update_timers()
+            if isinstance(value, dict):
+                self.__update_rules(value)
+            self.__state_machine.handle()
 
     @property
     def __all_players_dead(self) -> bool:
@@ -107,8 +149,100 @@ class ArenaManager(IManager):
         """
         Return False if the game time is elapsed.
         """
-        return (int(self.__rules["t"]) <=
-                self.__start_time + self.__paused_time + self.__time_limit)
+        self.__advance_timers()
+        return not self.__time_up
+
+    @property
+    def played_time(self) -> int:
+        """
+        Return the time played since the start of the game, without the pauses (ms).
+        """
+        return int(self.__rules["t"]) - self.__start_time - self.__paused_time
+
+    @property
+    def timers(self) -> TimerWheel:
+        """
+        Return the timers of the game, on the played time (reset on restart).
+        """
+        return self.__timers
+
+    def __advance_timers(self) -> None:
+        self.__timers.advance(self.played_time)
+
+    def __schedule_match_end(self) -> None:
+        if self.__match_end is not None:
+            self.__timers.cancel(self.__match_end)
+        self.__time_up = False
+        # The time limit itself is still played
+        self.__match_end = self.__timers.schedule(self.__time_limit + 1, self.__on_time_up)
+
+    def __on_time_up(self, deadline: int) -> None:
+        self._logger.info(f"Time limit reached after {deadline - 1}ms of game")
+        self.__time_up = True
+
+    def __track_moves(self, player: PlayerState, state: Dict[str, Any]) -> None:
+        """
+        Note the new position of a player, and if it moved or collided, to score it on the next tick.
+        """
+        # Score the ticks due before this update, so that they see the previous moves
+        self.__advance_timers()
+        name, table = player.name, self.__table
+        row = table.index_of(name)
+        x, y, collisions = int(state["x"]), int(state["y"]), int(state.get("nCollision", 0))
+        last = self.__collisions.get(name)
+        if last is not None:
+            if (x, y) != (int(table.x[row]), int(table.y[row])):
+                self.__moved.add(name)
+            if collisions > last:
+                self.__collided.add(name)
+        self.__collisions[name] = collisions
+        self.__profiles[name] = int(state.get("profile", 0))
+        table.x[row], table.y[row] = x, y
+
+    def __score_tick(self, deadline: int) -> None:
+        """
+        Apply the scoring rules (see PlayerTable.apply_tick) to the registered players for a tick of the game.
+        """
+        table = self.__table
+        names = table.names
+        moved = np.array([name in self.__moved for name in names], dtype=bool)
+        collided = np.array([name in self.__collided for name in names], dtype=bool)
+        self.__moved.clear()
+        self.__collided.clear()
+        grid = self.__grid()
+        if not names or grid is None:
+            return
+        rows, columns = grid.shape
+        x, y = table.view("x"), table.view("y")
+        if not ((x >= 0) & (x < columns) & (y >= 0) & (y < rows)).all():
+            self._logger.debug(f"Players out of the map at {deadline}ms, tick not scored")
+            return
+        # Moves are seen on the tick after them: one tick of slack before a streak is broken
+        move_period = np.array([self.__dt_move(self.__profiles.get(name, 0)) + SCORE_TICK_MS
+                                for name in names]) / 1000
+        gained = table.apply_tick(SCORE_TICK_MS / 1000, moved, collided, grid, self.__score_rules, move_period)
+        for name, points in zip(names, gained.tolist()):
+            player = self.__players_by_name.get(name)
+            if points and player is not None and player.health > 0:
+                player.add_score(points)
+
+    def __grid(self) -> np.ndarray | None:
+        """
+        Return the current map as an array, converted again only when the map changes.
+        """
+        _map = self.__rules.get("map")
+        if not _map:
+            return None
+        if self.__grid_seen[0] is not _map:
+            self.__grid_seen = (_map, np.asarray(_map, dtype=np.int16))
+        return self.__grid_seen[1]
+
+    def __dt_move(self, profile: int) -> float:
+        """
+        Return the time (ms) of a move on the floor for a profile.
+        """
+        dt_moves = self.__rules.get("dtMove", [300])
+        return float(dt_moves[profile] if profile < len(dt_moves) else dt_moves[0])
 
     @property
     def game_loop_running(self) -> bool:
@@ -135,7 +269,7 @@ class ArenaManager(IManager):
         return self.__rules
 
     @property
-    def registered_players(self) -> List[Player]:
+    def registered_players(self) -> List[PlayerState]:
         """
         Return the copy of the list of registered players.
         """
@@ -163,15 +297,39 @@ class ArenaManager(IManager):
 
     def __update_rules(self, rules: Dict[str, Any] = None) -> None:
         """
-        Set the rules of the arena.
+        Set the rules of the arena, sending only those that differ from the arena state.
         :param rules: the rules to set
         """
+        rules = diff_rules(rules or {}, self._robot.game)
         if not rules:
             return
         self._logger.debug(f"Updating rules to : {rules}")
-        for key, value in rules.items():
-            self._robot.ruleArena(key, value)
-        self._robot.update()
+        with _RULES_SECONDS.time():
+            for key, value in rules.items():
+                self._robot.ruleArena(key, value)
+            self._robot.update()
+
+    def apply_rules(self, rules: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply new rules during the game, and return those that were sent to the arena.
+        :param rules: the rules to set
+        """
+        changes = diff_rules(rules, self._robot.game)
+        self.__update_rules(changes)
+        if "timeLimit" in rules:
+            self.__time_limit = int(rules["timeLimit"])
+            self.__schedule_match_end()
+        return changes
+
+    def enable_hot_reload(self, interval: float = 1.0, **paths) -> ConfigReloader:
+        """
+        Watch rules.json and state_machine_config.json, and apply their changes without restarting.
+        :param interval: the minimum time (s) between two checks of the files
+        :param paths: rules_path and state_machine_path, to watch other files
+        """
+        paths.setdefault("rules_path", os.path.join(__current_dir__, "rules.json"))
+        self.__reloader = ConfigReloader(self.apply_rules, self.__state_machine, interval=interval, **paths)
+        return self.__reloader
 
     def set_pause(self, pause: bool) -> bool:
         """
@@ -189,11 +347,190 @@ class ArenaManager(IManager):
         """
         self._robot.ruleArena("map", _map)
         # self.update()
+        if self.__monsters is not None:
+            self.__monsters.set_finder(self.__path_finder(_map))
         if self.get_rules["map"] == _map:
             return True
         return False
 
-    def __get_player(self, player_id: Union[int | str]) -> Player:
+    def new_map(self, seed: int = None, **params) -> Maze:
+        """
+        Generate a new maze and set it as the map of the arena.
+        The same seed and parameters always give the same maze.
+        :param seed: the seed of the maze, a random one is drawn if None
+        :param params: the generation parameters (see MazeParams)
+        :return: the generated maze
+        """
+        params.setdefault("columns", int(self.__rules.get("gridColumns", 40)))
+        params.setdefault("rows", int(self.__rules.get("gridRows", 40)))
+        maze = generate_maze(seed, **params)
+        self._logger.info(f"New map : {maze}")
+        self.__maze = maze
+        self.set_map(maze.to_list())
+        return maze
+
+    @property
+    def maze(self) -> Maze | None:
+        """
+        Return the maze generated for the current game, if any.
+        """
+        return self.__maze
+
+    @property
+    def distance_field(self) -> DistanceField | None:
+        """
+        Return the distance field from the battery of the current map, for the players' profile (0),
+         or None if the map has no battery.
+        """
+        return self.profile_distance_field(0)
+
+    def profile_distance_field(self, profile: int = 0) -> DistanceField | None:
+        """
+        Return the distance field from the battery of the current map, moving at the dtMove of a profile,
+         or None if the map has no battery.
+        Fields are cached until the map changes, so this is cheap to call repeatedly.
+        """
+        _map = self.__rules.get("map")
+        if not _map:
+            return None
+        if self.__map_seen[0] is not _map:
+            # A new map object: its digest tells if the layout changed
+            digest = grid_digest(_map)
+            if digest != self.__map_seen[1]:
+                self.__fields = {}
+            self.__map_seen = (_map, digest)
+        dt_move = self.__dt_move(profile)
+        key = (tuple(self.__rules.get("mapFriction", [1, 0])), dt_move)
+        if key not in self.__fields:
+            kw = {}
+            if self.__maze is not None and self.__maze.digest == self.__map_seen[1]:
+                kw = {"battery": self.__maze.battery, "spawns": self.__maze.spawns}
+            self.__fields[key] = distance_field(_map, key[0], dt_move, **kw)
+        return self.__fields[key]
+
+    def __path_finder(self, _map: List[List[int]] = None) -> PathFinder:
+        """
+        Build the path finder of a map (the current one if None), guided by its distance field.
+        """
+        _map = _map if _map is not None else self.__rules.get("map")
+        if not _map:
+            raise ValueError("The arena has no map to find paths in")
+        friction = self.__rules.get("mapFriction", [1, 0])
+        dt_move = self.__rules.get("dtMove", [300])[0]
+        field = distance_field(_map, friction, dt_move)
+        return PathFinder(_map, friction, dt_move, field)
+
+    @property
+    def monsters(self) -> MonsterController | None:
+        """
+        Return the controller of the monsters hunting the players, if spawned.
+        """
+        return self.__monsters
+
+    def spawn_monsters(self, count: int = 1, **params) -> MonsterController:
+        """
+        Spawn monsters on the battery of the current map, or in its center if it has none.
+        :param count: the number of monsters to add
+        :param params: the parameters of the controller (see MonsterController)
+        :return: the controller of the monsters
+        """
+        if self.__monsters is None:
+            self.__monsters = MonsterController(self.__path_finder(), self.__spatial,
+                                                self.__is_alive_player, **params)
+        field = self.distance_field
+        if field is not None:
+            x, y = field.battery
+        else:
+            _map = self.__rules["map"]
+            x, y = len(_map[0]) // 2, len(_map) // 2
+        for _ in range(count):
+            monster = self.__monsters.spawn(x, y)
+            self._logger.info(f"Spawned {monster}")
+        return self.__monsters
+
+    def start_monsters(self) -> MonsterController | None:
+        """
+        Spawn the monsters of the rules (nMonsters) once per game, counting those already spawned.
+        :return: the controller of the monsters, None if the game has none
+        """
+        if not self.__monsters_started:
+            self.__monsters_started = True
+            spawned = len(self.__monsters.monsters) if self.__monsters is not None else 0
+            count = int(self.__rules.get("nMonsters", 0)) - spawned
+            if count > 0 and self.__rules.get("map"):
+                dt_moves = self.__rules.get("dtMove", [300])
+                self.spawn_monsters(count, dt_move=int(dt_moves[0]))
+        return self.__monsters
+
+    def __is_alive_player(self, name: str) -> bool:
+        player = self.__players_by_name.get(name)
+        return player is not None and player.health > 0
+
+    def update_monsters(self) -> List[str]:
+        """
+        Move the monsters for the current game time, and eliminate the players hit too many times.
+        :return: the names of the players eliminated by this update
+        """
+        if self.__monsters is None:
+            return []
+        eliminated = self.__monsters.update(int(self.__rules.get("t", 0)))
+        for name in eliminated:
+            self.kill_player(name)
+            self.display(f"💀 {name} a été éliminé par Minova !")
+        self.__publish_monsters()
+        return eliminated
+
+    def __publish_monsters(self) -> None:
+        """
+        Send the positions of the monsters to the arena (monsters rule), when they changed.
+        """
+        positions = [{"name": monster.name, "x": monster.x, "y": monster.y}
+                     for monster in self.__monsters.monsters]
+        if positions != self.__monsters_sent:
+            self.__monsters_sent = positions
+            self._robot.ruleArena("monsters", positions)
+
+    def report_efficiency(self) -> Dict[str, float]:
+        """
+        Compute and display the efficiency of each registered player,
+         that is the ratio between their score and the theoretical max score of the map.
+        :return: the efficiency of each player, by name
+        """
+        field = self.distance_field
+        if field is None:
+            self._logger.info("No battery on the map, cannot compute efficiency")
+            return {}
+        efficiency = {player.name: field.efficiency(player.score)
+                      for player in self.registered_players}
+        self._logger.info(f"Theoretical max score : {field.theoretical_max}, "
+                          f"efficiency : {efficiency}")
+        if efficiency:
+            self.display("🏆 " + ", ".join(f"{name} : {ratio:.0%}"
+                                           for name, ratio in efficiency.items()))
+        return efficiency
+
+    def update_known_maps(self, range_state: Dict[str, Any]) -> None:
+        """
+        Add what each registered player sees of the maze to its personal map.
+        :param range_state: the agents in range, by name, with their x and y positions
+        """
+        if not isinstance(range_state, dict):
+            return
+        columns = int(self.__rules.get("gridColumns", 40))
+        rows = int(self.__rules.get("gridRows", 40))
+        ranges = self.__rules.get("range", [0])
+        for player in self.registered_players:
+            state = range_state.get(player.name)
+            if not isinstance(state, dict) or "x" not in state or "y" not in state:
+                continue
+            self.__track_moves(player, state)
+            player.x, player.y = int(state["x"]), int(state["y"])
+            self.__spatial.update(player.name, player.x, player.y)
+            profile = int(state.get("profile", 0))
+            radius = ranges[profile] if profile < len(ranges) else ranges[0]
+            player.see(columns, rows, radius)
+
+    def __get_player(self, player_id: Union[int | str]) -> PlayerState:
         """
         Get a player from the arena.
         :param player_id: the id of the player to get
@@ -204,7 +541,7 @@ class ArenaManager(IManager):
                 self._logger.debug(f"Found player {player.name} in registered players")
                 return player
 
-    def kill_player(self, player: str) -> Player:
+    def kill_player(self, player: str) -> PlayerState:
         """
         Kill a player.
         :param player: player to kill
@@ -215,13 +552,15 @@ class ArenaManager(IManager):
         p.health = 0
         return p
 
-    def register_player(self, player: Player) -> Player:
+    def register_player(self, player: Player | PlayerState) -> PlayerState:
         """
         Register a player to the arena.
         If the player is already registered, return the registered player.
-        :param player: the player to register
+        :param player: the player to register, a Player row is converted to its runtime state
         :return: the registered player
         """
+        if isinstance(player, Player):
+            player = PlayerState.from_row(player)
         p = self.__get_player(player.name)
         if p is not None:
             self._logger.debug(f"Found player {player}")
@@ -229,6 +568,9 @@ class ArenaManager(IManager):
         else:
             self._logger.info(f"Registering player {player}")
             self.__registered_players.append(player)
+            self.__players_by_name[player.name] = player
+            self.__table.add(player.name, player.x, player.y, player.direction, player.health, player.score)
+            self.__spatial.update(player.name, player.x, player.y)
         return player
 
     def unregister_player(self, player_id: str) -> None:
@@ -239,10 +581,40 @@ class ArenaManager(IManager):
         p = self.__get_player(player_id)
         self._robot.rulePlayer(p.name, "reset", True)
         self.__registered_players.remove(p)
+        self.__players_by_name.pop(p.name, None)
+        self.__table.remove(p.name)
+        self.__collisions.pop(p.name, None)
+        self.__profiles.pop(p.name, None)
+        self.__moved.discard(p.name)
+        self.__collided.discard(p.name)
+        self.__spatial.remove(p.name)
+
+    @property
+    def spatial_index(self) -> SpatialGrid:
+        """
+        Return the spatial index of the registered players' positions, by name.
+        Other entities (e.g. monsters) may be indexed with keys that are not player names.
+        """
+        return self.__spatial
+
+    def players_near(self, x: float, y: float, r: float, exclude: str = None) -> List[PlayerState]:
+        """
+        Return the registered players within r cells of (x, y), nearest first.
+        :param exclude: the name of a player to leave out, e.g. the one at (x, y)
+        """
+        players = (self.__players_by_name.get(key) for key in self.__spatial.within(x, y, r, exclude))
+        return [player for player in players if player is not None]
 
-    def update_player_stats(self, player: Union[int | str]) -> Player:
+    def update_player_stats(self, player: Union[int | str]) -> PlayerState:
         pass
 
+    def player_rows(self) -> List[Player]:
+        """
+        Return the registered players as Player rows, to persist them.
+        Inventories and personal maps are only serialized here, not on each tick.
+        """
+        return [player.to_row() for player in self.__registered_players]
+
     def update_players(self, a1, event, before, after) -> None:
         """
         This method on each update, gathers players from arena and update them internally.
@@ -277,6 +649,12 @@ class ArenaManager(IManager):
         """
         return self.__state_machine.state
 
+    def set_profiler(self, profiler: StateProfiler | None) -> None:
+        """
+        Profile the state handlers of the arena (see StateProfiler), or stop if None.
+        """
+        self.__state_machine.set_profiler(profiler)
+
     @property
     def __game_infos(self) -> Dict[str, Any]:
         """
@@ -288,12 +666,12 @@ class ArenaManager(IManager):
                 "players": self._robot.players,
                 "registered_players": self.registered_players,
                 "time_limit": self.__time_limit,
-                "timers": self.__timers
+                "timers": self.__timers_infos
             }
         }
 
     @property
-    def __timers(self) -> Dict[str, Any]:
+    def __timers_infos(self) -> Dict[str, Any]:
         """
         Return the timers of the game.
         """
@@ -319,7 +697,8 @@ class ArenaManager(IManager):
             self.__paused_time += (int(self._robot.game['t']) - self.__start_time
                                    - self.last_loop_time - self.__paused_time)
             self._logger.debug(f"Paused time : {self.__paused_time}")
-        self._logger.debug(f"Timers : {self.__timers}")
+        self.__advance_timers()
+        self._logger.debug(f"Timers : {self.__timers_infos}")
 
     def restart(self):
         """
@@ -331,8 +710,19 @@ class ArenaManager(IManager):
         self._robot.ruleArena("open", True)
         for player in self.registered_players:
             self.unregister_player(player.name)
+        # The monsters of the rules are spawned again when the next game starts
+        self.__monsters = None
+        self.__monsters_started = False
+        if self.__monsters_sent:
+            self.__monsters_sent = []
+            self._robot.ruleArena("monsters", [])
         self.__state_machine.set_actual_state(StateEnum.WAIT_PLAYERS_CONNEXION)
         self.__start_time = self.__rules['t']
+        self.__paused_time = 0
+        self.__timers = TimerWheel()
+        self.__match_end = None
+        self.__schedule_match_end()
+        self.__timers.schedule_every(SCORE_TICK_MS, self.__score_tick)
         self._robot.update()  # sync rules and game
         self.__state_machine.handle()
 
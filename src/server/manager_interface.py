@@ -9,6 +9,7 @@ from time import sleep, perf_counter
 from src.api.j2l.pytactx.agent import Agent
 from .arena_agent import SyncAgent
 from src.server.models.player import Player
+from src.server.models.player_state import PlayerState
 
 
 class IManager(ABC):
@@ -80,7 +81,7 @@ class IManager(ABC):
     # ARENA PLAYERS MANAGEMENT #
     ############################
     @abstractmethod
-    def kill_player(self, player: str) -> Player:
+    def kill_player(self, player: str) -> PlayerState:
         """
         Kill a player.
         :param player: player to kill
@@ -88,7 +89,7 @@ class IManager(ABC):
         """
 
     @abstractmethod
-    def register_player(self, player: Player) -> Player:
+    def register_player(self, player: Player | PlayerState) -> PlayerState:
         """
         Spawn a player.
         :param player: the player to register to the arena and spawn
@@ -109,7 +110,7 @@ class IManager(ABC):
         """
 
     @abstractmethod
-    def update_player_stats(self, player: Player) -> Player:
+    def update_player_stats(self, player: PlayerState) -> PlayerState:
         """
         Update a player.
         :param player: the player to update
@@ -123,6 +124,12 @@ class IManager(ABC):
         Return the actual state name of the arena.
         """
 
+    @abstractmethod
+    def report_efficiency(self):
+        """
+        Compute and display the efficiency of each player against the map's theoretical max score.
+        """
+
     @abstractmethod
     def display(self, message):
         """
@@ -0,0 +1,10 @@
+"""
+Maze package.
+Generates the labyrinths the arbiter pushes to the arena between matches.
+"""
+
+__export__ = ["tiles", "generator", "distance", "pathfinding"]
+
+from .tiles import Tile
+from .generator import Maze, MazeParams, MazeGenerationError, generate_maze, grid_digest
+from .distance import DistanceField, ScoreRules, distance_field
@@ -0,0 +1,209 @@
+"""
+Distance fields from the battery.
+
+For a given map, a Dijkstra from the battery computes the time (in ms)
+ needed to reach it from every cell, each move costing `dtMove / friction`
+ of the entered cell (see `mapFriction` in rules.json).
+Along the fastest path, the points lost on slow cells and traps are
+ accumulated, which gives the best score a player can make from any cell,
+ and the theoretical maximum score of the map from the spawn cells.
+
+Fields are cached per map hash, so that the EndGame state can report
+ the efficiency of each player without recomputing them.
+"""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .generator import _spawn_cells
+from .tiles import Tile
+
+CACHE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class ScoreRules:
+    """
+    Scoring rules of the game, as described in the README.
+    Durations are in seconds.
+    """
+    battery_points: float = 30.0
+    collision_penalty: float = 0.5
+    incident_move_penalty: float = 0.2
+    incident_second_penalty: float = 0.1
+    streak_delay: float = 3.0
+    streak_bonus: float = 0.1
+    match_duration: float = 200.0
+
+
+class DistanceField:
+    """
+    Read-only distance field from the battery of a map.
+    Arrays are indexed as [y, x], like the arena map.
+    """
+
+    def __init__(self, time: np.ndarray, incidents: np.ndarray, incident_time: np.ndarray,
+                 battery: Tuple[int, int], spawns: Tuple[Tuple[int, int], ...],
+                 rules: ScoreRules):
+        self.__time = time
+        self.__incidents = incidents
+        self.__battery = battery
+        self.__spawns = spawns
+        self.__rules = rules
+        reachable = time <= rules.match_duration * 1000
+        streak = np.maximum(0.0, rules.match_duration - rules.streak_delay
+                            - incident_time - rules.streak_delay * incidents)
+        score = (np.where(reachable, rules.battery_points, 0.0)
+                 + rules.streak_bonus * streak
+                 - rules.incident_move_penalty * incidents
+                 - rules.incident_second_penalty * incident_time)
+        self.__score = np.where(np.isfinite(time), score, np.nan)
+        for array in (self.__time, self.__incidents, self.__score):
+            array.setflags(write=False)
+        spawn_scores = [self.__score[y, x] for x, y in spawns if np.isfinite(time[y, x])]
+        if not spawn_scores:
+            spawn_scores = [float(np.nanmax(self.__score))]
+        self.__theoretical_max = round(float(max(spawn_scores)), 2)
+
+    @property
+    def time(self) -> np.ndarray:
+        """ return the time (ms) to reach the battery from each cell, inf if unreachable """
+        return self.__time
+
+    @property
+    def incidents(self) -> np.ndarray:
+        """ return the number of slow cells and traps on the fastest path from each cell """
+        return self.__incidents
+
+    @property
+    def optimal_score(self) -> np.ndarray:
+        """ return the best score a player can make from each cell, nan on walls """
+        return self.__score
+
+    @property
+    def battery(self) -> Tuple[int, int]:
+        """ return the (x, y) position of the battery """
+        return self.__battery
+
+    @property
+    def spawns(self) -> Tuple[Tuple[int, int], ...]:
+        """ return the (x, y) positions players spawn from """
+        return self.__spawns
+
+    @property
+    def rules(self) -> ScoreRules:
+        """ return the scoring rules the field was computed with """
+        return self.__rules
+
+    @property
+    def theoretical_max(self) -> float:
+        """ return the best score a player can make from the best spawn cell """
+        return self.__theoretical_max
+
+    def reachable(self, x: int, y: int) -> bool:
+        """
+        Return True if the battery can be reached from the given cell
+        """
+        return bool(np.isfinite(self.__time[y, x]))
+
+    def efficiency(self, score: float, spawn: Optional[Tuple[int, int]] = None) -> float:
+        """
+        Return the ratio between a player's score and the best possible score,
+         from the given spawn cell or from the best spawn cell.
+        """
+        best = self.__theoretical_max
+        if spawn is not None and self.reachable(*spawn):
+            best = float(self.__score[spawn[1], spawn[0]])
+        if best <= 0:
+            return 0.0
+        return max(0.0, score / best)
+
+
+def _dijkstra(grid: np.ndarray, friction: Sequence[float], dt_move: float,
+              battery: Tuple[int, int]):
+    """
+    Compute, from the battery, the time to reach it from every cell, and
+     the number of incidents and time spent on incident cells along the way.
+    """
+    rows, columns = grid.shape
+    flat = grid.ravel().tolist()
+    cost = [dt_move / friction[v] if v < len(friction) and friction[v] > 0 else None
+            for v in range(max(flat) + 1)]
+    incident = [Tile.SLOW <= v <= Tile.TRAP for v in range(max(flat) + 1)]
+    time = [float("inf")] * (rows * columns)
+    incidents = [0] * (rows * columns)
+    incident_time = [0.0] * (rows * columns)
+    start = battery[1] * columns + battery[0]
+    time[start] = 0.0
+    heap = [(0.0, start)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    while heap:
+        elapsed, cell = heappop(heap)
+        if elapsed > time[cell]:
+            continue
+        # moving from a neighbour into this cell costs the time of this cell
+        step = cost[flat[cell]]
+        if step is None and cell != start:
+            continue
+        step = step or 0.0
+        on_incident = incident[flat[cell]]
+        x = cell % columns
+        for nxt in (cell - columns, cell + columns,
+                    cell - 1 if x > 0 else -1, cell + 1 if x < columns - 1 else -1):
+            if nxt < 0 or nxt >= rows * columns or cost[flat[nxt]] is None:
+                continue
+            candidate = elapsed + step
+            if candidate < time[nxt]:
+                time[nxt] = candidate
+                incidents[nxt] = incidents[cell] + on_incident
+                incident_time[nxt] = incident_time[cell] + (step / 1000 if on_incident else 0.0)
+                heappush(heap, (candidate, nxt))
+    shape = (rows, columns)
+    return (np.array(time).reshape(shape), np.array(incidents, dtype=np.int32).reshape(shape),
+            np.array(incident_time).reshape(shape))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _compute(grid_bytes: bytes, shape: Tuple[int, int], friction: Tuple[float, ...],
+             dt_move: float, battery: Tuple[int, int],
+             spawns: Tuple[Tuple[int, int], ...], rules: ScoreRules) -> DistanceField:
+    """
+    Compute a distance field, cached by map content and parameters
+    """
+    grid = np.frombuffer(grid_bytes, dtype=np.uint8).reshape(shape)
+    time, incidents, incident_time = _dijkstra(grid, friction, dt_move, battery)
+    return DistanceField(time, incidents, incident_time, battery, spawns, rules)
+
+
+def distance_field(grid, friction: Iterable[float], dt_move: float = 300,
+                   battery: Optional[Tuple[int, int]] = None,
+                   spawns: Optional[Iterable[Tuple[int, int]]] = None,
+                   rules: Optional[ScoreRules] = None) -> Optional[DistanceField]:
+    """
+    Return the distance field from the battery of the given map.
+    :param grid: the map, as a numpy array or a list of rows
+    :param friction: the friction of each tile (mapFriction rule)
+    :param dt_move: the time of one move on a floor cell, in ms (dtMove rule)
+    :param battery: the (x, y) position of the battery, found in the map if None
+    :param spawns: the cells players spawn from, the outer ring of the maze if None
+    :param rules: the scoring rules
+    :return: the distance field, or None if the map has no battery
+    """
+    grid = np.ascontiguousarray(grid, dtype=np.uint8)
+    if battery is None:
+        ys, xs = np.nonzero(grid == Tile.BATTERY)
+        if len(ys) == 0:
+            return None
+        battery = (int(xs[0]), int(ys[0]))
+    spawns = tuple(spawns) if spawns is not None else _spawn_cells(grid)
+    return _compute(grid.tobytes(), grid.shape, tuple(float(f) for f in friction),
+                    float(dt_move), tuple(battery), spawns, rules or ScoreRules())
+
+
+distance_field.cache_info = _compute.cache_info
+distance_field.cache_clear = _compute.cache_clear
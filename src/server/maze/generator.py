@@ -0,0 +1,350 @@
+"""
+Procedural maze generator.
+
+A maze is carved with an iterative randomized depth-first search on the odd
+ cells of the grid, then braided (some dead ends are opened to create loops,
+ so that a player can find a faster path than another).
+Slow cells and traps are then scattered on the floor, and the battery is
+ dropped far enough from the borders where players spawn.
+
+Every maze is checked for solvability (the battery must be reachable from
+ the spawn cells) and its difficulty must fit in the requested range,
+ otherwise another layout is derived from the same seed.
+
+Generated mazes are kept in an LRU cache keyed by seed and parameters,
+ so that replaying a tournament layout is instant.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .tiles import Tile
+
+CACHE_SIZE = 32
+
+
+class MazeGenerationError(ValueError):
+    """
+    Raised when no maze matching the requested parameters can be generated
+    """
+
+
+@dataclass(frozen=True)
+class MazeParams:
+    """
+    Parameters of a maze generation.
+    Frozen, so that it can be used as a cache key.
+    """
+    columns: int = 40
+    rows: int = 40
+    braid: float = 0.1
+    slow_density: float = 0.04
+    trap_density: float = 0.02
+    min_difficulty: float = 0.0
+    max_difficulty: float = 1.0
+    max_attempts: int = 10
+
+    def __post_init__(self):
+        # Below 7x7, every floor cell is a spawn and no battery can be placed far from them
+        if self.columns < 7 or self.rows < 7:
+            raise ValueError(f"Maze must be at least 7x7, got {self.columns}x{self.rows}")
+        for name in ("braid", "slow_density", "trap_density", "min_difficulty", "max_difficulty"):
+            value = getattr(self, name)
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be in [0, 1], got {value}")
+        if self.slow_density + self.trap_density > 1.0:
+            raise ValueError("slow_density + trap_density must not exceed 1")
+        if self.min_difficulty > self.max_difficulty:
+            raise ValueError("min_difficulty must be lower than max_difficulty")
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+
+class Maze:
+    """
+    An immutable generated maze.
+    The grid is indexed as grid[y, x], like the arena map.
+    """
+
+    def __init__(self, grid: np.ndarray, battery: Tuple[int, int],
+                 spawns: Tuple[Tuple[int, int], ...], seed: int,
+                 params: MazeParams, difficulty: float):
+        grid.setflags(write=False)
+        self.__grid = grid
+        self.__battery = battery
+        self.__spawns = spawns
+        self.__seed = seed
+        self.__params = params
+        self.__difficulty = difficulty
+        self.__digest = grid_digest(grid)
+
+    @property
+    def grid(self) -> np.ndarray:
+        """ return the read-only grid of tiles """
+        return self.__grid
+
+    @property
+    def battery(self) -> Tuple[int, int]:
+        """ return the (x, y) position of the battery """
+        return self.__battery
+
+    @property
+    def spawns(self) -> Tuple[Tuple[int, int], ...]:
+        """ return the (x, y) positions where players may spawn """
+        return self.__spawns
+
+    @property
+    def seed(self) -> int:
+        """ return the seed the maze was generated from """
+        return self.__seed
+
+    @property
+    def params(self) -> MazeParams:
+        """ return the parameters the maze was generated with """
+        return self.__params
+
+    @property
+    def difficulty(self) -> float:
+        """ return the difficulty of the maze, between 0 and 1 """
+        return self.__difficulty
+
+    @property
+    def digest(self) -> str:
+        """ return a hash of the grid, to identify the layout """
+        return self.__digest
+
+    def tile(self, x: int, y: int) -> Tile:
+        """
+        Return the tile at the given position
+        """
+        return Tile(int(self.__grid[y, x]))
+
+    def to_list(self) -> List[List[int]]:
+        """
+        Return the grid in the format expected by ruleArena("map", ...)
+        """
+        return self.__grid.tolist()
+
+    def __repr__(self):
+        return (f"<Maze(seed={self.__seed}, size={self.__params.columns}x{self.__params.rows},"
+                f" battery={self.__battery}, difficulty={self.__difficulty:.2f})>")
+
+
+def grid_digest(grid) -> str:
+    """
+    Return a hash of a map, as a numpy array or a list of rows, to identify its layout
+    """
+    grid = np.ascontiguousarray(grid, dtype=np.uint8)
+    return hashlib.blake2b(grid.tobytes(), digest_size=16).hexdigest()
+
+
+def _carve(columns: int, rows: int, rng: random.Random) -> bytearray:
+    """
+    Carve a perfect maze in a flat grid of walls, using an iterative
+     randomized depth-first search on odd cells.
+    """
+    grid = bytearray([Tile.WALL]) * (columns * rows)
+    ncx, ncy = (columns - 1) // 2, (rows - 1) // 2
+    visited = bytearray(ncx * ncy)
+    start = rng.randrange(ncx * ncy)
+    visited[start] = 1
+    grid[(2 * (start // ncx) + 1) * columns + 2 * (start % ncx) + 1] = Tile.FLOOR
+    stack = [start]
+    randrange = rng.randrange
+    while stack:
+        cell = stack[-1]
+        cx = cell % ncx
+        candidates = []
+        if cx > 0 and not visited[cell - 1]:
+            candidates.append(cell - 1)
+        if cx < ncx - 1 and not visited[cell + 1]:
+            candidates.append(cell + 1)
+        if cell >= ncx and not visited[cell - ncx]:
+            candidates.append(cell - ncx)
+        if cell + ncx < ncx * ncy and not visited[cell + ncx]:
+            candidates.append(cell + ncx)
+        if not candidates:
+            stack.pop()
+            continue
+        nxt = candidates[randrange(len(candidates))] if len(candidates) > 1 else candidates[0]
+        visited[nxt] = 1
+        here = (2 * (cell // ncx) + 1) * columns + 2 * cx + 1
+        there = (2 * (nxt // ncx) + 1) * columns + 2 * (nxt % ncx) + 1
+        grid[(here + there) // 2] = Tile.FLOOR
+        grid[there] = Tile.FLOOR
+        stack.append(nxt)
+    return grid
+
+
+def _floor_neighbours(floor: np.ndarray) -> np.ndarray:
+    """
+    Return, for each cell, the number of walkable cells among its 4 neighbours.
+    """
+    neighbours = np.zeros(floor.shape, dtype=np.int8)
+    neighbours[1:, :] += floor[:-1, :]
+    neighbours[:-1, :] += floor[1:, :]
+    neighbours[:, 1:] += floor[:, :-1]
+    neighbours[:, :-1] += floor[:, 1:]
+    return neighbours
+
+
+def _braid(grid: np.ndarray, ratio: float, rng: np.random.Generator) -> None:
+    """
+    Open a ratio of the dead ends, creating loops in the maze.
+    """
+    if ratio <= 0:
+        return
+    rows, columns = grid.shape
+    floor = grid != Tile.WALL
+    neighbours = _floor_neighbours(floor)
+    ys, xs = np.nonzero(floor & (neighbours == 1))
+    if len(ys) == 0:
+        return
+    chosen = rng.random(len(ys)) < ratio
+    for y, x in zip(ys[chosen].tolist(), xs[chosen].tolist()):
+        walls = [(y + dy, x + dx) for dy, dx in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                 if 0 < y + 2 * dy < rows - 1 and 0 < x + 2 * dx < columns - 1
+                 and grid[y + dy, x + dx] == Tile.WALL]
+        if walls:
+            grid[walls[rng.integers(len(walls))]] = Tile.FLOOR
+
+
+def _spawn_cells(grid: np.ndarray) -> Tuple[Tuple[int, int], ...]:
+    """
+    Return the floor cells on the outer ring of carved cells, where players spawn.
+    """
+    rows, columns = grid.shape
+    last_x, last_y = 2 * ((columns - 1) // 2) - 1, 2 * ((rows - 1) // 2) - 1
+    cells = set()
+    for x in range(1, last_x + 1):
+        cells.update(((x, 1), (x, last_y)))
+    for y in range(1, last_y + 1):
+        cells.update(((1, y), (last_x, y)))
+    return tuple(sorted(c for c in cells if grid[c[1], c[0]] != Tile.WALL))
+
+
+def _bfs_steps(grid: np.ndarray, sources) -> np.ndarray:
+    """
+    Return the number of steps from the nearest source to each walkable cell,
+     -1 where the cell cannot be reached.
+    """
+    rows, columns = grid.shape
+    walkable = (grid.ravel() != Tile.WALL).tolist()
+    steps = [-1] * (rows * columns)
+    queue = deque()
+    for x, y in sources:
+        steps[y * columns + x] = 0
+        queue.append(y * columns + x)
+    popleft, append = queue.popleft, queue.append
+    while queue:
+        cell = popleft()
+        nxt_steps = steps[cell] + 1
+        x = cell % columns
+        for nxt in (cell - columns, cell + columns,
+                    cell - 1 if x > 0 else -1, cell + 1 if x < columns - 1 else -1):
+            if 0 <= nxt < rows * columns and walkable[nxt] and steps[nxt] < 0:
+                steps[nxt] = nxt_steps
+                append(nxt)
+    return np.array(steps, dtype=np.int32).reshape(rows, columns)
+
+
+def _difficulty(grid: np.ndarray, steps: np.ndarray, battery: Tuple[int, int]) -> float:
+    """
+    Estimate the difficulty of a maze, between 0 and 1:
+    - 60% for the distance from the spawns to the battery, relative to the farthest cell
+    - 20% for the ratio of dead ends among floor cells
+    - 20% for the density of slow cells and traps
+    """
+    floor = grid != Tile.WALL
+    n_floor = int(floor.sum())
+    farthest = int(steps.max())
+    path_ratio = steps[battery[1], battery[0]] / farthest if farthest > 0 else 0.0
+    neighbours = _floor_neighbours(floor)
+    dead_end_ratio = int((floor & (neighbours == 1)).sum()) / n_floor
+    hazard_ratio = int(((grid == Tile.SLOW) | (grid == Tile.TRAP)).sum()) / n_floor
+    return float(min(1.0, 0.6 * path_ratio
+                     + 0.2 * min(1.0, dead_end_ratio / 0.25)
+                     + 0.2 * min(1.0, hazard_ratio / 0.2)))
+
+
+def _attempt(seed: int, attempt: int, params: MazeParams) -> Optional[Maze]:
+    """
+    Generate one maze layout, return None if it is not solvable.
+    """
+    py_rng = random.Random(f"{seed}:{attempt}")
+    np_rng = np.random.default_rng([seed, attempt])
+    columns, rows = params.columns, params.rows
+    grid = np.frombuffer(_carve(columns, rows, py_rng), dtype=np.uint8)
+    grid = grid.reshape(rows, columns).copy()
+    _braid(grid, params.braid, np_rng)
+
+    spawns = _spawn_cells(grid)
+    steps = _bfs_steps(grid, spawns)
+    # drop the battery in the farthest half of the maze
+    far = steps >= max(1, int(steps.max()) // 2)
+    ys, xs = np.nonzero(far)
+    if len(ys) == 0:
+        return None
+    pick = int(np_rng.integers(len(ys)))
+    battery = (int(xs[pick]), int(ys[pick]))
+
+    # scatter slow cells and traps, away from spawns and battery
+    free = grid == Tile.FLOOR
+    for x, y in spawns:
+        free[y, x] = False
+    free[battery[1], battery[0]] = False
+    draw = np_rng.random(grid.shape)
+    grid[free & (draw < params.trap_density)] = Tile.TRAP
+    grid[free & (draw >= params.trap_density)
+         & (draw < params.trap_density + params.slow_density)] = Tile.SLOW
+    grid[battery[1], battery[0]] = Tile.BATTERY
+
+    if steps[battery[1], battery[0]] < 0:
+        return None
+    difficulty = _difficulty(grid, steps, battery)
+    if not params.min_difficulty <= difficulty <= params.max_difficulty:
+        return None
+    return Maze(grid, battery, spawns, seed, params, difficulty)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _generate(seed: int, params: MazeParams) -> Maze:
+    """
+    Generate a maze, retrying with derived layouts until one passes the checks.
+    """
+    for attempt in range(params.max_attempts):
+        maze = _attempt(seed, attempt, params)
+        if maze is not None:
+            return maze
+    raise MazeGenerationError(f"No maze matching {params} after {params.max_attempts} attempts"
+                              f" with seed {seed}")
+
+
+def generate_maze(seed: Optional[int] = None, params: Optional[MazeParams] = None,
+                  **kw) -> Maze:
+    """
+    Generate a maze, or return it from cache if it was already generated.
+    :param seed: the seed of the layout, a random one is drawn if None
+    :param params: the generation parameters, overridden by keyword arguments
+    :return: the generated maze
+    """
+    if params is None:
+        params = MazeParams(**kw)
+    elif kw:
+        params = MazeParams(**{**params.__dict__, **kw})
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    if int(seed) < 0:
+        raise ValueError(f"Seed must be a positive integer, got {seed}")
+    return _generate(int(seed), params)
+
+
+generate_maze.cache_info = _generate.cache_info
+generate_maze.cache_clear = _generate.cache_clear
@@ -0,0 +1,130 @@
+"""
+A* paths between two cells of a map.
+
+Moves cost the time to enter the next cell (`dtMove / friction`), as in the
+ distance fields. The distance field from the battery is reused as a landmark:
+ by the triangle inequality, time[n] - time[goal] never exceeds the time from n
+ to the goal, so together with the Manhattan distance it gives an admissible
+ heuristic that is much tighter than the Manhattan distance alone in a maze.
+
+Searches may be bounded in expanded cells: a bounded search that does not reach
+ the goal returns the path to the most promising cell it found instead.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .distance import DistanceField
+
+Cell = Tuple[int, int]
+
+
+class PathResult(NamedTuple):
+    """
+    Path from a start cell (excluded) to the goal, or towards it if not complete
+    """
+    path: List[Cell]
+    cost: float
+    complete: bool
+    expanded: int
+
+
+class PathFinder:
+    """
+    A* searches on one map, with the costs of its cells precomputed.
+    Build one per map, searches are then independent of the map size.
+    """
+
+    def __init__(self, grid, friction: Iterable[float], dt_move: float = 300,
+                 field: Optional[DistanceField] = None):
+        grid = np.asarray(grid, dtype=np.uint8)
+        self.__rows, self.__columns = grid.shape
+        friction = [float(f) for f in friction]
+        cost = [dt_move / friction[v] if v < len(friction) and friction[v] > 0 else None
+                for v in range(int(grid.max()) + 1)]
+        self.__cost: List[Optional[float]] = [cost[v] for v in grid.ravel().tolist()]
+        steps = [c for c in cost if c is not None]
+        self.__min_step = min(steps) if steps else 0.0
+        self.__landmark: Optional[List[float]] = None
+        if field is not None and field.time.shape == grid.shape:
+            self.__landmark = field.time.ravel().tolist()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """ return the (rows, columns) of the map """
+        return self.__rows, self.__columns
+
+    def walkable(self, x: int, y: int) -> bool:
+        """
+        Return True if the cell is in the map and can be entered
+        """
+        return 0 <= x < self.__columns and 0 <= y < self.__rows \
+            and self.__cost[y * self.__columns + x] is not None
+
+    def step_cost(self, x: int, y: int) -> Optional[float]:
+        """
+        Return the time (ms) to enter the cell, None if it cannot be entered
+        """
+        return self.__cost[y * self.__columns + x]
+
+    def search(self, start: Cell, goal: Cell, max_expansions: Optional[int] = None) -> PathResult:
+        """
+        Return the fastest path from start to goal.
+        :param max_expansions: the maximum number of cells to expand, unbounded if None
+        """
+        columns, cells = self.__columns, self.__rows * self.__columns
+        cost, min_step, landmark = self.__cost, self.__min_step, self.__landmark
+        source = start[1] * columns + start[0]
+        target = goal[1] * columns + goal[0]
+        gx, gy = goal
+        target_time = landmark[target] if landmark is not None else float("inf")
+        use_landmark = target_time != float("inf")
+
+        def heuristic(cell: int) -> float:
+            h = (abs(cell % columns - gx) + abs(cell // columns - gy)) * min_step
+            if use_landmark:
+                h = max(h, landmark[cell] - target_time)
+            return h
+
+        elapsed = {source: 0.0}
+        parent = {source: -1}
+        best, best_h = source, heuristic(source)
+        heap = [(best_h, 0.0, source)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        expanded = 0
+        complete = False
+        while heap:
+            _, time, cell = heappop(heap)
+            if time > elapsed[cell]:
+                continue
+            if cell == target:
+                best, complete = cell, True
+                break
+            if max_expansions is not None and expanded >= max_expansions:
+                break
+            expanded += 1
+            x = cell % columns
+            for nxt in (cell - columns, cell + columns,
+                        cell - 1 if x > 0 else -1, cell + 1 if x < columns - 1 else -1):
+                if nxt < 0 or nxt >= cells or cost[nxt] is None:
+                    continue
+                candidate = time + cost[nxt]
+                if candidate < elapsed.get(nxt, float("inf")):
+                    h = heuristic(nxt)
+                    if h == float("inf"):
+                        continue
+                    elapsed[nxt] = candidate
+                    parent[nxt] = cell
+                    if h < best_h:
+                        best, best_h = nxt, h
+                    heappush(heap, (candidate + h, candidate, nxt))
+        path = []
+        cell = best
+        while cell != source:
+            path.append((cell % columns, cell // columns))
+            cell = parent[cell]
+        path.reverse()
+        return PathResult(path, elapsed[best], complete, expanded)
@@ -0,0 +1,32 @@
+"""
+Define the tiles a maze is made of.
+The values are the indexes used by the arena in `map`, `mapFriction`,
+ `mapHit` and `mapBreakable` (see rules.json).
+"""
+
+from enum import IntEnum
+
+
+class Tile(IntEnum):
+    """
+    Tiles of the maze, as stored in the arena map
+    """
+    FLOOR = 0
+    WALL = 1
+    SLOW = 2
+    TRAP = 3
+    BATTERY = 4
+
+    @property
+    def walkable(self) -> bool:
+        """
+        Return True if a player can stand on this tile
+        """
+        return self is not Tile.WALL
+
+    @property
+    def incident(self) -> bool:
+        """
+        Return True if walking on this tile costs points to the player
+        """
+        return self in (Tile.SLOW, Tile.TRAP)
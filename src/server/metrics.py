@@ -0,0 +1,309 @@
+"""
+Metrics of the arbiter.
+
+Counters and histograms of what the arbiter receives, decodes, applies and publishes,
+ exported in the Prometheus text format through a local HTTP endpoint or a file dump:
+
+    from src.server.metrics import REGISTRY
+    REGISTRY.serve(9100)             # http://127.0.0.1:9100/metrics
+    REGISTRY.dump("metrics.prom")    # or metrics.json
+
+Durations are in seconds, as Prometheus expects.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latencies of the update loop, from 100µs to 10s
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+# Time spent in a game state, from 1s to 30min
+DWELL_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+class Metric(ABC):
+    """
+    Base class of the metrics: a value per combination of label values
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metric {self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = tuple(zip(self.labels, key)) + extra
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        """
+        Return the lines of the metric in the Prometheus text format
+        """
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the values of the metric, by label values
+        """
+
+
+class Counter(Metric):
+    """
+    Monotonic count, e.g. of messages received
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.__values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("A counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self.__values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self.__values.items()):
+                lines.append(f"{self.name}{self._format_labels(key)} {_format_value(value)}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {",".join(key): value for key, value in self.__values.items()}
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. of latencies, in cumulative buckets
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of each bucket (not cumulative, +Inf last), the sum
+        self.__counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.__sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.__counts.get(key)
+            if counts is None:
+                counts = self.__counts[key] = [0] * (len(self.buckets) + 1)
+                self.__sums[key] = 0.0
+            counts[index] += 1
+            self.__sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe the duration of the with block
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return sum(self.__counts.get(self._key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        with self._lock:
+            return self.__sums.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, counts in sorted(self.__counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = (("le", "+Inf" if bound == math.inf else _format_value(bound)),)
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(self.__sums[key])}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {",".join(key): {"count": sum(counts), "sum": self.__sums[key],
+                                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts))}
+                    for key, counts in self.__counts.items()}
+
+
+class MetricsRegistry:
+    """
+    Registry of the metrics, exported together
+    """
+
+    def __init__(self):
+        self.__metrics: Dict[str, Metric] = {}
+        self.__lock = threading.Lock()
+        self.__server: Optional[ThreadingHTTPServer] = None
+
+    def __register(self, metric_class, name: str, *args, **kwargs) -> Metric:
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric is None:
+                metric = self.__metrics[name] = metric_class(name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        """
+        Return the counter of this name, registering it on first use
+        """
+        return self.__register(Counter, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Return the histogram of this name, registering it on first use
+        """
+        return self.__register(Histogram, name, description, labels, buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        with self.__lock:
+            return self.__metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text format
+        """
+        with self.__lock:
+            metrics = sorted(self.__metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return {metric.name: {"type": metric.kind, "labels": list(metric.labels), "values": metric.snapshot()}
+                for metric in metrics}
+
+    def dump(self, path: str) -> None:
+        """
+        Write the metrics to a file, as json if it ends with .json, in the Prometheus text format otherwise.
+        The file is replaced atomically, so that a reader never sees a partial dump.
+        """
+        if path.endswith(".json"):
+            content = json.dumps({"time": time.time(), "metrics": self.snapshot()}, indent=2)
+        else:
+            content = self.render()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the metrics on http://host:port/metrics from a daemon thread.
+        Port 0 picks a free port, see server.server_address.
+        """
+        if self.__server is not None:
+            return self.__server
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                """Scrapes are too frequent to be logged"""
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.__server
+
+    def stop(self) -> None:
+        """
+        Stop the HTTP endpoint, if served
+        """
+        server, self.__server = self.__server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+class TrafficMetrics:
+    """
+    Observer of the broker traffic of an OvaClientMqtt (see setTrafficObserver)
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.__received = registry.counter("arbiter_messages_received_total",
+                                           "Messages received from the broker", ("topic",))
+        self.__received_bytes = registry.counter("arbiter_received_bytes_total",
+                                                 "Payload bytes received from the broker", ("topic",))
+        self.__decode = registry.histogram("arbiter_decode_seconds", "Time to decode a received payload",
+                                           ("topic",))
+        self.__published = registry.counter("arbiter_messages_published_total",
+                                            "Messages published to the broker", ("topic",))
+        self.__published_bytes = registry.counter("arbiter_published_bytes_total",
+                                                  "Payload bytes published to the broker", ("topic",))
+
+    def onRx(self, topic: str, size: int) -> None:
+        self.__received.inc(topic=topic)
+        self.__received_bytes.inc(size, topic=topic)
+
+    def onDecoded(self, topic: str, duration_ns: int) -> None:
+        self.__decode.observe(duration_ns / 1e9, topic=topic)
+
+    def onTx(self, topic: str, size: int) -> None:
+        self.__published.inc(topic=topic)
+        self.__published_bytes.inc(size, topic=topic)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,161 @@
+"""
+Player's personal map of the maze (fog of war).
+keep records of every cell the player has seen, as a packed bitset:
+    one bit per cell, one row of ceil(columns / 8) bytes per grid row
+
+A 500x500 grid takes ~31KB per player.
+Cells are revealed with vectorized OR operations, and the bitset is
+ serialized compactly (zlib + base64) into the player's known_map column.
+"""
+from __future__ import annotations
+
+import base64
+import zlib
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+@lru_cache(maxsize=16)
+def _disc_offsets(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the (dy, dx) offsets of the cells within radius of a center cell
+    """
+    span = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(span, span, indexing="ij")
+    inside = dy * dy + dx * dx <= radius * radius
+    dy, dx = dy[inside], dx[inside]
+    dy.setflags(write=False)
+    dx.setflags(write=False)
+    return dy, dx
+
+
+class KnownMap:
+    """
+    Bitset of the cells a player has seen.
+    """
+    __slots__ = ("__columns", "__rows", "__bits", "__dirty")
+
+    def __init__(self, columns: int, rows: int, bits: np.ndarray | None = None):
+        if columns <= 0 or rows <= 0:
+            raise ValueError(f"Grid size must be positive, got {columns}x{rows}")
+        self.__columns = columns
+        self.__rows = rows
+        shape = (rows, (columns + 7) // 8)
+        if bits is None:
+            bits = np.zeros(shape, dtype=np.uint8)
+        elif bits.shape != shape:
+            raise ValueError(f"Bitset shape {bits.shape} does not match grid {columns}x{rows}")
+        self.__bits = bits
+        self.__dirty = False
+
+    @property
+    def columns(self) -> int:
+        """ return the number of columns of the grid """
+        return self.__columns
+
+    @property
+    def rows(self) -> int:
+        """ return the number of rows of the grid """
+        return self.__rows
+
+    @property
+    def nbytes(self) -> int:
+        """ return the memory used by the bitset """
+        return self.__bits.nbytes
+
+    @property
+    def dirty(self) -> bool:
+        """ return True if cells were revealed since the last serialization """
+        return self.__dirty
+
+    def __set_bits(self, ys: np.ndarray, xs: np.ndarray) -> None:
+        """
+        OR the bits of the given cells, dropping the ones out of the grid
+        """
+        inside = (xs >= 0) & (xs < self.__columns) & (ys >= 0) & (ys < self.__rows)
+        ys, xs = ys[inside], xs[inside]
+        if len(xs) == 0:
+            return
+        columns = xs >> 3
+        masks = np.right_shift(0x80, xs & 7).astype(np.uint8)
+        if not (self.__bits[ys, columns] & masks).all():
+            self.__dirty = True
+            np.bitwise_or.at(self.__bits, (ys, columns), masks)
+
+    def reveal(self, x: int, y: int, radius: int = 0) -> None:
+        """
+        Reveal the cells within radius of (x, y)
+        """
+        dy, dx = _disc_offsets(max(0, int(radius)))
+        self.__set_bits(dy + int(y), dx + int(x))
+
+    def reveal_cells(self, cells: Iterable[Tuple[int, int]]) -> None:
+        """
+        Reveal the given (x, y) cells
+        """
+        cells = np.asarray(list(cells), dtype=np.int64).reshape(-1, 2)
+        self.__set_bits(cells[:, 1], cells[:, 0])
+
+    def merge(self, other: KnownMap) -> None:
+        """
+        Reveal every cell the other map knows (e.g. a teammate)
+        """
+        if (other.columns, other.rows) != (self.__columns, self.__rows):
+            raise ValueError("Cannot merge maps of different sizes")
+        np.bitwise_or(self.__bits, other.to_bits(), out=self.__bits)
+        self.__dirty = True
+
+    def is_known(self, x: int, y: int) -> bool:
+        """
+        Return True if the player has seen the cell
+        """
+        if not (0 <= x < self.__columns and 0 <= y < self.__rows):
+            return False
+        return bool(self.__bits[y, x >> 3] & (0x80 >> (x & 7)))
+
+    def count(self) -> int:
+        """
+        Return the number of cells the player has seen
+        """
+        return int(np.unpackbits(self.__bits).sum())
+
+    def to_bits(self) -> np.ndarray:
+        """
+        Return a read-only view on the packed bitset
+        """
+        view = self.__bits.view()
+        view.setflags(write=False)
+        return view
+
+    def to_mask(self) -> np.ndarray:
+        """
+        Return the known cells as a boolean array indexed as [y, x]
+        """
+        return np.unpackbits(self.__bits, axis=1, count=self.__columns).astype(bool)
+
+    def serialize(self) -> str:
+        """
+        Return the bitset as a compact string: "<columns>x<rows>:<base64(zlib(bits))>"
+        """
+        self.__dirty = False
+        payload = base64.b64encode(zlib.compress(self.__bits.tobytes(), 6)).decode("ascii")
+        return f"{self.__columns}x{self.__rows}:{payload}"
+
+    @classmethod
+    def deserialize(cls, data: str) -> KnownMap:
+        """
+        Build a KnownMap from a string returned by serialize()
+        """
+        try:
+            size, payload = data.split(":", 1)
+            columns, rows = (int(v) for v in size.split("x"))
+            raw = zlib.decompress(base64.b64decode(payload))
+        except (ValueError, zlib.error) as e:
+            raise ValueError(f"Invalid known map : {e}") from e
+        bits = np.frombuffer(raw, dtype=np.uint8).reshape(rows, (columns + 7) // 8).copy()
+        return cls(columns, rows, bits)
+
+    def __repr__(self):
+        return f"<KnownMap({self.__columns}x{self.__rows}, known={self.count()})>"
@@ -0,0 +1,153 @@
+"""
+Player's runtime state in the arena, updated on each tick.
+
+A plain __slots__ struct, without the SQLAlchemy descriptors of the Player model:
+ attribute access is a direct slot lookup, and an instance has no __dict__.
+The Player row is only built (to_row) or read (from_row) at persistence points,
+ where the inventory and the personal map are serialized into their columns.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from src.server.models.known_map import KnownMap
+from src.server.models.player import Player
+from src.shared.direction import Direction
+
+
+class PlayerState:
+    """
+    Runtime state of a player
+    """
+    __slots__ = ("id", "name", "health", "x", "y", "direction", "score", "inventory", "vision", "__known_map")
+
+    def __init__(self, name: str, health: int = 100, x: int = 0, y: int = 0,
+                 direction: int = Direction.NORTH, score: float = 0.0,
+                 inventory: Optional[List[Dict]] = None, player_id: Optional[int] = None):
+        self.id = player_id
+        self.name = name
+        self.health = health
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.score = score
+        self.inventory: List[Dict] = inventory if inventory is not None else []
+        self.vision: KnownMap | None = None
+        # Serialized map loaded from a row, deserialized only if the player sees something
+        self.__known_map: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, player: Player) -> PlayerState:
+        """
+        Build the runtime state of a Player row
+        """
+        inventory = player.inventory
+        if isinstance(inventory, str):
+            inventory = json.loads(inventory) if inventory else []
+        state = cls(player.name, player.health if player.health is not None else 100,
+                    player.x or 0, player.y or 0,
+                    player.direction if player.direction is not None else Direction.NORTH,
+                    player.score or 0.0, list(inventory or []), getattr(player, "id", None))
+        state.__known_map = player.known_map if isinstance(player.known_map, str) else None
+        return state
+
+    def to_row(self, player: Optional[Player] = None) -> Player:
+        """
+        Write the state into a Player row (a new one if None), serializing the inventory and the map
+        """
+        if player is None:
+            player = Player(self.name)
+        if self.id is not None:
+            player.id = self.id
+        player.name = self.name
+        player.health = self.health
+        player.x = self.x
+        player.y = self.y
+        player.direction = self.direction
+        player.score = self.score
+        player.inventory = json.dumps(self.inventory)
+        player.known_map = self.known_map
+        return player
+
+    @property
+    def known_map(self) -> Optional[str]:
+        """
+        Return the personal map serialized as in the known_map column, computed on demand
+        """
+        if self.vision is None:
+            return self.__known_map
+        if self.vision.dirty or self.__known_map is None:
+            self.__known_map = self.vision.serialize()
+        return self.__known_map
+
+    def see(self, columns: int, rows: int, radius: int) -> KnownMap:
+        """
+        Add what the player sees from its position to its personal map
+        """
+        if self.vision is None and self.__known_map is not None:
+            vision = KnownMap.deserialize(self.__known_map)
+            if (vision.columns, vision.rows) == (columns, rows):
+                self.vision = vision
+        if self.vision is None or (self.vision.columns, self.vision.rows) != (columns, rows):
+            self.vision = KnownMap(columns, rows)
+        self.vision.reveal(self.x, self.y, radius)
+        return self.vision
+
+    def add_score(self, score: float) -> float:
+        self.score += score
+        return self.score
+
+    def sub_score(self, score: float) -> float:
+        self.score -= score
+        return self.score
+
+    def add_health(self, health: int) -> int:
+        self.health += health
+        return self.health
+
+    def sub_health(self, health: int) -> int:
+        self.health -= health
+        return self.health
+
+    def add_item(self, item: Dict) -> List[Dict]:
+        self.inventory.append(item)
+        return self.inventory
+
+    def remove_item(self, item: Dict) -> List[Dict]:
+        self.inventory.remove(item)
+        return self.inventory
+
+    def move(self, direction: int, distance: int = 1):
+        """
+        Move the player in the given direction
+        """
+        if direction == Direction.NORTH:
+            self.y += distance
+        elif direction == Direction.EAST:
+            self.x += distance
+        elif direction == Direction.SOUTH:
+            self.y -= distance
+        elif direction == Direction.WEST:
+            self.x -= distance
+        return self.x, self.y
+
+    @property
+    def serialize(self) -> Dict[str, Any]:
+        """
+        Return object data in easily serializable format
+        """
+        return {
+            'name': self.name,
+            'health': self.health,
+            'inventory': self.inventory,
+            'x': self.x,
+            'y': self.y,
+            'direction': self.direction,
+            'score': self.score
+        }
+
+    def __repr__(self):
+        """ string representation of the object"""
+        return f"<PlayerState(name='{self.name}', health={self.health}, items={len(self.inventory)}," \
+               f" x={self.x}, y={self.y}, direction={self.direction}, score={self.score})>"
@@ -0,0 +1,252 @@
+"""
+Players of the arena as a structure of arrays.
+
+Positions, directions, health, scores and incident timers of all the players
+ are kept in parallel NumPy arrays, one row per player, so that the rules of a tick
+ (moves, damages, scoring) are applied to every player with a few vector operations.
+Rows are addressed by index, by name (index_of), or by boolean mask.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from src.server.maze.distance import ScoreRules
+from src.server.maze.tiles import Tile
+from src.server.models.player_state import PlayerState
+from src.shared.direction import Direction
+
+Selection = Union[None, int, Sequence[int], np.ndarray]
+
+# Moves of one cell per direction, indexed by Direction value, diagonals do not move
+_DX = np.zeros(13, dtype=np.int32)
+_DY = np.zeros(13, dtype=np.int32)
+_DX[Direction.EAST], _DX[Direction.WEST] = 1, -1
+_DY[Direction.NORTH], _DY[Direction.SOUTH] = 1, -1
+
+_COLUMNS = ("x", "y", "direction", "health", "score", "incident_time", "streak_time", "idle_time")
+
+
+class PlayerTable:
+    """
+    Parallel arrays of the players' runtime state.
+    Times are in seconds, positions in cells.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.__names: List[str] = []
+        self.__index: Dict[str, int] = {}
+        self.__allocate(max(1, capacity))
+
+    def __allocate(self, capacity: int) -> None:
+        old = {column: getattr(self, column, None) for column in _COLUMNS}
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.direction = np.zeros(capacity, dtype=np.int8)
+        self.health = np.zeros(capacity, dtype=np.int32)
+        self.score = np.zeros(capacity, dtype=np.float64)
+        # Time spent on incident cells, and time since the last incident
+        self.incident_time = np.zeros(capacity, dtype=np.float64)
+        self.streak_time = np.zeros(capacity, dtype=np.float64)
+        # Time since the last move, infinite until the first one
+        self.idle_time = np.full(capacity, np.inf, dtype=np.float64)
+        count = len(self.__names)
+        for column, array in old.items():
+            if array is not None:
+                getattr(self, column)[:count] = array[:count]
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.__names)
+
+    def index_of(self, name: str) -> int:
+        """
+        Return the row of a player, raise KeyError if unknown
+        """
+        return self.__index[name]
+
+    def view(self, column: str) -> np.ndarray:
+        """
+        Return the rows in use of a column
+        """
+        if column not in _COLUMNS:
+            raise KeyError(f"Unknown column {column}")
+        return getattr(self, column)[:len(self.__names)]
+
+    def add(self, name: str, x: int = 0, y: int = 0, direction: int = Direction.NORTH,
+            health: int = 100, score: float = 0.0) -> int:
+        """
+        Add a player, and return its row
+        """
+        if name in self.__index:
+            raise ValueError(f"Player {name} is already in the table")
+        row = len(self.__names)
+        if row == len(self.x):
+            self.__allocate(2 * row)
+        self.__names.append(name)
+        self.__index[name] = row
+        self.x[row], self.y[row], self.direction[row] = x, y, direction
+        self.health[row], self.score[row] = health, score
+        self.incident_time[row] = self.streak_time[row] = 0.0
+        self.idle_time[row] = np.inf
+        return row
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a player, the last row takes its place
+        """
+        row = self.__index.pop(name)
+        last = len(self.__names) - 1
+        if row != last:
+            for column in _COLUMNS:
+                array = getattr(self, column)
+                array[row] = array[last]
+            moved = self.__names[last]
+            self.__names[row] = moved
+            self.__index[moved] = row
+        self.__names.pop()
+
+    def __rows(self, rows: Selection) -> Union[slice, np.ndarray, int]:
+        if rows is None:
+            return slice(0, len(self.__names))
+        if isinstance(rows, np.ndarray) and rows.dtype == bool:
+            return np.flatnonzero(rows[:len(self.__names)])
+        return rows
+
+    def move(self, rows: Selection = None, directions: Optional[np.ndarray] = None, distance: int = 1,
+             grid: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Move players one or more cells towards their direction (or the given ones).
+        With a grid, players stay in it and do not enter walls.
+        :return: for each moved row, True if it collided with a wall or a border
+        """
+        rows = self.__rows(rows)
+        if directions is None:
+            directions = self.direction[rows]
+        new_x = self.x[rows] + _DX[directions] * distance
+        new_y = self.y[rows] + _DY[directions] * distance
+        collided = np.zeros(np.shape(new_x), dtype=bool)
+        if grid is not None:
+            grid_rows, grid_columns = grid.shape
+            inside = (new_x >= 0) & (new_x < grid_columns) & (new_y >= 0) & (new_y < grid_rows)
+            walkable = np.zeros_like(inside)
+            walkable[inside] = grid[new_y[inside], new_x[inside]] != Tile.WALL
+            collided = ~walkable
+            new_x = np.where(walkable, new_x, self.x[rows])
+            new_y = np.where(walkable, new_y, self.y[rows])
+        self.x[rows] = new_x
+        self.y[rows] = new_y
+        return collided
+
+    def damage(self, rows: Selection, amount: Union[int, np.ndarray]) -> np.ndarray:
+        """
+        Remove health, down to 0
+        :return: for each damaged row, True if it died from this damage
+        """
+        rows = self.__rows(rows)
+        before = self.health[rows]
+        after = np.maximum(before - amount, 0)
+        self.health[rows] = after
+        return (before > 0) & (after == 0)
+
+    def add_score(self, rows: Selection, amount: Union[float, np.ndarray]) -> None:
+        """
+        Add (or remove if negative) points to players
+        """
+        rows = self.__rows(rows)
+        self.score[rows] += amount
+
+    def alive(self) -> np.ndarray:
+        """
+        Return for each player True if its health is above 0
+        """
+        return self.view("health") > 0
+
+    def cells(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Return the tile under each player
+        """
+        count = len(self.__names)
+        return grid[self.y[:count], self.x[:count]]
+
+    def apply_tick(self, dt: float, moved: np.ndarray, collided: np.ndarray, grid: np.ndarray,
+                   rules: ScoreRules = ScoreRules(), move_period: Union[float, np.ndarray] = 0.0) -> np.ndarray:
+        """
+        Apply the scoring rules of the README to every player for a tick of dt seconds:
+        - a collision with a wall costs collision_penalty,
+        - a move onto an incident cell (slow or trap) costs incident_move_penalty,
+        - each second on an incident cell costs incident_second_penalty,
+        - moving without incident for more than streak_delay earns streak_bonus per second.
+        A player still moves between two of its moves: its streak is only broken once it stayed
+         longer than its move_period (in seconds, one for all or one per player) on the same cell.
+        :return: the score gained by each player during the tick
+        """
+        count = len(self.__names)
+        moved = np.asarray(moved, dtype=bool)[:count]
+        collided = np.asarray(collided, dtype=bool)[:count]
+        tiles = self.cells(grid)
+        on_incident = (tiles >= Tile.SLOW) & (tiles <= Tile.TRAP)
+        incident = collided | (moved & on_incident)
+        self.incident_time[:count] += np.where(on_incident, dt, 0.0)
+        idle = np.where(moved, 0.0, self.idle_time[:count] + dt)
+        # Streaks are broken by incidents, and only last while moving
+        stopped = idle > move_period
+        streak = np.where(incident | stopped, 0.0, self.streak_time[:count] + dt)
+        bonus_time = np.clip(streak - rules.streak_delay, 0.0, dt)
+        gained = (rules.streak_bonus * bonus_time
+                  - rules.collision_penalty * collided
+                  - rules.incident_move_penalty * (moved & on_incident)
+                  - rules.incident_second_penalty * dt * on_incident)
+        self.streak_time[:count] = streak
+        self.idle_time[:count] = idle
+        self.score[:count] += gained
+        return gained
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return a copy of the table, to restore it later (e.g. to roll back a tick)
+        """
+        count = len(self.__names)
+        snapshot: Dict[str, object] = {column: getattr(self, column)[:count].copy() for column in _COLUMNS}
+        snapshot["names"] = list(self.__names)
+        return snapshot
+
+    def restore(self, snapshot: Dict[str, object]) -> None:
+        """
+        Restore the table as it was when the snapshot was taken
+        """
+        names = list(snapshot["names"])
+        self.__names = []
+        self.__index = {}
+        self.__allocate(max(len(self.x), len(names)))
+        for column in _COLUMNS:
+            getattr(self, column)[:len(names)] = snapshot[column]
+        self.__names = names
+        self.__index = {name: row for row, name in enumerate(names)}
+
+    @classmethod
+    def from_states(cls, states: Iterable[PlayerState]) -> PlayerTable:
+        """
+        Build a table from runtime states
+        """
+        states = list(states)
+        table = cls(len(states))
+        for state in states:
+            table.add(state.name, state.x, state.y, state.direction, state.health, state.score)
+        return table
+
+    def write_back(self, states: Iterable[PlayerState]) -> None:
+        """
+        Copy the table into the runtime states of the same names
+        """
+        for state in states:
+            row = self.__index.get(state.name)
+            if row is None:
+                continue
+            state.x, state.y = int(self.x[row]), int(self.y[row])
+            state.direction = int(self.direction[row])
+            state.health, state.score = int(self.health[row]), float(self.score[row])
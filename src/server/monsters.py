@@ -0,0 +1,230 @@
+"""
+Monsters hunting the players in the maze (Minova, see README).
+
+Each monster chases the nearest player in sight along an A* path (see maze.pathfinding).
+Paths are cached between ticks and only repaired when the target moves:
+ - the target did not move: keep following the path,
+ - it stepped back onto the path: cut the path there,
+ - it stepped next to the end of the path: extend the path by this cell,
+ - otherwise, or when the monster left its path: search again.
+Searches share a budget of expanded cells per tick, so a tick stays bounded
+ whatever the number of monsters and the size of the map. Monsters that did not get
+ their search this tick keep their previous path, and are served first on the next one.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, Optional
+
+import root_config
+from src.server.maze.pathfinding import Cell, PathFinder
+from src.server.spatial import SpatialGrid
+
+DEFAULT_SIGHT = 12
+DEFAULT_HITS_TO_KILL = 3
+
+
+class Monster:
+    """
+    A monster of the arena, and its cached path
+    """
+    __slots__ = ("name", "x", "y", "target", "goal", "path", "complete", "pending", "moved_at")
+
+    def __init__(self, name: str, x: int, y: int):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.target: Optional[Hashable] = None
+        # The cell the path leads to, and the cells to walk through, next one first
+        self.goal: Optional[Cell] = None
+        self.path: Deque[Cell] = deque()
+        self.complete = False
+        self.pending = False
+        self.moved_at = 0
+
+    @property
+    def position(self) -> Cell:
+        return self.x, self.y
+
+    def __repr__(self):
+        return f"<Monster(name='{self.name}', x={self.x}, y={self.y}, target={self.target}, " \
+               f"path={len(self.path)})>"
+
+
+class MonsterController:
+    """
+    Move monsters towards the players, and count the hits they give.
+    :param finder: the path finder of the current map
+    :param players: the spatial index of the players' positions
+    :param is_target: tells whether an indexed key is a player to hunt (e.g. alive)
+    :param dt_move: the time (ms) between two moves of a monster
+    :param budget: the maximum number of cells expanded by all the searches of a tick
+    """
+
+    def __init__(self, finder: PathFinder, players: SpatialGrid,
+                 is_target: Callable[[Hashable], bool] = lambda key: True,
+                 dt_move: int = 300, sight: float = DEFAULT_SIGHT, budget: int = 4000,
+                 hits_to_kill: int = DEFAULT_HITS_TO_KILL, hit_cooldown: int = 1000):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._logger.setLevel(root_config.LOGGING_LEVEL)
+        self.__finder = finder
+        self.__players = players
+        self.__is_target = is_target
+        self.__dt_move = dt_move
+        self.__sight = sight
+        self.__budget = budget
+        self.__hits_to_kill = hits_to_kill
+        self.__hit_cooldown = hit_cooldown
+        self.__monsters: List[Monster] = []
+        # Monsters waiting for a search, served in order across ticks
+        self.__pending: Deque[Monster] = deque()
+        self.__hits: Counter = Counter()
+        self.__hit_at: Dict[Hashable, int] = {}
+        self.__eliminated = set()
+        self.searches = 0
+        self.repairs = 0
+
+    @property
+    def monsters(self) -> List[Monster]:
+        return list(self.__monsters)
+
+    @property
+    def hits(self) -> Dict[Hashable, int]:
+        """ return the number of hits taken by each player """
+        return dict(self.__hits)
+
+    def spawn(self, x: int, y: int, name: Optional[str] = None) -> Monster:
+        """
+        Add a monster on a walkable cell
+        """
+        if not self.__finder.walkable(x, y):
+            raise ValueError(f"Cannot spawn a monster on ({x}, {y})")
+        monster = Monster(name or f"Minova{len(self.__monsters) + 1}", x, y)
+        self.__monsters.append(monster)
+        return monster
+
+    def set_finder(self, finder: PathFinder) -> None:
+        """
+        Use the path finder of a new map, cached paths are dropped
+        """
+        self.__finder = finder
+        for monster in self.__monsters:
+            monster.goal, monster.path, monster.complete, monster.pending = None, deque(), False, False
+        self.__pending.clear()
+
+    def __choose_target(self, monster: Monster) -> Optional[Cell]:
+        """
+        Keep the current target while in sight, else hunt the nearest player
+        """
+        if monster.target is not None and self.__is_target(monster.target):
+            position = self.__players.position(monster.target)
+            if position is not None and abs(position[0] - monster.x) + abs(position[1] - monster.y) \
+                    <= 2 * self.__sight:
+                return int(position[0]), int(position[1])
+        monster.target = None
+        for key in self.__players.within(monster.x, monster.y, self.__sight):
+            if self.__is_target(key):
+                monster.target = key
+                position = self.__players.position(key)
+                return int(position[0]), int(position[1])
+        return None
+
+    def __repair(self, monster: Monster, goal: Cell) -> bool:
+        """
+        Adapt the cached path to the new cell of the target, return False if a search is needed
+        """
+        if not monster.complete or monster.goal is None:
+            return False
+        if goal == monster.goal:
+            return True
+        if goal == monster.position:
+            monster.path.clear()
+        elif goal in monster.path:
+            while monster.path[-1] != goal:
+                monster.path.pop()
+        elif abs(goal[0] - monster.goal[0]) + abs(goal[1] - monster.goal[1]) == 1 \
+                and self.__finder.walkable(*goal):
+            monster.path.append(goal)
+        else:
+            return False
+        monster.goal = goal
+        self.repairs += 1
+        return True
+
+    def __plan(self) -> None:
+        """
+        Run the searches waiting, within the budget of the tick
+        """
+        budget = self.__budget
+        served = 0
+        pending = len(self.__pending)
+        while self.__pending and budget > 0 and served < pending:
+            monster = self.__pending.popleft()
+            monster.pending = False
+            served += 1
+            goal = monster.goal
+            if goal is None:
+                continue
+            result = self.__finder.search(monster.position, goal, max_expansions=budget)
+            budget -= max(1, result.expanded)
+            self.searches += 1
+            monster.path = deque(result.path)
+            monster.complete = result.complete
+            if not result.complete:
+                # Walk towards the most promising cell, and search again later
+                monster.pending = True
+                self.__pending.append(monster)
+
+    def __hit(self, monster: Monster, now: int) -> List[Hashable]:
+        eliminated = []
+        for key in self.__players.within(monster.x, monster.y, 0):
+            if not self.__is_target(key) or key in self.__eliminated:
+                continue
+            if now - self.__hit_at.get(key, -self.__hit_cooldown) < self.__hit_cooldown:
+                continue
+            self.__hit_at[key] = now
+            self.__hits[key] += 1
+            self._logger.info(f"{monster.name} hits {key} ({self.__hits[key]}/{self.__hits_to_kill})")
+            if self.__hits[key] >= self.__hits_to_kill:
+                self.__eliminated.add(key)
+                eliminated.append(key)
+        return eliminated
+
+    def update(self, now: int) -> List[Hashable]:
+        """
+        Move the monsters for the game time now (ms), and hit the players they reach.
+        :return: the players eliminated during this update
+        """
+        for monster in self.__monsters:
+            goal = self.__choose_target(monster)
+            if goal is None:
+                monster.goal, monster.path = None, deque()
+                continue
+            if monster.pending:
+                monster.goal = goal
+            elif not self.__repair(monster, goal):
+                monster.goal, monster.complete, monster.pending = goal, False, True
+                self.__pending.append(monster)
+        self.__plan()
+        eliminated = []
+        for monster in self.__monsters:
+            if now - monster.moved_at >= self.__dt_move and monster.path:
+                x, y = monster.path.popleft()
+                if self.__finder.walkable(x, y):
+                    monster.x, monster.y = x, y
+                    monster.moved_at = now
+                else:
+                    monster.path.clear()
+                    monster.complete = False
+            eliminated.extend(self.__hit(monster, now))
+        return eliminated
+
+    def reset_hits(self, players: Iterable[Hashable] = None) -> None:
+        """
+        Forget the hits taken, by everyone or by the given players
+        """
+        for key in list(self.__hits) if players is None else players:
+            self.__hits.pop(key, None)
+            self.__hit_at.pop(key, None)
+            self.__eliminated.discard(key)
@@ -0,0 +1,136 @@
+"""
+Hot reload of the arbiter configuration, without restarting it.
+
+FileWatcher polls a file for changes (its mtime and size), at most once per interval.
+ConfigReloader watches rules.json and state_machine_config.json. When one of them changes,
+ it validates the new content and applies only what changed since the last load:
+ - the rules that changed in the file are sent to the arena (those changed by the arbiter
+   during the game, like pause or info, are left alone),
+ - the states and links of the state machine are replaced, the current state is kept.
+An invalid file is logged and ignored, the previous configuration stays in place.
+The reloader is polled by the manager between two updates, so a change never lands mid-handler.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import root_config
+from src.server.metrics import REGISTRY
+from src.server.rules import RULES_PATH, RulesError, diff_rules, load_rules
+from src.server.state_machine import StateMachine, StateMachineConfig
+
+__current_dir__ = os.path.dirname(os.path.abspath(__file__))
+
+STATE_MACHINE_CONFIG_PATH = os.path.join(__current_dir__, "state_machine", "state_machine_config.json")
+DEFAULT_INTERVAL = 1.0
+
+_RELOADS = REGISTRY.counter("arbiter_config_reloads_total", "Reloads of the configuration files, by outcome",
+                            ("file", "outcome"))
+
+
+class FileWatcher:
+    """
+    Poll a file for changes.
+    :param path: the file to watch
+    :param interval: the minimum time (s) between two checks
+    :param clock: the monotonic clock of the checks
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.__interval = interval
+        self.__clock = clock
+        self.__next_check = clock() + interval
+        self.__signature = self.__stat()
+
+    def __stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self, force: bool = False) -> bool:
+        """
+        Return True if the file changed since the last check, checking at most once per interval
+        """
+        now = self.__clock()
+        if not force and now < self.__next_check:
+            return False
+        self.__next_check = now + self.__interval
+        signature = self.__stat()
+        if signature == self.__signature:
+            return False
+        self.__signature = signature
+        # A removed file is not a new configuration
+        return signature is not None
+
+
+class ConfigReloader:
+    """
+    Reload the rules and the state machine configuration when their files change.
+    :param apply_rules: sends rules to the arena, e.g. ArenaManager.apply_rules
+    :param state_machine: the state machine to reconfigure
+    """
+
+    def __init__(self, apply_rules: Callable[[Dict[str, Any]], Dict[str, Any]], state_machine: StateMachine,
+                 rules_path: str = RULES_PATH, state_machine_path: str = STATE_MACHINE_CONFIG_PATH,
+                 interval: float = DEFAULT_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._logger.setLevel(root_config.LOGGING_LEVEL)
+        self.__apply_rules = apply_rules
+        self.__state_machine = state_machine
+        self.__rules_watcher = FileWatcher(rules_path, interval, clock)
+        self.__state_machine_watcher = FileWatcher(state_machine_path, interval, clock)
+        self.__rules = load_rules(rules_path)
+        self.errors: List[str] = []
+
+    @property
+    def rules(self) -> Dict[str, Any]:
+        """ return the rules last loaded from the file """
+        return self.__rules
+
+    def poll(self, force: bool = False) -> bool:
+        """
+        Apply the files that changed, return True if anything was applied
+        """
+        applied = False
+        if self.__rules_watcher.changed(force):
+            applied |= self.__reload_rules()
+        if self.__state_machine_watcher.changed(force):
+            applied |= self.__reload_state_machine()
+        return applied
+
+    def __reload_rules(self) -> bool:
+        path = self.__rules_watcher.path
+        try:
+            rules = load_rules(path)
+        except (OSError, RulesError) as e:
+            return self.__failed("rules", e)
+        changes = diff_rules(rules, self.__rules)
+        self.__rules = rules
+        if changes:
+            self._logger.info(f"Reloading rules {sorted(changes)} from {path}")
+            self.__apply_rules(changes)
+        _RELOADS.inc(file="rules", outcome="applied")
+        return bool(changes)
+
+    def __reload_state_machine(self) -> bool:
+        path = self.__state_machine_watcher.path
+        try:
+            config = StateMachineConfig(path)
+            self.__state_machine.reconfigure(config)
+        except (OSError, ValueError, KeyError, TypeError, ImportError) as e:
+            return self.__failed("state_machine", e)
+        self._logger.info(f"Reloaded state machine configuration from {path}")
+        _RELOADS.inc(file="state_machine", outcome="applied")
+        return True
+
+    def __failed(self, file: str, error: Exception) -> bool:
+        self._logger.error(f"Ignoring invalid {file} configuration, keeping the previous one: {error}")
+        self.errors.append(f"{file}: {error}")
+        _RELOADS.inc(file=file, outcome="invalid")
+        return False
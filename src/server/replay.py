@@ -0,0 +1,85 @@
+"""
+Offline replay of recorded arena sessions.
+
+A session recorded with `SyncAgent(..., record="session.ovarec")` is fed back
+ through an in-process broker into a SyncAgent and its ArenaManager,
+ at real time or at max speed, to profile the manager without a server:
+
+    python -m src.server.replay session.ovarec [--speed 1]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from src.api.j2l.pyrobotx.session import OfflineBroker, SessionReplayer
+from src.server.arena_agent import SyncAgent
+from src.server.arena_manager import ArenaManager
+
+
+@dataclass
+class ReplayReport:
+    """
+    Outcome of a replay: the agent and manager fed with the session,
+    the requests they published, and the time spent handling each message.
+    """
+    agent: SyncAgent
+    manager: Optional[ArenaManager]
+    published: List[Tuple[str, bytes]]
+    handle_ms: List[float] = field(default_factory=list)
+
+    @property
+    def messages(self) -> int:
+        return len(self.handle_ms)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.handle_ms)
+
+
+def replay_session(path: str, speed: Optional[float] = None, with_manager: bool = True) -> ReplayReport:
+    """
+    Replays a recorded session into a new SyncAgent, and an ArenaManager once the arena rules are received.
+    :param path: the session file
+    :param speed: 1 for real time, 2 for twice faster..., None for max speed
+    :param with_manager: False to only replay into the agent
+    """
+    logger = logging.getLogger("Replay")
+    replayer = SessionReplayer(path, speed)
+    metadata = replayer.metadata
+    broker = OfflineBroker()
+    # Topics depend on the arena and the client id, so the agent must use the recorded ones
+    agent = SyncAgent(metadata.get("clientId"), metadata.get("arena"), "replay", "replay", "offline", 0,
+                      connectionPool=broker.pool, waitArenaConnection=False, welcomePrint=False,
+                      verbosity=0)
+    report = ReplayReport(agent, None, broker.published)
+
+    def deliver(topic: str, payload: bytes) -> None:
+        start = time.perf_counter_ns()
+        broker.publish(topic, payload)
+        agent.update(enableSleep=False)
+        if with_manager and report.manager is None and "t" in agent.game:
+            report.manager = ArenaManager(agent)
+        report.handle_ms.append((time.perf_counter_ns() - start) / 1e6)
+
+    count = replayer.replay(deliver)
+    logger.info("Replayed %d message(s) in %.1fms", count, report.total_ms)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded arena session")
+    parser.add_argument("path", help="session file recorded by SyncAgent(record=...)")
+    parser.add_argument("--speed", type=float, default=None, help="1 for real time, default max speed")
+    args = parser.parse_args(argv)
+    report = replay_session(args.path, args.speed)
+    if report.messages > 0:
+        print(f"{report.messages} messages, {report.total_ms:.1f}ms, "
+              f"mean {report.total_ms / report.messages:.3f}ms, max {max(report.handle_ms):.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
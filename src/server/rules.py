@@ -0,0 +1,208 @@
+"""
+Rules of the arena: loading, validation and diff against the arena state.
+
+The schema describes the type of each rule, and which rules hold one value per profile,
+ per weapon or per tile. It is compiled once into checks, so a rules file is validated
+ when it is loaded, before any request costs a round-trip to the arena.
+Loaded rules are cached by the hash of the file, and only the rules that differ
+ from the arena state (agent.game) need to be sent.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+__current_dir__ = os.path.dirname(os.path.abspath(__file__))
+
+RULES_PATH = os.path.join(__current_dir__, "rules.json")
+
+# What a list of values is indexed by
+PER_PROFILE = "profile"
+PER_WEAPON = "weapon"
+PER_TILE = "tile"
+
+_NUMBER = (int, float)
+
+
+class RulesError(ValueError):
+    """
+    Invalid rules, with every issue found
+    """
+
+    def __init__(self, issues: List[str], source: Optional[str] = None):
+        self.issues = list(issues)
+        self.source = source
+        where = f" in {source}" if source else ""
+        super().__init__(f"{len(self.issues)} invalid rule(s){where}: " + "; ".join(self.issues))
+
+
+@dataclass(frozen=True)
+class RuleField:
+    """
+    Schema of a rule: the type of its value, or of each of its values if it is `per` something
+    """
+    kind: Tuple[type, ...]
+    per: Optional[str] = None
+
+
+def _field(kind, per: Optional[str] = None) -> RuleField:
+    return RuleField(kind if isinstance(kind, tuple) else (kind,), per)
+
+
+SCHEMA: Dict[str, RuleField] = {
+    "timeLimit": _field(int), "gridColumns": _field(int), "gridRows": _field(int),
+    "nMonsters": _field(int), "monsters": _field(list),
+    "maxPlayers": _field(int), "maxRobots": _field(int), "borderHit": _field(_NUMBER),
+    "info": _field(str), "pause": _field(bool), "open": _field(bool), "public": _field(bool),
+    "onlyAuthorised": _field(bool), "hitTeam": _field(bool), "brownianMap": _field(bool),
+    "whiteList": _field(list), "blackList": _field(list), "map": _field(list),
+    "profiles": _field(str, PER_PROFILE), "pIcons": _field(str, PER_PROFILE),
+    "mass": _field(_NUMBER, PER_PROFILE), "range": _field(_NUMBER, PER_PROFILE),
+    "spreadRange": _field(_NUMBER, PER_PROFILE), "dtDir": _field(_NUMBER, PER_PROFILE),
+    "dtMove": _field(_NUMBER, PER_PROFILE), "dDirMax": _field(_NUMBER, PER_PROFILE),
+    "dxMax": _field(int, PER_PROFILE), "dyMax": _field(int, PER_PROFILE),
+    "weapon": _field(int, PER_PROFILE), "hitCollision": _field(_NUMBER, PER_PROFILE),
+    "hitSelfCollision": _field(_NUMBER, PER_PROFILE),
+    "shieldFire": _field(_NUMBER, PER_PROFILE), "shieldCollision": _field(_NUMBER, PER_PROFILE),
+    "lifeIni": _field(_NUMBER, PER_PROFILE), "ammoIni": _field(_NUMBER, PER_PROFILE),
+    "dtRespawn": _field(_NUMBER, PER_PROFILE), "nRespawn": _field(int, PER_PROFILE),
+    "accelerationMax": _field(_NUMBER, PER_PROFILE), "speedMax": _field(_NUMBER, PER_PROFILE),
+    "lifeTime": _field(_NUMBER, PER_PROFILE), "speedIni": _field(list, PER_PROFILE),
+    "blind": _field(bool, PER_PROFILE), "moveToDir": _field(bool, PER_PROFILE),
+    "fxFire": _field(bool, PER_PROFILE), "invisible": _field(bool, PER_PROFILE),
+    "invincible": _field(bool, PER_PROFILE), "infiniteAmmo": _field(bool, PER_PROFILE),
+    "collision": _field(bool, PER_PROFILE), "collisionMap": _field(bool, PER_PROFILE),
+    "canRulePlayer": _field(bool, PER_PROFILE), "canRuleArena": _field(bool, PER_PROFILE),
+    "accelerationOnly": _field(bool, PER_PROFILE), "popOnDeath": _field(bool, PER_PROFILE),
+    "wIcons": _field(str, PER_WEAPON), "fireImgs": _field(str, PER_WEAPON),
+    "dtFire": _field(_NUMBER, PER_WEAPON), "hitFire": _field(_NUMBER, PER_WEAPON),
+    "rangeFire": _field(_NUMBER, PER_WEAPON), "spreadFire": _field(_NUMBER, PER_WEAPON),
+    "ownerFire": _field(bool, PER_WEAPON),
+    "mapFriction": _field(_NUMBER, PER_TILE), "mapHit": _field(_NUMBER, PER_TILE),
+    "mapBreakable": _field(bool, PER_TILE),
+}
+
+# The rules giving the number of profiles and of weapons
+_COUNT_OF = {PER_PROFILE: "profiles", PER_WEAPON: "wIcons"}
+
+Check = Callable[[Dict[str, Any], List[str]], None]
+
+
+def _is(value: Any, kind: Tuple[type, ...]) -> bool:
+    # bool is an int, but an int rule never takes a bool
+    if isinstance(value, bool):
+        return bool in kind
+    return isinstance(value, kind)
+
+
+def _compile_field(key: str, rule: RuleField) -> Check:
+    names = "/".join(kind.__name__ for kind in rule.kind)
+    if rule.per is None:
+        def check(rules: Dict[str, Any], issues: List[str]) -> None:
+            if not _is(rules[key], rule.kind):
+                issues.append(f"{key} must be a {names}, got {type(rules[key]).__name__}")
+        return check
+
+    count_key = _COUNT_OF.get(rule.per)
+
+    def check_values(rules: Dict[str, Any], issues: List[str]) -> None:
+        values = rules[key]
+        if not isinstance(values, list):
+            issues.append(f"{key} must be a list of {names} per {rule.per}")
+            return
+        wrong = [i for i, value in enumerate(values) if not _is(value, rule.kind)]
+        if wrong:
+            issues.append(f"{key}[{wrong[0]}] must be a {names}")
+        count = rules.get(count_key) if count_key else None
+        # Extra values are ignored by the arena, missing ones are not
+        if isinstance(count, list) and key != count_key and len(values) < len(count):
+            issues.append(f"{key} has {len(values)} values for {len(count)} {rule.per}s ({count_key})")
+    return check_values
+
+
+def _check_map(rules: Dict[str, Any], issues: List[str]) -> None:
+    _map = rules["map"]
+    if not _map:
+        return
+    if not all(isinstance(row, list) for row in _map):
+        issues.append("map must be a list of rows")
+        return
+    columns, rows = rules.get("gridColumns"), rules.get("gridRows")
+    if rows is not None and len(_map) != rows:
+        issues.append(f"map has {len(_map)} rows, gridRows is {rows}")
+    if columns is not None and any(len(row) != columns for row in _map):
+        issues.append(f"map rows must have gridColumns={columns} cells")
+    tiles = {tile for row in _map for tile in row}
+    if not all(isinstance(tile, int) and not isinstance(tile, bool) and tile >= 0 for tile in tiles):
+        issues.append("map cells must be positive integers")
+        return
+    friction = rules.get("mapFriction")
+    if isinstance(friction, list) and tiles and max(tiles) >= len(friction):
+        issues.append(f"map uses tile {max(tiles)}, mapFriction has {len(friction)} values")
+
+
+def _check_weapons(rules: Dict[str, Any], issues: List[str]) -> None:
+    weapons, icons = rules["weapon"], rules.get("wIcons")
+    if isinstance(weapons, list) and isinstance(icons, list):
+        unknown = [w for w in weapons if isinstance(w, int) and not 0 <= w < len(icons)]
+        if unknown:
+            issues.append(f"weapon {unknown[0]} is not one of the {len(icons)} weapons (wIcons)")
+
+
+def compile_schema(schema: Dict[str, RuleField]) -> Dict[str, List[Check]]:
+    """
+    Return the checks to run for each rule of the schema, and for the rules they depend on
+    """
+    checks: Dict[str, List[Check]] = {key: [_compile_field(key, rule)] for key, rule in schema.items()}
+    checks.setdefault("map", []).append(_check_map)
+    checks.setdefault("weapon", []).append(_check_weapons)
+    return checks
+
+
+_CHECKS = compile_schema(SCHEMA)
+
+
+def validate_rules(rules: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return the rules if they are valid, raise RulesError with every issue otherwise.
+    Rules missing from the schema are left to the arena.
+    """
+    if not isinstance(rules, dict):
+        raise RulesError([f"rules must be an object, got {type(rules).__name__}"], source)
+    issues: List[str] = []
+    for key in rules:
+        for check in _CHECKS.get(key, ()):
+            check(rules, issues)
+    if issues:
+        raise RulesError(issues, source)
+    return rules
+
+
+_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
+def load_rules(path: str = RULES_PATH) -> Dict[str, Any]:
+    """
+    Return a copy of the validated rules of a file, parsed once per content
+    """
+    with open(path, "rb") as rules_file:
+        content = rules_file.read()
+    digest = hashlib.sha1(content).hexdigest()
+    if digest not in _CACHE:
+        try:
+            rules = json.loads(content)
+        except ValueError as e:
+            raise RulesError([f"invalid JSON: {e}"], path) from e
+        _CACHE[digest] = validate_rules(rules, path)
+    return copy.deepcopy(_CACHE[digest])
+
+
+def diff_rules(rules: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the rules whose value differs from the current state of the arena
+    """
+    return {key: value for key, value in rules.items() if key not in current or current[key] != value}
@@ -0,0 +1,461 @@
+"""
+Headless simulator of the arena, for offline matches.
+
+SimulatedArena implements the part of the jusdeliens arena the game relies on:
+ the grid and its mapFriction, moves paced by dtMove (entering a cell takes dtMove / friction),
+ collisions with walls, borders and other players, scoring (see ScoreRules) and pause.
+Time is virtual: the arena steps by `dt_step` ms once every robot has updated, so a
+ match runs as fast as the bots can play, and a seed gives the same match every time.
+
+SimulatedRobot is an IRobot backed by the simulator, to give to an Agent instead of
+ the MQTT client: Agent(..., robot=arena.robot("p1"), waitArenaConnection=False).
+"""
+from __future__ import annotations
+
+import copy
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.api.j2l.pyrobotx.events import EventBus
+from src.api.j2l.pyrobotx.robot import IRobot, RobotEvent
+from src.server.maze import ScoreRules, Tile, generate_maze
+from src.server.models.player_table import PlayerTable
+from src.server.rules import RULES_PATH, load_rules
+
+DEFAULT_STEP_MS = 50
+
+
+def default_rules() -> Dict[str, Any]:
+    """
+    Return the rules the arbiter pushes to the arena (rules.json)
+    """
+    return load_rules(RULES_PATH)
+
+
+def _per_profile(rules: Dict[str, Any], key: str, profile: int, default: Any) -> Any:
+    values = rules.get(key)
+    if not isinstance(values, list) or not values:
+        return default
+    return values[profile] if profile < len(values) else values[0]
+
+
+class _SimPlayer:
+    """
+    What the arena keeps of a player besides its row of the PlayerTable
+    """
+    __slots__ = ("name", "profile", "target", "ready_at", "n_move", "n_collision", "led",
+                 "charged", "requests")
+
+    def __init__(self, name: str, profile: int):
+        self.name = name
+        self.profile = profile
+        self.target: Optional[Tuple[int, int]] = None
+        self.ready_at = 0
+        self.n_move = 0
+        self.n_collision = 0
+        self.led = [0, 0, 0]
+        # True once the player reached the battery
+        self.charged = False
+        self.requests: Dict[str, Any] = {}
+
+
+class SimulatedArena:
+    """
+    Deterministic arena, stepped in virtual time.
+    :param rules: the arena rules, rules.json if None. A maze is generated from the seed if there is no map.
+    :param seed: the seed of the maze and of the spawn cells
+    :param dt_step: the virtual time (ms) of a step
+    :param score_rules: the scoring rules
+    :param spawn_seed: the seed of the spawn cells only, e.g. to play several trials on a maze
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None, seed: Optional[int] = None,
+                 dt_step: int = DEFAULT_STEP_MS, score_rules: ScoreRules = ScoreRules(),
+                 spawn_seed: Optional[int] = None):
+        self.__rules = copy.deepcopy(rules) if rules is not None else default_rules()
+        self.__random = random.Random(seed if spawn_seed is None else spawn_seed)
+        self.__dt_step = dt_step
+        self.__score_rules = score_rules
+        self.__players: Dict[str, _SimPlayer] = {}
+        self.__table = PlayerTable()
+        self.__robots: Dict[str, SimulatedRobot] = {}
+        self.__updated: set = set()
+        self.__spawns: List[Tuple[int, int]] = []
+        self.game: Dict[str, Any] = dict(self.__rules)
+        self.game["t"] = 0
+        self.game["pause"] = bool(self.__rules.get("pause", False))
+        self.game["players"] = []
+        if not self.game.get("map"):
+            maze = generate_maze(seed, columns=int(self.game.get("gridColumns", 40)),
+                                 rows=int(self.game.get("gridRows", 40)))
+            self.game["map"] = maze.to_list()
+            self.__spawns = list(maze.spawns)
+        self.__set_map(self.game["map"])
+        self.steps = 0
+
+    # --- Map ---
+
+    def __set_map(self, _map: List[List[int]]) -> None:
+        self.__grid = np.asarray(_map, dtype=np.uint8)
+        rows, columns = self.__grid.shape
+        self.game["gridRows"], self.game["gridColumns"] = rows, columns
+        friction = [float(f) for f in self.game.get("mapFriction", [1, 0])]
+        self.__friction = friction
+        if not self.__spawns:
+            ys, xs = np.nonzero(self.__walkable_mask())
+            self.__spawns = list(zip(xs.tolist(), ys.tolist()))
+
+    def __walkable_mask(self) -> np.ndarray:
+        friction = np.zeros(max(int(self.__grid.max()) + 1, len(self.__friction)))
+        friction[:len(self.__friction)] = self.__friction
+        return (friction[self.__grid] > 0) & (self.__grid != Tile.BATTERY)
+
+    @property
+    def grid(self) -> np.ndarray:
+        return self.__grid
+
+    @property
+    def battery(self) -> Optional[Tuple[int, int]]:
+        ys, xs = np.nonzero(self.__grid == Tile.BATTERY)
+        return (int(xs[0]), int(ys[0])) if len(ys) else None
+
+    def __friction_of(self, x: int, y: int) -> float:
+        if not (0 <= y < self.__grid.shape[0] and 0 <= x < self.__grid.shape[1]):
+            return 0.0
+        tile = int(self.__grid[y, x])
+        return self.__friction[tile] if tile < len(self.__friction) else 0.0
+
+    # --- Players ---
+
+    @property
+    def table(self) -> PlayerTable:
+        """ return the runtime state of the players """
+        return self.__table
+
+    @property
+    def t(self) -> int:
+        """ return the virtual time of the arena, in ms """
+        return self.game["t"]
+
+    def join(self, name: str, profile: int = 0) -> Dict[str, Any]:
+        """
+        Add a player on a free spawn cell drawn from the seed, and return its state
+        """
+        if name in self.__players:
+            return self.player_state(name)
+        player = _SimPlayer(name, profile)
+        x, y = self.__free_spawn()
+        life = int(_per_profile(self.__rules, "lifeIni", profile, 100))
+        self.__players[name] = player
+        self.__table.add(name, x, y, 0, life, 0.0)
+        player.ready_at = self.t
+        self.game["players"] = sorted(self.__players)
+        return self.player_state(name)
+
+    def leave(self, name: str) -> None:
+        if self.__players.pop(name, None) is not None:
+            self.__table.remove(name)
+            self.__robots.pop(name, None)
+            self.__updated.discard(name)
+            self.game["players"] = sorted(self.__players)
+
+    def __free_spawn(self) -> Tuple[int, int]:
+        occupied = set(zip(self.__table.view("x").tolist(), self.__table.view("y").tolist()))
+        free = [cell for cell in self.__spawns if cell not in occupied]
+        return self.__random.choice(free or self.__spawns)
+
+    def __occupied(self, x: int, y: int, name: str) -> bool:
+        xs, ys = self.__table.view("x"), self.__table.view("y")
+        for row in np.flatnonzero((xs == x) & (ys == y)).tolist():
+            other = self.__players[self.__table.names[row]]
+            if other.name != name and _per_profile(self.__rules, "collision", other.profile, True):
+                return True
+        return False
+
+    def player_state(self, name: str) -> Dict[str, Any]:
+        """
+        Return the state of a player, as the arena sends it to its client
+        """
+        player = self.__players[name]
+        row = self.__table.index_of(name)
+        return {
+            "playerId": name, "clientId": name, "robotId": "_", "profile": player.profile, "team": 0,
+            "x": int(self.__table.x[row]), "y": int(self.__table.y[row]),
+            "dir": int(self.__table.direction[row]), "life": int(self.__table.health[row]),
+            "score": round(float(self.__table.score[row]), 2), "led": list(player.led),
+            "nMove": player.n_move, "nCollision": player.n_collision, "range": self.__range(name),
+        }
+
+    def __range(self, name: str) -> Dict[str, Any]:
+        """
+        Return the agents within the range rule of the player, all of them if the range is 0
+        """
+        player = self.__players[name]
+        radius = float(_per_profile(self.__rules, "range", player.profile, 0))
+        row = self.__table.index_of(name)
+        x, y = int(self.__table.x[row]), int(self.__table.y[row])
+        in_range = {}
+        for other_name, other in self.__players.items():
+            if other_name == name or _per_profile(self.__rules, "invisible", other.profile, False):
+                continue
+            other_row = self.__table.index_of(other_name)
+            ox, oy = int(self.__table.x[other_row]), int(self.__table.y[other_row])
+            if radius > 0 and (ox - x) ** 2 + (oy - y) ** 2 > radius * radius:
+                continue
+            in_range[other_name] = {"x": ox, "y": oy, "dir": int(self.__table.direction[other_row]),
+                                    "life": int(self.__table.health[other_row]), "profile": other.profile}
+        return in_range
+
+    # --- Requests ---
+
+    def request(self, name: str, key: str, value: Any) -> None:
+        """
+        Apply a request of a player (Agent.move, moveTowards, lookAt, ruleArena, rulePlayer, setColor)
+        """
+        player = self.__players.get(name)
+        if player is None:
+            return
+        row = self.__table.index_of(name)
+        x, y = int(self.__table.x[row]), int(self.__table.y[row])
+        if key in ("dx", "dy"):
+            # Both are sent together, wait for the pair
+            player.requests[key] = int(value)
+            if "dx" in player.requests and "dy" in player.requests:
+                dx_max = int(_per_profile(self.__rules, "dxMax", player.profile, 1))
+                dy_max = int(_per_profile(self.__rules, "dyMax", player.profile, 1))
+                dx = max(-dx_max, min(dx_max, player.requests.pop("dx")))
+                dy = max(-dy_max, min(dy_max, player.requests.pop("dy")))
+                player.target = (x + dx, y + dy)
+        elif key in ("x", "y"):
+            player.requests[key] = int(value)
+            if "x" in player.requests and "y" in player.requests:
+                player.target = (player.requests.pop("x"), player.requests.pop("y"))
+        elif key == "dir":
+            self.__table.direction[row] = int(value) % 4
+        elif key == "led":
+            player.led = list(value)
+        elif key == "ruleArena" and _per_profile(self.__rules, "canRuleArena", player.profile, False):
+            for rule, rule_value in dict(value).items():
+                self.rule_arena(rule, rule_value)
+        elif key == "rulePlayer" and _per_profile(self.__rules, "canRulePlayer", player.profile, False):
+            for agent_id, rules in dict(value).items():
+                for rule, rule_value in dict(rules).items():
+                    self.rule_player(agent_id, rule, rule_value)
+
+    def rule_arena(self, key: str, value: Any) -> None:
+        """
+        Change a rule of the arena, as the arbiter does
+        """
+        if key == "reset":
+            for name in list(self.__players):
+                self.rule_player(name, "reset", True)
+            return
+        self.game[key] = value
+        self.__rules[key] = value
+        if key == "map" and value:
+            self.__spawns = []
+            self.__set_map(value)
+        elif key == "mapFriction":
+            self.__friction = [float(f) for f in value]
+
+    def rule_player(self, name: str, key: str, value: Any) -> None:
+        """
+        Change an attribute of a player, as the arbiter does
+        """
+        player = self.__players.get(name)
+        if player is None:
+            return
+        row = self.__table.index_of(name)
+        if key == "reset":
+            x, y = self.__free_spawn()
+            self.__table.x[row], self.__table.y[row] = x, y
+            self.__table.health[row] = int(_per_profile(self.__rules, "lifeIni", player.profile, 100))
+            self.__table.score[row] = 0.0
+            self.__table.incident_time[row] = self.__table.streak_time[row] = 0.0
+            player.target, player.charged = None, False
+            player.n_move = player.n_collision = 0
+        elif key in ("x", "y"):
+            getattr(self.__table, key)[row] = int(value)
+        elif key == "life":
+            self.__table.health[row] = int(value)
+        elif key == "score":
+            self.__table.score[row] = float(value)
+
+    # --- Time ---
+
+    def step(self) -> None:
+        """
+        Advance the arena by one step of virtual time: move the players, then score them
+        """
+        self.game["t"] += self.__dt_step
+        self.steps += 1
+        if self.game.get("pause"):
+            return
+        count = len(self.__table)
+        moved = np.zeros(count, dtype=bool)
+        collided = np.zeros(count, dtype=bool)
+        move_period = np.zeros(count)
+        for name in sorted(self.__players):
+            row = self.__table.index_of(name)
+            self.__move(self.__players[name], row, moved, collided)
+            move_period[row] = float(_per_profile(self.__rules, "dtMove", self.__players[name].profile, 300)) / 1000
+        if count:
+            self.__table.apply_tick(self.__dt_step / 1000, moved, collided, self.__grid, self.__score_rules,
+                                    move_period)
+
+    def __move(self, player: _SimPlayer, row: int, moved: np.ndarray, collided: np.ndarray) -> None:
+        """
+        Walk the player towards its target, one cell at a time, as long as its moves are ready
+        """
+        table = self.__table
+        dt_move = float(_per_profile(self.__rules, "dtMove", player.profile, 300))
+        while player.target is not None and player.ready_at <= self.t and table.health[row] > 0:
+            x, y = int(table.x[row]), int(table.y[row])
+            tx, ty = player.target
+            if (x, y) == (tx, ty):
+                player.target = None
+                break
+            # Along x first, then along y
+            nx, ny = (x + (tx > x) - (tx < x), y) if tx != x else (x, y + (ty > y) - (ty < y))
+            friction = self.__friction_of(nx, ny)
+            if friction <= 0 or self.__occupied(nx, ny, player.name):
+                collided[row] = True
+                player.n_collision += 1
+                player.target = None
+                player.ready_at = self.t + dt_move
+                table.damage(row, int(_per_profile(self.__rules, "hitCollision", player.profile, 0)))
+                break
+            table.x[row], table.y[row] = nx, ny
+            moved[row] = True
+            player.n_move += 1
+            player.ready_at = max(player.ready_at, self.t - self.__dt_step) + dt_move / friction
+            if self.__grid[ny, nx] == Tile.BATTERY and not player.charged:
+                player.charged = True
+                table.add_score(row, self.__score_rules.battery_points)
+
+    def run(self, duration_ms: int, on_step: Optional[Callable[[SimulatedArena], None]] = None) -> None:
+        """
+        Step the arena for a duration of virtual time, calling on_step before each step
+        """
+        end = self.t + duration_ms
+        while self.t < end:
+            if on_step is not None:
+                on_step(self)
+            self.step()
+
+    # --- Robots ---
+
+    def robot(self, name: str, profile: int = 0) -> SimulatedRobot:
+        """
+        Return the robot of a player (joining it), to give to an Agent
+        """
+        if name not in self.__robots:
+            self.join(name, profile)
+            self.__robots[name] = SimulatedRobot(self, name)
+        return self.__robots[name]
+
+    def _robot_updated(self, name: str) -> None:
+        """
+        Step once every robot has updated since the last step (lockstep)
+        """
+        self.__updated.add(name)
+        if self.__updated >= set(self.__robots):
+            self.__updated.clear()
+            self.step()
+
+    def charged(self, name: str) -> bool:
+        """
+        Return True if the player reached the battery
+        """
+        return self.__players[name].charged
+
+    def scores(self) -> Dict[str, float]:
+        return {name: round(float(self.__table.score[self.__table.index_of(name)]), 2)
+                for name in sorted(self.__players)}
+
+
+class SimulatedRobot(IRobot):
+    """
+    IRobot of a player in a SimulatedArena, in place of the MQTT client of an Agent
+    """
+
+    def __init__(self, arena: SimulatedArena, name: str):
+        self.__arena = arena
+        self.__name = name
+        self.__events = EventBus(RobotEvent.__dict__.values())
+        self.__requests: List[Tuple[str, Any]] = []
+        self.__connected = False
+        self.__player_sent: Dict[str, Any] = {}
+        self.__arena_sent: Dict[str, Any] = {}
+
+    def addEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None], priority: int = 0,
+                         dispatch: str = "sync", loop=None) -> Any:
+        return self.__events.addEventListener(eventName, callback, priority, dispatch, loop)
+
+    def removeEventListener(self, eventName: str, callback: Callable[[Any, str, Any], None]) -> bool:
+        return self.__events.removeEventListener(eventName, callback)
+
+    def getListenerStats(self, eventName: str or None = None) -> list[dict[str, Any]]:
+        return self.__events.getListenerStats(eventName)
+
+    def changeRobot(self, robotId: str, autoconnect: bool):
+        pass
+
+    def connect(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        self.__arena.leave(self.__name)
+        self.__connected = False
+
+    def isConnectedToRobot(self) -> bool:
+        return False
+
+    def isConnectedToArena(self) -> bool:
+        return self.__connected
+
+    def getRobotId(self) -> str:
+        return "_"
+
+    def getPlayerState(self) -> dict[str, Any]:
+        return self.__arena.player_state(self.__name)
+
+    def getArenaState(self) -> dict[str, Any]:
+        return dict(self.__arena.game)
+
+    def request(self, key: str, value: Any) -> None:
+        self.requestPlayer(key, value)
+
+    def requestPlayer(self, key: str, value: Any) -> None:
+        self.__requests.append((key, value))
+
+    def requestArena(self, key: str, value: Any) -> None:
+        self.__requests.append(("ruleArena", {key: value}))
+
+    def stopRecording(self) -> None:
+        pass
+
+    def update(self, enableSleep=True) -> None:
+        """
+        Send the requests to the arena, step it in lockstep with the other robots,
+         and notify the changes of the player and of the arena. Never sleeps.
+        """
+        self.__events.notify(RobotEvent.updated, None)
+        requests, self.__requests = self.__requests, []
+        for key, value in requests:
+            self.__arena.request(self.__name, key, value)
+        self.__arena._robot_updated(self.__name)
+        if not self.__connected:
+            self.__connected = True
+            self.__events.notify(RobotEvent.arenaConnected, None)
+        game = self.__arena.game
+        changed = {key: value for key, value in game.items() if self.__arena_sent.get(key) != value}
+        if changed:
+            self.__arena_sent.update(copy.deepcopy(changed))
+            self.__events.notify(RobotEvent.arenaChanged, changed)
+        state = self.__arena.player_state(self.__name)
+        if state != self.__player_sent:
+            self.__player_sent = state
+            self.__events.notify(RobotEvent.playerChanged, state)
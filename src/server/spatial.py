@@ -0,0 +1,141 @@
+"""
+Spatial index of the entities of the arena (players, monsters).
+
+A uniform grid of buckets of `cell_size` x `cell_size` cells: each entity is kept
+ in the bucket of its position, and only moves to another bucket when it crosses
+ a bucket border. A query within r of (x, y) only looks at the buckets overlapping
+ the query square, so its cost depends on the entities nearby, not on the total.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_CELL_SIZE = 4
+
+
+class SpatialGrid:
+    """
+    Uniform grid index of entity positions, updated incrementally
+    """
+
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE):
+        if cell_size <= 0:
+            raise ValueError(f"Cell size must be positive, got {cell_size}")
+        self.__cell_size = cell_size
+        self.__positions: Dict[Hashable, Tuple[float, float]] = {}
+        self.__bucket_of: Dict[Hashable, Tuple[int, int]] = {}
+        self.__buckets: Dict[Tuple[int, int], Set[Hashable]] = {}
+
+    @property
+    def cell_size(self) -> int:
+        """ return the size of a bucket, in cells """
+        return self.__cell_size
+
+    def __len__(self) -> int:
+        return len(self.__positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__positions
+
+    def __bucket(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.__cell_size), int(y // self.__cell_size)
+
+    def update(self, key: Hashable, x: float, y: float) -> None:
+        """
+        Insert an entity, or move it to (x, y)
+        """
+        self.__positions[key] = (x, y)
+        bucket = self.__bucket(x, y)
+        previous = self.__bucket_of.get(key)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self.__discard(key, previous)
+        self.__bucket_of[key] = bucket
+        self.__buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key: Hashable) -> bool:
+        """
+        Remove an entity, and return False if it was not indexed
+        """
+        if key not in self.__positions:
+            return False
+        del self.__positions[key]
+        self.__discard(key, self.__bucket_of.pop(key))
+        return True
+
+    def __discard(self, key: Hashable, bucket: Tuple[int, int]) -> None:
+        keys = self.__buckets[bucket]
+        keys.discard(key)
+        if not keys:
+            del self.__buckets[bucket]
+
+    def clear(self) -> None:
+        self.__positions.clear()
+        self.__bucket_of.clear()
+        self.__buckets.clear()
+
+    def position(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        """
+        Return the indexed position of an entity, or None
+        """
+        return self.__positions.get(key)
+
+    def __candidates(self, x: float, y: float, r: float) -> Iterator[Hashable]:
+        min_bx, min_by = self.__bucket(x - r, y - r)
+        max_bx, max_by = self.__bucket(x + r, y + r)
+        if (max_bx - min_bx + 1) * (max_by - min_by + 1) > len(self.__buckets):
+            # The query covers more buckets than there are, scan the occupied ones
+            for (bx, by), keys in self.__buckets.items():
+                if min_bx <= bx <= max_bx and min_by <= by <= max_by:
+                    yield from keys
+            return
+        for bx in range(min_bx, max_bx + 1):
+            for by in range(min_by, max_by + 1):
+                keys = self.__buckets.get((bx, by))
+                if keys:
+                    yield from keys
+
+    def within(self, x: float, y: float, r: float, exclude: Optional[Hashable] = None) -> List[Hashable]:
+        """
+        Return the entities at a distance of at most r from (x, y), nearest first
+        """
+        found = []
+        r2 = r * r
+        for key in self.__candidates(x, y, r):
+            if key == exclude:
+                continue
+            kx, ky = self.__positions[key]
+            d2 = (kx - x) ** 2 + (ky - y) ** 2
+            if d2 <= r2:
+                found.append((d2, key))
+        found.sort(key=lambda item: item[0])
+        return [key for _, key in found]
+
+    def nearest(self, x: float, y: float, max_r: float = math.inf,
+                exclude: Optional[Hashable] = None) -> Optional[Hashable]:
+        """
+        Return the nearest entity within max_r of (x, y), or None
+        """
+        r = float(self.__cell_size)
+        while True:
+            found = self.within(x, y, min(r, max_r), exclude)
+            if found:
+                return found[0]
+            if r >= max_r or len(self.__positions) <= (exclude in self.__positions):
+                return None
+            r *= 2
+
+    def pairs_within(self, r: float) -> List[Tuple[Hashable, Hashable]]:
+        """
+        Return every pair of entities at a distance of at most r, e.g. colliding players
+        """
+        pairs = []
+        seen = set()
+        for key, (x, y) in self.__positions.items():
+            seen.add(key)
+            for other in self.within(x, y, r, exclude=key):
+                if other not in seen:
+                    pairs.append((key, other))
+        return pairs
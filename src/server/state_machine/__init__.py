@@ -2,9 +2,10 @@
 State machine package
 """
 
-__export__ = ["states", "state_machine", "state_machine_config"]
+__export__ = ["states", "state_machine", "state_machine_config", "profiler"]
 
 from .state_machine import StateMachine, StateMachineConfig
+from .profiler import StateProfiler
 from .states import (
     StateEnum, GameState, InGame, WaitGameStart,
     WaitPlayers, WaitPlayersConnexion, EndGame
@@ -0,0 +1,204 @@
+"""
+Opt-in profiling of the state handlers.
+
+Once set on a StateMachine, the profiler records each handle call
+ (state, wall time, exception) and each transition (with the function which caused it)
+ in a ring buffer, so that a long running arbiter keeps only the latest ones.
+Optionally, a sampler thread snapshots the stack of the handling thread every
+ `sample_interval_ms`, to see where a slow handler spends its time.
+Both can be dumped in the folded stacks format, readable by flamegraph.pl or speedscope:
+
+    profiler = StateProfiler(sample_interval_ms=1).start()
+    arena_manager.set_profiler(profiler)
+    ...
+    profiler.dump_folded("states.folded")  # flamegraph.pl states.folded > states.svg
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+DEFAULT_CAPACITY = 4096
+# Functions asking for a transition on behalf of their caller
+_SWITCH_FUNCTIONS = ("switch_state", "set_actual_state")
+
+
+class HandleRecord(NamedTuple):
+    """A call of a state handler"""
+    state: str
+    start_ns: int
+    duration_ns: int
+    error: Optional[str]
+
+
+class TransitionRecord(NamedTuple):
+    """A switch between states, and the function which asked for it"""
+    time_ns: int
+    from_state: str
+    to_state: str
+    cause: str
+
+
+class StateProfiler:
+    """
+    Records the calls of the state handlers, and optionally samples their stacks.
+    Every call is counted, and 1 call out of `record_every` is timed in the ring buffer.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, record_every: int = 1,
+                 sample_interval_ms: Optional[float] = None):
+        if capacity < 1 or record_every < 1:
+            raise ValueError("capacity and record_every must be at least 1")
+        if sample_interval_ms is not None and sample_interval_ms <= 0:
+            raise ValueError("sample_interval_ms must be positive")
+        self.handles: Deque[HandleRecord] = deque(maxlen=capacity)
+        self.transitions: Deque[TransitionRecord] = deque(maxlen=capacity)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.samples: Counter = Counter()
+        self.__record_every = record_every
+        self.__sample_interval = sample_interval_ms / 1000 if sample_interval_ms else None
+        # Thread id -> state being handled by this thread, read by the sampler
+        self.__handling: Dict[int, str] = {}
+        self.__sampler: Optional[threading.Thread] = None
+        self.__stop = threading.Event()
+
+    def start(self) -> StateProfiler:
+        """
+        Start the stack sampler, if a sample interval is set
+        """
+        if self.__sample_interval is not None and self.__sampler is None:
+            self.__stop.clear()
+            self.__sampler = threading.Thread(target=self.__sample_loop, name="state-profiler", daemon=True)
+            self.__sampler.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the stack sampler
+        """
+        sampler, self.__sampler = self.__sampler, None
+        if sampler is not None:
+            self.__stop.set()
+            sampler.join()
+
+    def profile(self, state: str, handler) -> Any:
+        """
+        Call handler() as the handler of state, and record it
+        """
+        self.calls[state] += 1
+        recorded = self.calls[state] % self.__record_every == 0
+        if not recorded and self.__sampler is None:
+            return handler()
+        thread_id = threading.get_ident()
+        self.__handling[thread_id] = state
+        error = None
+        start = time.perf_counter_ns()
+        try:
+            return handler()
+        except BaseException as e:
+            error = type(e).__name__
+            self.errors[state] += 1
+            raise
+        finally:
+            duration = time.perf_counter_ns() - start
+            self.__handling.pop(thread_id, None)
+            if recorded:
+                self.handles.append(HandleRecord(state, start, duration, error))
+
+    def on_transition(self, from_state: str, to_state: str) -> None:
+        """
+        Record a transition, caused by the first caller which is not a switch function
+        """
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_name in _SWITCH_FUNCTIONS:
+            frame = frame.f_back
+        cause = _cause(frame) if frame is not None else "?"
+        self.transitions.append(TransitionRecord(time.perf_counter_ns(), from_state, to_state, cause))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return per state: the calls, errors, and the mean, p99 and max wall time (ms) of the recorded calls
+        """
+        durations: Dict[str, List[int]] = {}
+        for record in list(self.handles):
+            durations.setdefault(record.state, []).append(record.duration_ns)
+        stats = {}
+        for state, calls in self.calls.items():
+            values = sorted(durations.get(state, [0]))
+            stats[state] = {
+                "calls": calls,
+                "errors": self.errors[state],
+                "mean_ms": sum(values) / len(values) / 1e6,
+                "p99_ms": values[min(len(values) - 1, int(len(values) * 0.99))] / 1e6,
+                "max_ms": values[-1] / 1e6,
+            }
+        return stats
+
+    def slowest(self, count: int = 10) -> List[HandleRecord]:
+        """
+        Return the slowest recorded calls, slowest first
+        """
+        return sorted(self.handles, key=lambda r: r.duration_ns, reverse=True)[:count]
+
+    def folded(self) -> List[str]:
+        """
+        Return the profile in the folded stacks format, one "frame;frame;... weight" per line.
+        With stack samples, weights are sample counts; otherwise the recorded wall time in µs per state.
+        """
+        if self.samples:
+            return [f"{stack} {count}" for stack, count in sorted(self.samples.items())]
+        weights: Counter = Counter()
+        for record in list(self.handles):
+            leaf = "handle" if record.error is None else f"handle [{record.error}]"
+            weights[f"{record.state};{leaf}"] += record.duration_ns // 1000
+        return [f"{stack} {weight}" for stack, weight in sorted(weights.items()) if weight > 0]
+
+    def dump_folded(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(self.folded()) + "\n")
+
+    def __sample_loop(self) -> None:
+        while not self.__stop.wait(self.__sample_interval):
+            handling = dict(self.__handling)
+            if not handling:
+                continue
+            frames = sys._current_frames()
+            for thread_id, state in handling.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.samples[_fold(state, frame)] += 1
+
+
+def _qualname(frame) -> str:
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def _cause(frame) -> str:
+    """
+    Return the function of frame, with the class of its instance if inherited (e.g. "Child(Base.method)")
+    """
+    name = _qualname(frame)
+    instance = frame.f_locals.get("self")
+    if instance is not None and not name.startswith(type(instance).__name__ + "."):
+        return f"{type(instance).__name__}({name})"
+    return name
+
+
+def _fold(state: str, frame) -> str:
+    """
+    Return the stack of frame as "state;outer;...;inner", starting at the state handler
+    """
+    names = []
+    while frame is not None and frame.f_code is not _PROFILE_CODE:
+        names.append(_qualname(frame))
+        frame = frame.f_back
+    names.append(state)
+    return ";".join(reversed(names))
+
+
+_PROFILE_CODE = StateProfiler.profile.__code__
@@ -13,13 +13,22 @@ import json
 import logging
 import os
 from importlib import import_module
+from time import perf_counter
 from typing import List, Tuple, Dict
 
 import root_config
 from src.server.manager_interface import IManager
+from src.server.metrics import DWELL_BUCKETS, REGISTRY
+from src.server.state_machine.profiler import StateProfiler
 from src.server.state_machine.states import StateEnum, GameState
 
 
+_DWELL_SECONDS = REGISTRY.histogram("arbiter_state_dwell_seconds",
+                                    "Time spent in a game state before leaving it", ("state",), DWELL_BUCKETS)
+_TRANSITIONS = REGISTRY.counter("arbiter_state_transitions_total",
+                                "Switches between game states", ("from_state", "to_state"))
+
+
 def dynamic_imp(package_name, class_name):
     """
     # find_module() method is used
@@ -52,11 +61,13 @@ class StateMachine:
             raise TypeError(f"Controller must be a subclass of IManager, got {type(controller)}")
         self.__agent = controller
         self.__actual_state: StateEnum = None
+        self.__entered_at = perf_counter()
         self.__states: Dict[str, GameState] = {}
         self._logger = logging.getLogger(self.__class__.__name__)
         self._logger.setLevel(root_config.LOGGING_LEVEL)
         self.__allowed_switches: Tuple[Tuple[StateEnum, StateEnum]] = tuple()
         self.__lock = False
+        self.__profiler: StateProfiler | None = None
 
     @property
     def state(self) -> str:
@@ -104,6 +115,14 @@ class StateMachine:
         if not self.__is_allowed(requested_state):
             raise ValueError(f"State {self.__actual_state.name} "
                              f"is not allowed to switch to {requested_state.name}")
+        now = perf_counter()
+        if self.__actual_state is not None and self.__actual_state != requested_state:
+            _DWELL_SECONDS.observe(now - self.__entered_at, state=self.__actual_state.name)
+            _TRANSITIONS.inc(from_state=self.__actual_state.name, to_state=requested_state.name)
+            if self.__profiler is not None:
+                self.__profiler.on_transition(self.__actual_state.name, requested_state.name)
+        if self.__actual_state != requested_state:
+            self.__entered_at = now
         self.__actual_state = requested_state
 
     def handle(self, *args):
@@ -112,7 +131,24 @@ class StateMachine:
         """
         self.__lock = True
         self._logger.debug(f'Handling state : {self.__actual_state} with args {args}')
-        self.__states[self.__actual_state.name].handle()
+        state = self.__states[self.__actual_state.name]
+        if self.__profiler is None:
+            state.handle()
+        else:
+            self.__profiler.profile(self.__actual_state.name, state.handle)
+
+    @property
+    def profiler(self) -> StateProfiler | None:
+        """ return the profiler of the state handlers, if any """
+        return self.__profiler
+
+    def set_profiler(self, profiler: StateProfiler | None) -> None:
+        """
+        Profile every state handler and transition with the given profiler, or stop profiling if None
+        """
+        if profiler is not None and not isinstance(profiler, StateProfiler):
+            raise TypeError("Profiler must be an instance of StateProfiler")
+        self.__profiler = profiler
 
     def __is_allowed(self, new_state: StateEnum) -> bool:
         """
@@ -152,6 +188,32 @@ class StateMachine:
         self.set_actual_state(StateEnum(init_state))
         return self
 
+    def reconfigure(self, config: StateMachineConfig) -> StateMachine:
+        """
+        Replace the states and links of a running state machine, keeping its actual state.
+        Existing states keep their instance, new ones are instantiated.
+        Nothing changes if the actual state is not part of the new configuration.
+        """
+        if not isinstance(config, StateMachineConfig):
+            raise TypeError("Config must be an instance of StateMachineConfig")
+        names = [s.__name__ for s in config.states]
+        current = self.__states.get(self.__actual_state.name) if self.__actual_state else None
+        if current is not None and current.__class__.__name__ not in names:
+            raise ValueError(f"Actual state {self.__actual_state.name} is missing from the new configuration")
+        states = {name: state for name, state in self.__states.items() if state.__class__ in config.states}
+        for s in config.states:
+            if not issubclass(s, GameState):
+                raise ValueError(f"State {s} is not a subclass of GameState")
+            if s not in (state.__class__ for state in states.values()):
+                state_object = s(self.__agent)
+                state_object.set_context(state_machine=self)
+                states[state_object.name.name] = state_object
+        links = config.links
+        self.__define_states_links(links)
+        self.__states = states
+        self._logger.info(f"Reconfigured states {sorted(states)} with {len(links)} links")
+        return self
+
 
 class StateMachineConfig:
     """
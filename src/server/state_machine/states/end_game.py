@@ -27,5 +27,4 @@ class EndGame(GameState):
         self._manager.set_pause(True)
         self._manager.display("🟢 Fin de la partie, traitement des résultats...")
         # self._agent.update()
-
-        ## TODO: process results
+        self._manager.report_efficiency()
@@ -12,6 +12,8 @@ from typing_extensions import override
 from .base import GameState
 from .possible_states import StateEnum
 
+ANNOUNCE_PERIOD_MS = 60000
+
 
 class InGame(GameState):
     """
@@ -27,6 +29,7 @@ class InGame(GameState):
     def __init__(self, manager):
         super().__init__(manager)
         self.__loop_start_time = 0
+        self.__announces = None
 
     @property
     def name(self) -> StateEnum:
@@ -60,7 +63,9 @@ class InGame(GameState):
         """
         If a player hits a wall, walks on a trap, gets hit, etc...
         """
-        # TODO: handle players events
+        self._manager.start_monsters()
+        self._manager.update_monsters()
+        # TODO: handle other players events
 
     def __handle_game_events(self):
         """
@@ -68,13 +73,20 @@ class InGame(GameState):
         """
         # TODO: handle game events after updating players
 
+    def __announce(self, played_time: int):
+        """
+        Announce the minutes played, on the timers of the manager
+        """
+        self._manager.display(f"🟢 {played_time // ANNOUNCE_PERIOD_MS} minutes écoulées")
+
     def __update(self):
         """
         Update the game state
         """
         self.__loop_start_time = self._manager._robot.game["t"]
-        if self.__loop_start_time % 6000 == 0:
-            self._manager.display(f"🟢 {self.__loop_start_time // 6000} minutes écoulées")
+        if self.__announces is None or not self.__announces.active:
+            # The timers of the manager are reset with the game
+            self.__announces = self._manager.timers.schedule_every(ANNOUNCE_PERIOD_MS, self.__announce)
         self.__handle_players_events()
         self.__handle_game_events()
         # self._agent.update()
@@ -5,7 +5,7 @@ Handles waiting for players to connect to the arena
 
 from __future__ import annotations
 
-from src.server.models.player import Player
+from src.server.models.player_state import PlayerState
 from .possible_states import StateEnum
 from .wait_players import WaitPlayers
 
@@ -30,7 +30,7 @@ class WaitPlayersConnexion(WaitPlayers):
         all_connected = self._manager.all_players_connected
         self._logger.info(f"Waiting for players to register : {not all_connected}")
         for player in self._manager._robot.players:
-            self._manager.register_player(Player(player))
+            self._manager.register_player(PlayerState(player))
             self._logger.debug(f"Player {player} is connected")
 
         super()._on_handle()  # if all players are connected, switch to the InGame state
@@ -0,0 +1,211 @@
+"""
+Hierarchical timer wheel, for the timers of a game.
+
+Timers are stored in slots by deadline: the first level holds the next 64 ticks,
+ each next level 64 times more, so scheduling, cancelling and advancing by a tick are O(1).
+Timers of the upper levels cascade down as time reaches their slot.
+Time is given by the caller (e.g. the played time of the game, in ms), and callbacks get the
+ deadline they were scheduled for, even when the wheel is advanced past several deadlines at once.
+"""
+from __future__ import annotations
+
+from typing import Callable, List, Optional
+
+DEFAULT_TICK_MS = 10
+_SLOT_BITS = 6
+_SLOTS = 1 << _SLOT_BITS
+_MASK = _SLOTS - 1
+_LEVELS = 4
+
+
+class Timer:
+    """
+    A scheduled callback, to cancel it
+    """
+    __slots__ = ("deadline", "period", "callback", "cancelled", "fired", "_seq")
+
+    def __init__(self, deadline: int, period: Optional[int], callback: Callable[[int], None], seq: int):
+        self.deadline = deadline
+        self.period = period
+        self.callback = callback
+        self.cancelled = False
+        self.fired = False
+        self._seq = seq
+
+    @property
+    def active(self) -> bool:
+        """ return True until the timer is cancelled, or fired once if it is not periodic """
+        return not self.cancelled and not (self.fired and self.period is None)
+
+
+class TimerWheel:
+    """
+    Timers fired at their deadline as the wheel advances.
+    :param tick: the resolution of the wheel, in time units (ms)
+    :param now: the time the wheel starts at
+    """
+
+    def __init__(self, tick: int = DEFAULT_TICK_MS, now: int = 0):
+        if tick <= 0:
+            raise ValueError("The tick of the wheel must be positive")
+        self.__tick = tick
+        self.__levels: List[List[List[Timer]]] = [[[] for _ in range(_SLOTS)] for _ in range(_LEVELS)]
+        self.__overflow: List[Timer] = []
+        # Timers held by each level, to skip the empty ones
+        self.__sizes = [0] * _LEVELS
+        self.__current = now // tick
+        self.__now = now
+        self.__count = 0
+        self.__seq = 0
+
+    @property
+    def now(self) -> int:
+        """ return the time the wheel was advanced to """
+        return self.__now
+
+    def __len__(self) -> int:
+        return self.__count
+
+    # --- Scheduling ---
+
+    def schedule(self, deadline: int, callback: Callable[[int], None]) -> Timer:
+        """
+        Call callback(deadline) once the wheel reaches the deadline
+        """
+        return self.__add(Timer(int(deadline), None, callback, self.__next_seq()))
+
+    def schedule_in(self, delay: int, callback: Callable[[int], None]) -> Timer:
+        """
+        Call callback(deadline) once the delay elapsed from now
+        """
+        return self.schedule(self.__now + delay, callback)
+
+    def schedule_every(self, period: int, callback: Callable[[int], None], start: Optional[int] = None) -> Timer:
+        """
+        Call callback(deadline) at start, then every period, until the timer is cancelled.
+        Starts by default at the next multiple of the period, e.g. every full minute of the game.
+        """
+        if period <= 0:
+            raise ValueError("The period of a timer must be positive")
+        start = (self.__now // period + 1) * period if start is None else int(start)
+        return self.__add(Timer(start, int(period), callback, self.__next_seq()))
+
+    def cancel(self, timer: Timer) -> None:
+        """
+        Cancel a timer, it is dropped when its slot is reached
+        """
+        if timer.active:
+            timer.cancelled = True
+            self.__count -= 1
+
+    def clear(self) -> None:
+        """
+        Cancel every timer
+        """
+        for level in self.__levels:
+            for slot in level:
+                for timer in slot:
+                    timer.cancelled = True
+                slot.clear()
+        self.__sizes = [0] * _LEVELS
+        for timer in self.__overflow:
+            timer.cancelled = True
+        self.__overflow.clear()
+        self.__count = 0
+
+    def __next_seq(self) -> int:
+        self.__seq += 1
+        return self.__seq
+
+    def __add(self, timer: Timer) -> Timer:
+        self.__count += 1
+        self.__insert(timer)
+        return timer
+
+    def __insert(self, timer: Timer) -> None:
+        # A deadline already reached goes to the current tick, fired at the next advance
+        tick = max(timer.deadline // self.__tick, self.__current)
+        delta = tick - self.__current
+        for level in range(_LEVELS):
+            if delta < 1 << (_SLOT_BITS * (level + 1)):
+                self.__levels[level][(tick >> (_SLOT_BITS * level)) & _MASK].append(timer)
+                self.__sizes[level] += 1
+                return
+        self.__overflow.append(timer)
+
+    # --- Time ---
+
+    def advance(self, now: int) -> int:
+        """
+        Advance the wheel to now, firing the timers due in deadline order. Return the number fired.
+        """
+        if now < self.__now:
+            return 0
+        self.__now = now
+        target = now // self.__tick
+        # What is left of the current tick, not due at the last advance
+        fired = self.__fire(self.__levels[0][self.__current & _MASK], now)
+        while self.__current < target:
+            if self.__count == 0:
+                self.__current = target
+                break
+            # Jump to the next cascade of a level holding timers
+            level = 0
+            while level < _LEVELS and self.__sizes[level] == 0:
+                level += 1
+            if level > 0:
+                span = 1 << (_SLOT_BITS * level)
+                self.__current = min(target, (self.__current | (span - 1)) + 1) - 1
+            self.__current += 1
+            self.__cascade()
+            fired += self.__fire(self.__levels[0][self.__current & _MASK], now)
+        return fired
+
+    def __cascade(self) -> None:
+        current = self.__current
+        for level in range(1, _LEVELS):
+            if current & ((1 << (_SLOT_BITS * level)) - 1):
+                return
+            slot = self.__levels[level][(current >> (_SLOT_BITS * level)) & _MASK]
+            timers, slot[:] = list(slot), []
+            self.__sizes[level] -= len(timers)
+            for timer in timers:
+                if not timer.cancelled:
+                    self.__insert(timer)
+        if current & ((1 << (_SLOT_BITS * _LEVELS)) - 1) == 0 and self.__overflow:
+            timers, self.__overflow = self.__overflow, []
+            for timer in timers:
+                if not timer.cancelled:
+                    self.__insert(timer)
+
+    def __fire(self, slot: List[Timer], now: int) -> int:
+        """
+        Fire the timers of a slot due at now, in deadline order. The others stay in the slot.
+        """
+        if not slot:
+            return 0
+        held = len(slot)
+        timers = sorted((timer for timer in slot if not timer.cancelled), key=lambda t: (t.deadline, t._seq))
+        slot[:] = [timer for timer in timers if timer.deadline > now]
+        self.__sizes[0] -= held - len(slot)
+        fired = 0
+        for timer in timers:
+            if timer.deadline > now:
+                break
+            if timer.cancelled:
+                continue
+            timer.fired = True
+            if timer.period is None:
+                self.__count -= 1
+                fired += 1
+                timer.callback(timer.deadline)
+                continue
+            # Periods shorter than a tick fire several times, each with its own deadline
+            while not timer.cancelled and timer.deadline <= now:
+                fired += 1
+                deadline = timer.deadline
+                timer.deadline += timer.period
+                timer.callback(deadline)
+            if not timer.cancelled:
+                self.__insert(timer)
+        return fired
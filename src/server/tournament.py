@@ -0,0 +1,370 @@
+"""
+Offline tournaments of player bots, played in the headless simulator.
+
+A tournament plays every (bot, map seed, trial) match, the three trials of a player on a
+ map differing by their spawn cells, across a pool of processes. Each result is appended to
+ a JSON lines file as soon as its match ends, so an interrupted tournament resumes where it
+ stopped, and the results of every match are aggregated in a leaderboard:
+
+    python -m src.server.tournament explorer random_walker --seeds 0-19 --results results.jsonl
+
+A bot is a factory `bot(rng: random.Random) -> step(agent: Agent)`, given by its name
+ in BOTS or as "module:function". `step` is called before each update of the agent.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import hashlib
+import importlib
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.api.j2l.pytactx.agent import Agent
+from src.api.j2l.pytactx.mazememory import MazeMemory
+from src.server.maze import ScoreRules, Tile
+from src.server.simulator import SimulatedArena, default_rules
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRIALS = 3
+DEFAULT_STEP_MS = 100
+
+Bot = Callable[[random.Random], Callable[[Agent], None]]
+
+
+# --- Bots ---
+
+def random_walker(rng: random.Random) -> Callable[[Agent], None]:
+    """
+    Moves to a random neighbour cell at each update
+    """
+    def step(agent: Agent) -> None:
+        dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+        agent.move(dx, dy)
+    return step
+
+
+def explorer(rng: random.Random) -> Callable[[Agent], None]:
+    """
+    Explores the maze from frontier to frontier until it sees the battery, then walks to it
+    """
+    memory: List[MazeMemory] = []
+
+    def step(agent: Agent) -> None:
+        if not memory:
+            memory.append(MazeMemory(int(agent.game["gridColumns"]), int(agent.game["gridRows"]),
+                                     agent.game.get("mapFriction", [1, 0])))
+        maze = memory[0]
+        maze.observeAgent(agent)
+        batteries = maze.locate(Tile.BATTERY)
+        if batteries and (agent.x, agent.y) != batteries[0]:
+            if maze.goal != batteries[0]:
+                maze.setGoal(*batteries[0])
+            cell = maze.nextStep(agent.x, agent.y)
+        elif not batteries:
+            cell = maze.explore(agent.x, agent.y)
+        else:
+            cell = None
+        if cell is None:
+            # Keep moving for the streak bonus, without hitting walls
+            cells = [(agent.x + dx, agent.y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))]
+            cells = [(x, y) for x, y in cells if maze.isKnown(x, y) and maze.isWalkable(x, y)]
+            if not cells:
+                return
+            cell = rng.choice(cells)
+        agent.moveTowards(*cell)
+    return step
+
+
+BOTS: Dict[str, Bot] = {"random_walker": random_walker, "explorer": explorer}
+
+
+def resolve_bot(ref: str) -> Bot:
+    """
+    Return the bot factory named in BOTS, or imported from a "module:function" reference
+    """
+    if ref in BOTS:
+        return BOTS[ref]
+    module, _, name = ref.partition(":")
+    if not name:
+        raise ValueError(f"Unknown bot {ref!r}, expected one of {sorted(BOTS)} or 'module:function'")
+    return getattr(importlib.import_module(module), name)
+
+
+# --- Matches ---
+
+@dataclass(frozen=True)
+class MatchSpec:
+    """
+    One match of a tournament: a bot playing a trial on the maze of a seed
+    """
+    bot: str
+    seed: int
+    trial: int
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return self.bot, self.seed, self.trial
+
+    @property
+    def spawn_seed(self) -> int:
+        """ the seed of the spawn cell and of the bot's choices, distinct for each trial """
+        return self.seed * 1000 + self.trial
+
+
+@dataclass(frozen=True)
+class MatchConfig:
+    """
+    What every match of a tournament shares. Results are only reused for the same config.
+    """
+    rules: Dict[str, Any] = dataclasses.field(default_factory=default_rules, hash=False)
+    score_rules: ScoreRules = ScoreRules()
+    duration_ms: Optional[int] = None
+    dt_step: int = DEFAULT_STEP_MS
+
+    @property
+    def match_ms(self) -> int:
+        if self.duration_ms is not None:
+            return int(self.duration_ms)
+        return int(self.score_rules.match_duration * 1000)
+
+    def digest(self) -> str:
+        """ return a short hash of the config, stored with each result """
+        payload = json.dumps({"rules": self.rules, "score_rules": dataclasses.asdict(self.score_rules),
+                              "match_ms": self.match_ms, "dt_step": self.dt_step}, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class MatchResult:
+    """
+    Outcome of a match, one line of the results file
+    """
+    bot: str
+    seed: int
+    trial: int
+    score: float
+    charged: bool
+    n_move: int
+    n_collision: int
+    wall_ms: float
+    config: str
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return self.bot, self.seed, self.trial
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self), sort_keys=True)
+
+
+def run_match(spec: MatchSpec, config: MatchConfig = MatchConfig()) -> MatchResult:
+    """
+    Play a match in a new simulated arena, generating the maze from the seed
+    """
+    start = time.perf_counter()
+    rules = dict(config.rules)
+    rules["map"] = []
+    arena = SimulatedArena(rules, seed=spec.seed, dt_step=config.dt_step,
+                           score_rules=config.score_rules, spawn_seed=spec.spawn_seed)
+    name = "bot"
+    agent = Agent(name, robot=arena.robot(name), waitArenaConnection=False, welcomePrint=False,
+                  verbosity=0, sourcesdir=None)
+    step = resolve_bot(spec.bot)(random.Random(spec.spawn_seed))
+    # The first update only connects the agent to the arena
+    agent.update()
+    while arena.t < config.match_ms:
+        step(agent)
+        agent.update()
+    state = arena.player_state(name)
+    return MatchResult(spec.bot, spec.seed, spec.trial, arena.scores()[name], arena.charged(name),
+                       int(state["nMove"]), int(state["nCollision"]),
+                       round((time.perf_counter() - start) * 1000, 1), config.digest())
+
+
+# --- Leaderboard ---
+
+@dataclass
+class Standing:
+    """
+    Results of a bot over the matches it played
+    """
+    bot: str
+    matches: int = 0
+    total: float = 0.0
+    best: float = float("-inf")
+    charged: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.matches if self.matches else 0.0
+
+    @property
+    def charge_rate(self) -> float:
+        return self.charged / self.matches if self.matches else 0.0
+
+    def add(self, result: MatchResult) -> None:
+        self.matches += 1
+        self.total += result.score
+        self.best = max(self.best, result.score)
+        self.charged += bool(result.charged)
+
+
+class Leaderboard:
+    """
+    Standings of the bots, best mean score first
+    """
+
+    def __init__(self, results: Iterable[MatchResult] = ()):
+        self.__standings: Dict[str, Standing] = {}
+        for result in results:
+            self.add(result)
+
+    def add(self, result: MatchResult) -> None:
+        self.__standings.setdefault(result.bot, Standing(result.bot)).add(result)
+
+    @property
+    def standings(self) -> List[Standing]:
+        return sorted(self.__standings.values(), key=lambda standing: (-standing.mean, standing.bot))
+
+    def __getitem__(self, bot: str) -> Standing:
+        return self.__standings[bot]
+
+    def render(self) -> str:
+        lines = [f"{'#':>3} {'bot':<24} {'matches':>7} {'mean':>8} {'best':>8} {'battery':>8}"]
+        for rank, standing in enumerate(self.standings, 1):
+            lines.append(f"{rank:>3} {standing.bot:<24} {standing.matches:>7} {standing.mean:>8.2f} "
+                         f"{standing.best:>8.2f} {standing.charge_rate:>8.0%}")
+        return "\n".join(lines)
+
+
+# --- Tournament ---
+
+def load_results(path: str, config: Optional[str] = None) -> Iterator[MatchResult]:
+    """
+    Read the results of a file, skipping the lines of another config and an interrupted last line
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as results_file:
+        for line in results_file:
+            try:
+                result = MatchResult(**json.loads(line))
+            except (ValueError, TypeError):
+                logger.warning("Skipping unreadable result %r", line[:80])
+                continue
+            if config is None or result.config == config:
+                yield result
+
+
+def _play(spec: MatchSpec, config: MatchConfig) -> MatchResult:
+    # Top level, to be pickled to the workers of the pool
+    return run_match(spec, config)
+
+
+class Tournament:
+    """
+    Every match of bots × seeds × trials, played by a pool of processes.
+    :param bots: the bots, names of BOTS or "module:function"
+    :param seeds: the seeds of the mazes
+    :param trials: the number of trials of each bot on each maze
+    :param config: the rules, score rules and duration of the matches
+    :param results_path: the JSON lines file to append results to, and to resume from
+    :param workers: the number of processes, os.cpu_count() if None, 0 to play in this process
+    """
+
+    def __init__(self, bots: Iterable[str], seeds: Iterable[int], trials: int = DEFAULT_TRIALS,
+                 config: MatchConfig = MatchConfig(), results_path: Optional[str] = None,
+                 workers: Optional[int] = None):
+        self.bots = list(bots)
+        for bot in self.bots:
+            resolve_bot(bot)
+        self.seeds = list(seeds)
+        self.trials = trials
+        self.config = config
+        self.results_path = results_path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+
+    def matches(self) -> List[MatchSpec]:
+        return [MatchSpec(bot, seed, trial) for seed in self.seeds for bot in self.bots
+                for trial in range(self.trials)]
+
+    def run(self, on_result: Optional[Callable[[MatchResult], None]] = None) -> Leaderboard:
+        """
+        Play the matches missing from the results file, and return the leaderboard of all of them
+        """
+        digest = self.config.digest()
+        wanted = {spec.key: spec for spec in self.matches()}
+        done = {}
+        if self.results_path is not None:
+            done = {result.key: result for result in load_results(self.results_path, digest)
+                    if result.key in wanted}
+        pending = [spec for key, spec in wanted.items() if key not in done]
+        logger.info("%d matches, %d already played", len(wanted), len(done))
+        results = list(done.values())
+        results_file = open(self.results_path, "a+", encoding="utf-8") if self.results_path else None
+        try:
+            if results_file is not None and results_file.tell() > 0:
+                # An interrupted write leaves a partial line, do not append to it
+                results_file.seek(results_file.tell() - 1)
+                if results_file.read(1) != "\n":
+                    results_file.write("\n")
+            for result in self.__play(pending):
+                results.append(result)
+                if results_file is not None:
+                    results_file.write(result.to_json() + "\n")
+                    results_file.flush()
+                if on_result is not None:
+                    on_result(result)
+        finally:
+            if results_file is not None:
+                results_file.close()
+        return Leaderboard(results)
+
+    def __play(self, specs: List[MatchSpec]) -> Iterator[MatchResult]:
+        if self.workers <= 0 or len(specs) <= 1:
+            for spec in specs:
+                yield run_match(spec, self.config)
+            return
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(specs))) as pool:
+            running: set[Future] = {pool.submit(_play, spec, self.config) for spec in specs}
+            while running:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+
+
+def _parse_seeds(value: str) -> List[int]:
+    """ "0-9,20" -> [0, 1, ..., 9, 20] """
+    seeds = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        seeds.extend(range(int(first), int(last or first) + 1))
+    return seeds
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Play a tournament of bots in the simulator")
+    parser.add_argument("bots", nargs="+", help=f"bots, among {sorted(BOTS)} or 'module:function'")
+    parser.add_argument("--seeds", type=_parse_seeds, default=_parse_seeds("0-9"), help="maze seeds, e.g. 0-9,20")
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per cpu")
+    parser.add_argument("--results", default=None, help="JSON lines file of the results, to resume from")
+    args = parser.parse_args(argv)
+    tournament = Tournament(args.bots, args.seeds, args.trials, results_path=args.results, workers=args.workers)
+    start = time.perf_counter()
+    leaderboard = tournament.run(lambda result: print(f"{result.bot} seed={result.seed} trial={result.trial} "
+                                                      f"score={result.score:.2f}", flush=True))
+    print(leaderboard.render())
+    print(f"{time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
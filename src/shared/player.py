@@ -15,7 +15,7 @@ class IPlayer(ABC):
     y: int
     direction: Direction
     score: float
-    known_map: List[List[int]]
+    known_map: str
 
     @abstractmethod
     def __init__(self, **kw: Dict):
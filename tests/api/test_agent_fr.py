@@ -0,0 +1,52 @@
+"""
+Tests the french agent from src.api.j2l.pytactx.agent
+"""
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from src.api.j2l.pytactx import agent
+from src.api.j2l.pytactx.agent import AgentFr
+from src.server.simulator import SimulatedArena
+
+
+class TestAgentFr(unittest.TestCase):
+    """
+    Ensure that the french agent can be built with its default parameters
+    """
+
+    def test_default_parameters(self):
+        """
+        Given a french agent built with its default parameters
+        The welcome message is printed, and the english agent is built without printing it again
+        """
+        output = io.StringIO()
+        with mock.patch.object(agent, "Agent") as english_agent, redirect_stdout(output):
+            bot = AgentFr("bot", "a", "u", "p", "localhost", 1883, autoconnect=False)
+        assert "arena=a&url=localhost&usr=u" in output.getvalue()
+        args, kwargs = english_agent.call_args
+        assert args[:6] == ("bot", "a", "u", "p", "localhost", 1883) and args[11] is False
+        assert kwargs == {"robot": None}
+        assert bot.robot is english_agent.return_value.robot
+
+    def test_simulated_robot(self):
+        """
+        Given a french agent driving a simulated robot
+        It joins the arena without broker credentials, and plays in french
+        """
+        arena = SimulatedArena(seed=1)
+        with redirect_stdout(io.StringIO()):
+            bot = AgentFr("bot", robot=arena.robot("bot"), verbosite=0)
+        assert bot.areneEstConnecte()
+        bot.actualiser()
+        arena.run(1000)
+        bot.actualiser()
+        state = arena.player_state("bot")
+        assert (bot.x, bot.y, bot.vie) == (state["x"], state["y"], state["life"])
+        bot.deplacer(0, 1)
+        bot.actualiser()
+        arena.run(1000)
+        bot.actualiser()
+        assert bot.nDeplacements + bot.nCollisions == 1
+        assert (bot.x, bot.y) == (arena.player_state("bot")["x"], arena.player_state("bot")["y"])
@@ -0,0 +1,62 @@
+"""
+Tests the monotonic clock from src.api.j2l.pyrobotx.clock
+"""
+import unittest
+
+import src.api.j2l.pyrobotx.clock as clk
+from src.api.j2l.pyrobotx.pool import BrokerConnectionPool
+from tests.api.test_pool import FakePahoClient, new_client
+
+
+class FakeSource:
+    """
+    Time source moved by hand, in ns
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestClock(unittest.TestCase):
+    """
+    Ensure that timings are monotonic and cached per tick
+    """
+
+    def test_tick_is_cached(self):
+        """
+        Given a clock ticked once
+        Its cached time does not move until the next tick
+        """
+        source = FakeSource(5 * clk.NS_PER_MS)
+        clock = clk.Clock(source)
+        assert clock.tick() == 5 * clk.NS_PER_MS
+        source.now += 20 * clk.NS_PER_MS
+        assert clock.ticked == 5 * clk.NS_PER_MS
+        assert clock.now() == 25 * clk.NS_PER_MS
+        assert clock.elapsedMs(0) == 5
+        assert clock.elapsedMs(0, clock.tick()) == 25
+        assert clock.sinceStartMs() == 20
+
+    def test_never(self):
+        """
+        Something which never happened is older than any timeout
+        """
+        clock = clk.Clock()
+        assert clock.elapsedMs(clk.NEVER, clock.now()) > 1e12
+        assert clk.msToNs(1.5) == 1500000
+
+    def test_client_connectivity(self):
+        """
+        Given a client receiving an arena state
+        It is connected to the arena until the timeout expires, whatever the wall clock
+        """
+        client = new_client(BrokerConnectionPool(clientFactory=FakePahoClient), "ova1")
+        assert not client.isConnectedToArena()
+        FakePahoClient.instances[-1].deliver("ludx/server/state/arena", b"{}")
+        assert client.isConnectedToArena()
+        assert 0 <= client.getTimestamp() < 10000
+        client._OvaClientMqtt__prevRxFromArena -= clk.msToNs(60000)
+        assert not client.isConnectedToArena()
@@ -0,0 +1,76 @@
+"""
+Tests the mqtt payload codecs from src.api.j2l.pyrobotx.codec
+"""
+import json
+import unittest
+
+from src.api.j2l.pyrobotx.codec import (CborCodec, JsonCodec, MsgpackCodec, availableCodecs, benchmark,
+                                        getCodec, typicalArenaState)
+
+
+class TestCodec(unittest.TestCase):
+    """
+    Ensure that codecs are interchangeable and decode raw payloads
+    """
+
+    def test_json_roundtrip(self):
+        """
+        Given an arena state
+        Both json backends encode it as json, and decode it from bytes or memoryview
+        """
+        state = typicalArenaState(10, 10)
+        for codec in (JsonCodec(), JsonCodec(useOrjson=False)):
+            payload = codec.encode(state)
+            assert isinstance(payload, bytes)
+            assert json.loads(payload) == state
+            assert codec.decode(payload) == state
+            assert codec.decode(memoryview(payload)) == state
+            assert codec.decode(bytearray(payload)) == state
+
+    def test_json_fallback(self):
+        """
+        Values orjson cannot serialize are still encoded
+        """
+        assert JsonCodec().decode(JsonCodec().encode({"big": 2 ** 70})) == {"big": 2 ** 70}
+        assert JsonCodec().decode(JsonCodec().encode({1: "a"})) == {"1": "a"}
+
+    def test_get_codec(self):
+        """
+        Codecs are found by name, and unknown or missing ones are refused
+        """
+        assert isinstance(getCodec(), JsonCodec)
+        assert isinstance(getCodec("json"), JsonCodec)
+        codec = JsonCodec(useOrjson=False)
+        assert getCodec(codec) is codec
+        assert "json" in availableCodecs()
+        with self.assertRaises(ValueError):
+            getCodec("xml")
+
+    @unittest.skipUnless("msgpack" in availableCodecs(), "msgpack not installed")
+    def test_msgpack_roundtrip(self):
+        """
+        Given an arena state
+        msgpack decodes what it encodes, in a smaller payload than json
+        """
+        state = typicalArenaState()
+        payload = MsgpackCodec().encode(state)
+        assert MsgpackCodec().decode(memoryview(payload)) == state
+        assert len(payload) < len(JsonCodec().encode(state))
+
+    @unittest.skipUnless("cbor" in availableCodecs(), "cbor2 not installed")
+    def test_cbor_roundtrip(self):
+        """
+        Given an arena state
+        cbor decodes what it encodes
+        """
+        state = typicalArenaState()
+        assert CborCodec().decode(CborCodec().encode(state)) == state
+
+    def test_benchmark(self):
+        """
+        The benchmark reports size and timings of each available codec
+        """
+        results = benchmark(typicalArenaState(20, 20), repeat=5)
+        assert "json(std)" in results
+        for result in results.values():
+            assert result["bytes"] > 0 and result["encodeUs"] > 0 and result["decodeUs"] > 0
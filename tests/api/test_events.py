@@ -0,0 +1,113 @@
+"""
+Tests the event bus from src.api.j2l.pyrobotx.events
+"""
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import src.api.j2l.pyrobotx.events as events
+from src.api.j2l.pyrobotx.events import DefaultEventSettings, Dispatch, EventBus
+
+
+class TestEventBus(unittest.TestCase):
+    """
+    Ensure that every listener is notified, in order, and measured
+    """
+
+    def setUp(self):
+        self.bus = EventBus(["updated", "playerChanged"])
+
+    def tearDown(self):
+        self.bus.shutdown()
+
+    def test_several_listeners(self):
+        """
+        Given several listeners on the same event
+        All are notified, by decreasing priority then subscription order
+        """
+        calls = []
+        self.bus.addEventListener("updated", lambda src, ev, v: calls.append(("first", v)))
+        self.bus.addEventListener("updated", lambda src, ev, v: calls.append(("second", v)))
+        self.bus.addEventListener("updated", lambda src, ev, v: calls.append(("agent", v)), priority=100)
+        self.bus.notify("updated", 1)
+        assert calls == [("agent", 1), ("first", 1), ("second", 1)]
+
+    def test_remove_and_unknown(self):
+        """
+        Removed listeners are not notified anymore, unknown events are refused
+        """
+        calls = []
+        callback = lambda src, ev, v: calls.append(v)  # noqa: E731
+        listener = self.bus.addEventListener("updated", callback)
+        assert self.bus.addEventListener("unknown", callback) is None
+        assert self.bus.removeEventListener("updated", listener)
+        assert not self.bus.removeEventListener("updated", callback)
+        self.bus.notify("updated", 1)
+        self.bus.notify("unknown", 1)
+        assert calls == []
+        with self.assertRaises(ValueError):
+            self.bus.addEventListener("updated", callback, dispatch=Dispatch.asyncio)
+
+    def test_errors_do_not_stop_notification(self):
+        """
+        Given a failing listener
+        Next listeners are still notified, and the error is counted
+        """
+        calls = []
+        self.bus.addEventListener("updated", lambda src, ev, v: 1 / 0)
+        self.bus.addEventListener("updated", lambda src, ev, v: calls.append(v))
+        self.bus.notify("updated", 2)
+        assert calls == [2]
+        assert [s["errors"] for s in self.bus.getListenerStats("updated")] == [1, 0]
+
+    def test_latency_stats_and_slow_warning(self):
+        """
+        Given a slow synchronous listener
+        Its latency is measured, and a warning is logged once per period
+        """
+        self.bus.addEventListener("updated", lambda src, ev, v: time.sleep(0.06))
+        with patch.object(events.anx, "warning") as warning:
+            self.bus.notify("updated")
+            self.bus.notify("updated")
+        stats = self.bus.getListenerStats()[0]
+        assert stats["calls"] == 2 and stats["maxMs"] >= 55 and stats["meanMs"] > DefaultEventSettings.slowCallbackMs
+        assert warning.call_count == 1 and "stalls the update loop" in warning.call_args[0][0]
+
+    def test_thread_dispatch(self):
+        """
+        Given a listener dispatched on the thread pool
+        It runs on another thread, without blocking the notification
+        """
+        release, done = threading.Event(), threading.Event()
+        threads = []
+        self.bus.addEventListener("updated", lambda src, ev, v: (release.wait(2), threads.append(
+            threading.current_thread()), done.set()), dispatch=Dispatch.thread)
+        self.bus.notify("updated")
+        # The listener waits for the notification to return
+        assert not done.is_set()
+        release.set()
+        assert done.wait(2)
+        assert threads[0] is not threading.current_thread()
+
+    def test_asyncio_dispatch(self):
+        """
+        Given listeners dispatched on an asyncio loop
+        Functions and coroutines run on the loop
+        """
+        loop = asyncio.new_event_loop()
+        received = []
+
+        async def coroutine(src, ev, v):
+            received.append(("coroutine", v))
+
+        self.bus.addEventListener("playerChanged", lambda src, ev, v: received.append(("function", v)),
+                                  dispatch=Dispatch.asyncio, loop=loop)
+        self.bus.addEventListener("playerChanged", coroutine, dispatch=Dispatch.asyncio, loop=loop)
+        self.bus.notify("playerChanged", {"life": 90})
+        loop.run_until_complete(asyncio.sleep(0.05))
+        loop.close()
+        assert sorted(received) == [("coroutine", {"life": 90}), ("function", {"life": 90})]
+        assert all(s["calls"] == 1 for s in self.bus.getListenerStats("playerChanged"))
+
@@ -0,0 +1,114 @@
+"""
+Tests the fire trajectory engine from src.api.j2l.pytactx.firepath
+"""
+import math
+import random
+import unittest
+
+from src.api.j2l.pytactx.firepath import computeFirepath, rasterizeFirepath, sampleFirepath
+
+
+def reference_firepath(firepath, x0, y0, direction, columns, rows):
+    """
+    Fire path as computed by Agent._onUpdated before the trajectory engine
+    """
+    x, y = x0, y0
+    grid_dim = columns * rows
+    t = 0
+    pts = []
+    while 0 <= x < columns and 0 <= y < rows and t < grid_dim:
+        n = len(pts)
+        if direction == 0:
+            fx = y0 - int(round(firepath(x - x0)))
+            pts.extend((x, yfx) for yfx in range(y - 1, fx - 1, -1))
+            if n == len(pts):
+                pts.append((x, y))
+            y, x = fx, x + 1
+        elif direction == 1:
+            fx = x0 - int(round(firepath(y0 - y)))
+            pts.extend((xfx, y) for xfx in range(x - 1, fx - 1, -1))
+            if n == len(pts):
+                pts.append((x, y))
+            x, y = fx, y - 1
+        elif direction == 2:
+            fx = y0 + int(round(firepath(x0 - x)))
+            pts.extend((x, yfx) for yfx in range(y + 1, fx + 1, 1))
+            if n == len(pts):
+                pts.append((x, y))
+            y, x = fx, x - 1
+        elif direction == 3:
+            fx = x0 + int(round(firepath(y - y0)))
+            pts.extend((xfx, y) for xfx in range(x + 1, fx + 1, 1))
+            if n == len(pts):
+                pts.append((x, y))
+            x, y = fx, y + 1
+        else:
+            break
+        t += 1
+    return pts
+
+
+FIREPATHS = [
+    lambda x: 0,
+    lambda x: x,
+    lambda x: -x,
+    lambda x: 0.5 * x,
+    lambda x: 0.1 * x * x,
+    lambda x: 3 * math.sin(x / 2),
+    lambda x: x if x < 4 else 8 - x,
+    lambda x: -2.5,
+]
+
+
+class TestFirepath(unittest.TestCase):
+    """
+    Ensure that the vectorized trajectory matches the original one
+    """
+
+    def test_matches_reference(self):
+        """
+        Given many firepaths, positions, directions and grid sizes
+        The rasterized trajectory is the same as the original loop
+        """
+        rng = random.Random(0)
+        for firepath in FIREPATHS:
+            for _ in range(60):
+                columns, rows = rng.randint(1, 30), rng.randint(1, 30)
+                x, y = rng.randint(-1, columns), rng.randint(-1, rows)
+                for direction in range(5):
+                    expected = reference_firepath(firepath, x, y, direction, columns, rows)
+                    got = list(rasterizeFirepath(firepath, x, y, direction, columns, rows))
+                    assert got == expected, (x, y, direction, columns, rows)
+
+    def test_single_value_firepath(self):
+        """
+        Given a firepath returning a single value for the whole array, like a random one
+        It is called for each sample instead of repeating this value
+        """
+        calls = []
+
+        def firepath(x):
+            calls.append(x)
+            return len(calls) % 3
+
+        assert sampleFirepath(firepath, 5).tolist() == [2, 0, 1, 2, 0]
+        assert calls[1:] == [0, 1, 2, 3, 4]
+        assert sampleFirepath(lambda x: 1.6, 3).tolist() == [2, 2, 2]
+
+    def test_points_are_python_ints(self):
+        """
+        Points are sent as json, they must not be numpy integers
+        """
+        pts = rasterizeFirepath(lambda x: x, 2, 2, 0, 10, 10)
+        assert all(type(v) is int for pt in pts for v in pt)
+
+    def test_cached(self):
+        """
+        Given the same firepath fired twice from the same position
+        The trajectory is computed once
+        """
+        firepath = lambda x: 0.3 * x  # noqa: E731
+        first = computeFirepath(firepath, 5, 5, 1, 40, 40)
+        hits = computeFirepath.cache_info().hits
+        assert computeFirepath(firepath, 5, 5, 1, 40, 40) is first
+        assert computeFirepath.cache_info().hits == hits + 1
@@ -0,0 +1,142 @@
+"""
+Tests the maze memory and planner of the bots from src.api.j2l.pytactx.mazememory
+"""
+import heapq
+import unittest
+
+import numpy as np
+
+from src.api.j2l.pytactx.mazememory import UNKNOWN, MazeMemory
+from src.server.maze import Tile, generate_maze
+
+FRICTION = [1, 0, 0.5, 0.1, 1, 0]
+
+
+def reference_cost(memory, start, goal):
+    """
+    Dijkstra on the memory's current knowledge, unknown cells being walkable
+    """
+    costs = {Tile.FLOOR: 1.0, Tile.SLOW: 2.0, Tile.TRAP: 10.0, Tile.BATTERY: 1.0, UNKNOWN: 1.0}
+    best = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        cost, (x, y) = heapq.heappop(heap)
+        if (x, y) == goal:
+            return cost
+        if cost > best[(x, y)]:
+            continue
+        for nxt in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if not (0 <= nxt[0] < memory.columns and 0 <= nxt[1] < memory.rows):
+                continue
+            step = costs.get(memory.tile(*nxt))
+            if step is not None and cost + step < best.get(nxt, float("inf")):
+                best[nxt] = cost + step
+                heapq.heappush(heap, (cost + step, nxt))
+    return float("inf")
+
+
+class FakeAgent:
+    def __init__(self, maze):
+        self.x, self.y = maze.spawns[0]
+        self.profile = 0
+        self.game = {"range": [2]}
+        self.map = maze.to_list()
+        self.range = {}
+        self.listeners = {}
+
+    def addEventListener(self, attributeName, callback):
+        self.listeners.setdefault(attributeName, []).append(callback)
+
+    def moveTo(self, x, y):
+        self.x, self.y = x, y
+        for callback in self.listeners["x"]:
+            callback(self, "x", None, x)
+
+
+class TestMazeMemory(unittest.TestCase):
+    """
+    Ensure that bots remember what they saw, and replan the shortest known paths incrementally
+    """
+
+    def test_observe(self):
+        """
+        Given a bot seeing its surroundings and another agent
+        Only the cells within its radius are known, and the agent's cell is walkable
+        """
+        maze = generate_maze(5, columns=21, rows=21)
+        memory = MazeMemory(21, 21, FRICTION)
+        assert memory.observe(10, 10, 2, maze.grid) == 13
+        assert memory.isKnown(12, 10) and not memory.isKnown(12, 12)
+        assert memory.tile(10, 10) == maze.grid[10, 10]
+        assert memory.observe(10, 10, 2, maze.grid) == 0
+        assert memory.observeRange({"p2": {"x": 0, "y": 0}, "arbitre": {}}) == 1
+        assert memory.isWalkable(0, 0) and memory.tile(0, 0) == Tile.FLOOR
+        frontier = memory.frontier()
+        assert (0, 0) in frontier and (10, 10) not in frontier
+
+    def test_shortest_known_path(self):
+        """
+        Given a fully observed maze with slow cells
+        The planned path is the fastest one, and follows walkable cells
+        """
+        maze = generate_maze(11)
+        rows, columns = maze.grid.shape
+        memory = MazeMemory(columns, rows, FRICTION)
+        memory.observe(0, 0, max(rows, columns) * 2, maze.grid)
+        memory.setGoal(*maze.battery)
+        for start in maze.spawns[:5]:
+            path = memory.planPath(*start)
+            assert path[-1] == maze.battery
+            assert all(memory.isWalkable(x, y) for x, y in path)
+            assert memory.distanceToGoal(*start) == reference_cost(memory, start, maze.battery)
+            assert memory.nextStep(*start) == path[0]
+
+    def test_incremental_replanning(self):
+        """
+        Given a bot walking towards the battery and discovering walls on its way
+        Each replan gives the cost a new search would, while expanding far fewer cells
+        """
+        maze = generate_maze(2)
+        rows, columns = maze.grid.shape
+        memory = MazeMemory(columns, rows, FRICTION)
+        x, y = maze.spawns[0]
+        memory.setGoal(*maze.battery)
+        memory.observe(x, y, 2, maze.grid)
+        memory.nextStep(x, y)
+        first = memory.expanded
+        steps = 0
+        while (x, y) != maze.battery and steps < 2000:
+            memory.observe(x, y, 2, maze.grid)
+            step = memory.nextStep(x, y)
+            if steps % 25 == 0:
+                assert memory.distanceToGoal(x, y) == reference_cost(memory, (x, y), maze.battery)
+            x, y = step
+            steps += 1
+        assert (x, y) == maze.battery
+        # A search from scratch at each step would expand about `first` cells each time
+        assert memory.expanded - first < steps * first / 5
+
+    def test_explore(self):
+        """
+        Given a bot attached to an agent, exploring without knowing the battery
+        It moves from frontier to frontier until it sees the battery, then reaches it
+        """
+        maze = generate_maze(3, columns=21, rows=21)
+        memory = MazeMemory(21, 21, FRICTION)
+        agent = FakeAgent(maze)
+        memory.attach(agent)
+        agent.moveTo(agent.x, agent.y)
+        for _ in range(3000):
+            batteries = memory.locate(Tile.BATTERY)
+            if batteries:
+                if memory.goal != batteries[0]:
+                    memory.setGoal(*batteries[0])
+                step = memory.nextStep(agent.x, agent.y)
+            else:
+                step = memory.explore(agent.x, agent.y)
+            if step is None:
+                break
+            assert maze.grid[step[1], step[0]] != Tile.WALL
+            agent.moveTo(*step)
+        assert (agent.x, agent.y) == maze.battery
+        assert np.count_nonzero(memory.grid == UNKNOWN) > 0
@@ -0,0 +1,155 @@
+"""
+Tests the shared broker connections from src.api.j2l.pyrobotx.pool
+"""
+import unittest
+from types import SimpleNamespace
+
+from src.api.j2l.pyrobotx.client import OvaClientMqtt
+from src.api.j2l.pyrobotx.pool import BrokerConnectionPool
+
+
+class FakePahoClient:
+    """
+    Records what would be sent to the broker, and connects as soon as its loop starts
+    """
+    instances = []
+
+    def __init__(self, client_id, userdata=None):
+        self.client_id = client_id
+        self.userdata = userdata
+        self.subscribed = []
+        self.published = []
+        self.connected = False
+        self.on_message = self.on_connect = self.on_disconnect = None
+        FakePahoClient.instances.append(self)
+
+    def username_pw_set(self, username, password=None):
+        self.credentials = (username, password)
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        self.reconnect_delay = (min_delay, max_delay)
+
+    def connect(self, host, port):
+        return 0
+
+    def loop_start(self):
+        self.drop(reconnect=True)
+
+    def loop_stop(self):
+        ...
+
+    def disconnect(self):
+        self.connected = False
+
+    def subscribe(self, topic):
+        self.subscribed.append(topic)
+
+    def unsubscribe(self, topic):
+        self.subscribed.remove(topic)
+
+    def publish(self, topic, payload):
+        self.published.append((topic, payload))
+
+    def drop(self, reconnect=False):
+        """ Simulate the loss of the connection, and the automatic reconnection of paho """
+        if self.connected:
+            self.connected = False
+            self.subscribed = []
+            self.on_disconnect(self, self.userdata, 1)
+        if reconnect:
+            self.connected = True
+            self.on_connect(self, self.userdata, {}, 0)
+
+    def deliver(self, topic, payload):
+        self.on_message(self, self.userdata, SimpleNamespace(topic=topic, payload=payload))
+
+
+def new_client(pool, robot_id):
+    return OvaClientMqtt(robot_id, "arena", "user", "pass", "broker", 1883, None, True, True, 0,
+                         robot_id, False, pool=pool)
+
+
+class TestBrokerConnectionPool(unittest.TestCase):
+    """
+    Ensure that many clients share a few connections
+    """
+
+    def setUp(self):
+        FakePahoClient.instances = []
+        self.pool = BrokerConnectionPool(maxClientsPerConnection=50, clientFactory=FakePahoClient)
+
+    def test_clients_share_connections(self):
+        """
+        Given 100 clients on the same broker
+        Only 2 connections are opened, and every client is connected
+        """
+        clients = [new_client(self.pool, f"ova{i}") for i in range(100)]
+        assert self.pool.connectionCount() == 2
+        assert self.pool.clientCount() == 100
+        assert len(FakePahoClient.instances) == 2
+        assert all(c._OvaClientMqtt__isConnectedToBroker for c in clients)
+        fake = FakePahoClient.instances[0]
+        # The arena topic is subscribed once per connection
+        assert fake.subscribed.count("ludx/server/state/arena") == 1
+        assert "robotx/clients/state/ova0" in fake.subscribed
+
+    def test_messages_reach_their_client(self):
+        """
+        Given clients sharing a connection
+        A robot state only reaches the client of this robot, the arena state reaches all
+        """
+        first, second = new_client(self.pool, "ova1"), new_client(self.pool, "ova2")
+        fake = FakePahoClient.instances[0]
+        fake.deliver("robotx/clients/state/ova2", b'{"battery": 3700}')
+        fake.deliver("ludx/server/state/arena", b'{"pause": true}')
+        assert first._OvaClientMqtt__bufRobotState == {}
+        assert second._OvaClientMqtt__bufRobotState == {"battery": 3700}
+        assert first._OvaClientMqtt__bufArenaState == second._OvaClientMqtt__bufArenaState == {"pause": True}
+
+    def test_reference_counting(self):
+        """
+        Given clients disconnecting one by one
+        Shared topics are kept until the last client leaves, then the connection is closed
+        """
+        first, second = new_client(self.pool, "ova1"), new_client(self.pool, "ova2")
+        fake = FakePahoClient.instances[0]
+        first.disconnect()
+        assert "robotx/clients/state/ova1" not in fake.subscribed
+        assert "ludx/server/state/arena" in fake.subscribed
+        assert self.pool.connectionCount() == 1
+        second.disconnect()
+        assert self.pool.connectionCount() == 0
+        assert fake.subscribed == [] and not fake.connected
+
+    def test_reconnect(self):
+        """
+        Given a shared connection lost then restored by paho
+        Clients are notified, and subscriptions are restored
+        """
+        client = new_client(self.pool, "ova1")
+        fake = FakePahoClient.instances[0]
+        fake.drop()
+        assert not client._OvaClientMqtt__isConnectedToBroker
+        fake.drop(reconnect=True)
+        assert client._OvaClientMqtt__isConnectedToBroker
+        assert "robotx/clients/state/ova1" in fake.subscribed
+        assert fake.published[-1][0] == "ludx/clients/request/arena/ova1"
+
+    def test_separate_credentials(self):
+        """
+        Clients with different credentials never share a connection
+        """
+        self.pool.client("a", None, "broker", 1883, "user1", "pass")
+        self.pool.client("b", None, "broker", 1883, "user2", "pass")
+        assert self.pool.connectionCount() == 2
+        with self.assertRaises(ValueError):
+            BrokerConnectionPool(maxClientsPerConnection=0)
+
+    def test_client_without_pool(self):
+        """
+        Without pool, a client owns its paho client, whatever the paho version
+        """
+        client = OvaClientMqtt("ova1", "arena", "user", "pass", "broker", 1883, None, False, True, 0,
+                               "ova1", False)
+        assert client._OvaClientMqtt__client is not None
+        assert self.pool.connectionCount() == 0
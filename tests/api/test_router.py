@@ -0,0 +1,97 @@
+"""
+Tests the mqtt topic dispatch from src.api.j2l.pyrobotx.router
+"""
+import unittest
+
+from src.api.j2l.pyrobotx.router import TopicRouter, topicMatches
+from src.api.j2l.pyrobotx.session import OfflineBroker
+from tests.api.test_pool import new_client
+
+
+class TestTopicRouter(unittest.TestCase):
+    """
+    Ensure that messages reach the handlers of their topic, wildcards included
+    """
+
+    def test_topic_matches(self):
+        """
+        Mqtt wildcards match as specified by mqtt
+        """
+        assert topicMatches("robotx/clients/state/ova1", "robotx/clients/state/ova1")
+        assert not topicMatches("robotx/clients/state/ova1", "robotx/clients/state/ova2")
+        assert topicMatches("robotx/clients/state/+", "robotx/clients/state/ova2")
+        assert not topicMatches("robotx/clients/state/+", "robotx/clients/state/ova2/x")
+        assert topicMatches("ludx/#", "ludx/clients/state/arena/p1")
+        assert topicMatches("ludx/#", "ludx")
+        assert topicMatches("#", "any/topic")
+        assert topicMatches("ludx/+/state/#", "ludx/server/state/arena")
+        assert not topicMatches("ludx/+/state", "robotx/server/state")
+
+    def test_dispatch(self):
+        """
+        Given exact and wildcard handlers
+        Each message is dispatched to all the matching handlers
+        """
+        router = TopicRouter()
+        received = []
+        router.add("robotx/clients/state/ova1", lambda t, p: received.append(("exact", t, p)))
+        router.add("robotx/clients/state/+", lambda t, p: received.append(("robots", t, p)))
+        assert router.dispatch("robotx/clients/state/ova1", b"1")
+        assert router.dispatch("robotx/clients/state/ova2", b"2")
+        assert not router.dispatch("optx/clients/stream/ova1", b"3")
+        assert received == [("exact", "robotx/clients/state/ova1", b"1"),
+                            ("robots", "robotx/clients/state/ova1", b"1"),
+                            ("robots", "robotx/clients/state/ova2", b"2")]
+
+    def test_remove(self):
+        """
+        Given handlers removed after a first dispatch
+        The cached resolution is invalidated
+        """
+        router = TopicRouter()
+        received = []
+        handler = lambda t, p: received.append(p)  # noqa: E731
+        router.add("a/b", handler)
+        router.add("a/+", handler)
+        assert sorted(router.subscriptions()) == ["a/+", "a/b"]
+        router.dispatch("a/b", 1)
+        router.remove("a/+", handler)
+        router.dispatch("a/b", 2)
+        router.remove("a/b")
+        assert not router.dispatch("a/b", 3)
+        assert received == [1, 1, 2]
+        assert router.subscriptions() == []
+
+    def test_many_robots(self):
+        """
+        Given one exact handler per robot
+        Dispatch does not depend on the number of robots
+        """
+        router = TopicRouter()
+        counts = {}
+        for i in range(1000):
+            router.add(f"robotx/clients/state/ova{i}", lambda t, p: counts.__setitem__(t, p))
+        for i in range(1000):
+            router.dispatch(f"robotx/clients/state/ova{i}", i)
+        assert len(counts) == 1000 and counts["robotx/clients/state/ova999"] == 999
+
+    def test_change_robot_keeps_handlers(self):
+        """
+        Given a client with handlers added by the user, changing robot
+        The user handlers are kept, and only the built-in topics follow the new robot
+        """
+        broker = OfflineBroker()
+        client = new_client(broker.pool, "ova1")
+        received = []
+        client.addTopicHandler("robotx/clients/state/ova3", lambda topic, payload: received.append(topic))
+        client.addTopicHandler("custom/#", lambda topic, payload: received.append(topic))
+        client._OvaClientMqtt__changeRobot("ova2", True)
+        broker.publish("custom/topic", b"{}")
+        broker.publish("robotx/clients/state/ova3", b"{}")
+        assert received == ["custom/topic", "robotx/clients/state/ova3"]
+        broker.publish("robotx/clients/state/ova1", b'{"x": 1}')
+        client.update(False)
+        assert client.getRobotState().get("x") != 1
+        broker.publish("robotx/clients/state/ova2", b'{"x": 2}')
+        client.update(False)
+        assert client.getRobotState().get("x") == 2
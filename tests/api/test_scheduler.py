@@ -0,0 +1,96 @@
+"""
+Tests the adaptive update rate from src.api.j2l.pyrobotx.scheduler
+"""
+import threading
+import time
+import unittest
+
+from src.api.j2l.pyrobotx.client import DefaultClientSettings
+from src.api.j2l.pyrobotx.pool import BrokerConnectionPool
+from src.api.j2l.pyrobotx.scheduler import AdaptiveScheduler
+from tests.api.test_pool import FakePahoClient, new_client
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    """
+    Ensure that updates are fast when busy, slow when idle, and never too fast
+    """
+
+    def test_backoff_while_idle(self):
+        """
+        Given idle updates
+        The period doubles after each update, up to dtMax, and is reset when busy
+        """
+        scheduler = AdaptiveScheduler(dtMin=5, dtMax=40)
+        scheduler.wait(False)
+        periods = []
+        for _ in range(4):
+            scheduler.wait(False)
+            periods.append(scheduler.periodMs)
+        assert periods == [20, 40, 40, 40]
+        scheduler.wait(True)
+        assert scheduler.periodMs == 5
+
+    def test_max_rate(self):
+        """
+        Given busy updates, or wake ups before each update
+        Updates are never closer than dtMin
+        """
+        scheduler = AdaptiveScheduler(dtMin=20, dtMax=1000)
+        scheduler.wait(True)
+        start = time.perf_counter()
+        for _ in range(5):
+            scheduler.wake()
+            scheduler.wait(True)
+        assert time.perf_counter() - start >= 5 * 0.019
+
+    def test_wake_up(self):
+        """
+        Given an idle scheduler waiting for a long period
+        A wake up ends the wait early
+        """
+        scheduler = AdaptiveScheduler(dtMin=1, dtMax=2000, backoff=2000)
+        scheduler.wait(False)
+        threading.Timer(0.03, scheduler.wake).start()
+        assert scheduler.wait(False) < 1000
+        assert scheduler.periodMs == 2000
+
+    def test_bad_params(self):
+        """
+        Invalid rates are refused
+        """
+        with self.assertRaises(ValueError):
+            AdaptiveScheduler(dtMin=0)
+        with self.assertRaises(ValueError):
+            AdaptiveScheduler(dtMin=100, dtMax=10)
+
+    def test_client_reacts_to_states(self):
+        """
+        Given an idle client
+        An arena state received during its update wait is processed without waiting the idle period
+        """
+        client = new_client(BrokerConnectionPool(clientFactory=FakePahoClient), "ova1")
+        fake = FakePahoClient.instances[-1]
+        for _ in range(6):  # Back off up to the max idle period
+            client.update()
+        threading.Timer(0.03, fake.deliver, ("ludx/server/state/arena", b'{"pause": true}')).start()
+        start = time.perf_counter()
+        client.update()
+        assert time.perf_counter() - start < 0.5
+        client.update()
+        assert client._OvaClientMqtt__arenaState == {"pause": True}
+
+    def test_client_tx_period(self):
+        """
+        Given a busy client, updated faster than dtTx
+        Its requests are still sent at most every dtTx
+        """
+        client = new_client(BrokerConnectionPool(clientFactory=FakePahoClient), "ova1")
+        fake = FakePahoClient.instances[-1]
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.5:
+            client.requestArena("pause", True)
+            fake.deliver("ludx/server/state/arena", b'{"pause": true}')
+            client.update()
+        sent = [topic for topic, _ in fake.published if topic.endswith("/arena")]
+        assert 2 <= len(sent) <= 0.5 / (DefaultClientSettings.dtTx / 1000) + 1
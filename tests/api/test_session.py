@@ -0,0 +1,145 @@
+"""
+Tests the session recording and replay from src.api.j2l.pyrobotx.session
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from src.api.j2l.pyrobotx.clock import Clock
+from src.api.j2l.pyrobotx.codec import JsonCodec, typicalArenaState
+from src.api.j2l.pyrobotx.session import (OfflineBroker, SessionRecorder, SessionReplayer, readSession,
+                                          readSessionMetadata)
+from tests.api.test_pool import new_client
+
+
+class FakeSource:
+    def __init__(self):
+        self.ns = 0
+
+    def __call__(self):
+        return self.ns
+
+
+class TestSession(unittest.TestCase):
+    """
+    Ensure that sessions are recorded compactly and replayed as received
+    """
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "session.ovarec")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        """
+        Given messages recorded at known times
+        They are read back in order, with their topic, payload and relative timestamp
+        """
+        source = FakeSource()
+        with SessionRecorder(self.path, {"arena": "a"}, clock=Clock(source)) as recorder:
+            source.ns = 5000
+            recorder.record("ludx/server/state/a", b'{"t": 1}')
+            source.ns = 9000
+            recorder.record("ludx/clients/state/a/p", bytearray(b""))
+        assert recorder.messages == 2
+        assert readSessionMetadata(self.path) == {"arena": "a"}
+        messages = list(readSession(self.path))
+        assert [(m.timestamp, m.topic, m.payload) for m in messages] == [
+            (5000, "ludx/server/state/a", b'{"t": 1}'), (9000, "ludx/clients/state/a/p", b"")]
+
+    def test_compact(self):
+        """
+        Given many similar arena states
+        The session file is much smaller than the raw payloads
+        """
+        codec = JsonCodec()
+        payloads = []
+        with SessionRecorder(self.path) as recorder:
+            for t in range(200):
+                state = typicalArenaState(10)
+                state["t"] = t
+                payloads.append(codec.encode(state))
+                recorder.record("ludx/server/state/a", payloads[-1])
+        assert os.path.getsize(self.path) < sum(len(p) for p in payloads) / 4
+        assert [m.payload for m in readSession(self.path)] == payloads
+
+    def test_truncated_file(self):
+        """
+        Given a recording cut in the middle of its last message
+        Every complete message is still read
+        """
+        with SessionRecorder(self.path) as recorder:
+            for i in range(10):
+                recorder.record("topic", json.dumps({"i": i}).encode())
+        size = os.path.getsize(self.path)
+        with open(self.path, "r+b") as file:
+            file.truncate(size - 3)
+        assert [json.loads(m.payload)["i"] for m in readSession(self.path)] == list(range(9))
+
+    def test_unclosed_recording(self):
+        """
+        Given a recording still open, as left by a crashed process
+        Every recorded message is already in the file
+        """
+        recorder = SessionRecorder(self.path)
+        for i in range(3):
+            recorder.record("topic", json.dumps({"i": i}).encode())
+            assert [json.loads(m.payload)["i"] for m in readSession(self.path)] == list(range(i + 1))
+        recorder.close()
+
+    def test_not_a_session(self):
+        """
+        Given another file
+        Reading it fails explicitly
+        """
+        with open(self.path, "wb") as file:
+            file.write(b"{}")
+        with self.assertRaises(ValueError):
+            readSessionMetadata(self.path)
+
+    def test_replay_speed(self):
+        """
+        Given messages recorded 100ms apart
+        They are replayed 100ms apart at real time, 50ms apart at speed 2, without waiting at max speed
+        """
+        source = FakeSource()
+        with SessionRecorder(self.path, clock=Clock(source)) as recorder:
+            recorder.record("topic", b"0")
+            source.ns = 100 * 1000000
+            recorder.record("topic", b"1")
+        with self.assertRaises(ValueError):
+            SessionReplayer(self.path, speed=0)
+        for speed, expectedSleeps in ((1, [0.1]), (2, [0.05]), (None, [])):
+            replayClock, sleeps = FakeSource(), []
+
+            def sleep(seconds):
+                sleeps.append(seconds)
+                replayClock.ns += int(seconds * 1e9)
+
+            replayer = SessionReplayer(self.path, speed, clock=Clock(replayClock), sleep=sleep)
+            assert replayer.replay(lambda topic, payload: None) == 2
+            assert sleeps == expectedSleeps, speed
+
+    def test_record_client(self):
+        """
+        Given a client recording its session on an offline broker
+        The replayed messages reach a new client as if received from the broker
+        """
+        broker = OfflineBroker()
+        client = new_client(broker.pool, "ova1")
+        client.startRecording(self.path)
+        broker.publish("robotx/clients/state/ova1", b'{"x": 3}')
+        broker.publish("robotx/clients/state/ova2", b'{"x": 4}')
+        client.stopRecording()
+        assert readSessionMetadata(self.path)["robotId"] == "ova1"
+        assert [m.topic for m in readSession(self.path)] == ["robotx/clients/state/ova1"]
+
+        replayBroker = OfflineBroker()
+        replayed = new_client(replayBroker.pool, "ova1")
+        received = []
+        replayed.addTopicHandler("robotx/clients/state/ova1", lambda topic, payload: received.append(payload))
+        SessionReplayer(self.path).replay(replayBroker.publish)
+        assert received == [b'{"x": 3}']
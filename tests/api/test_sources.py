@@ -0,0 +1,143 @@
+"""
+Tests the sources snapshot from src.api.j2l.pytactx.sources
+"""
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from src.api.j2l.pyrobotx.session import OfflineBroker
+from src.api.j2l.pytactx.agent import Agent, exploreSourcesDirs, fetchSources
+from src.api.j2l.pytactx.sources import SourcesSnapshot, fetchSourcesAsync, markSentAsync
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+class TestSourcesSnapshot(unittest.TestCase):
+    """
+    Ensure that only changed sources are read and sent
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write(os.path.join(self.root, "main.py"), "print('hello')\n")
+        write(os.path.join(self.root, "rules.json"), "{}")
+        write(os.path.join(self.root, "pkg", "module.py"), "x = 1\n")
+        write(os.path.join(self.root, "pkg", "notes.txt"), "not a source")
+        write(os.path.join(self.root, "venv", "lib.py"), "ignored")
+        write(os.path.join(self.root, ".hidden", "secret.py"), "ignored")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_sources_as_exploration(self):
+        """
+        Given a project
+        The snapshot finds the same sources as the original exploration
+        """
+        expected = exploreSourcesDirs(self.root)
+        assert SourcesSnapshot(self.root).scan() == expected
+        assert fetchSources(self.root) == expected
+        assert sorted(expected) == sorted(["/main.py", "/rules.json", os.path.join("/pkg", "module.py")])
+
+    def test_exploration_has_no_shared_state(self):
+        """
+        Exploring two projects must not mix their sources
+        """
+        with tempfile.TemporaryDirectory() as other:
+            write(os.path.join(other, "other.py"), "")
+            exploreSourcesDirs(self.root)
+            assert list(exploreSourcesDirs(other)) == ["/other.py"]
+
+    def test_only_changed_files_are_read(self):
+        """
+        Given a snapshot saved in cache
+        When a new snapshot scans the project, unchanged files come from the cache
+        """
+        snapshot = SourcesSnapshot(self.root)
+        snapshot.scan()
+        snapshot.save()
+        assert os.path.isfile(snapshot.cachePath)
+        # Change the content on disk without changing mtime nor size: must not be read again
+        main = os.path.join(self.root, "main.py")
+        stat = os.stat(main)
+        write(main, "print('HELLO')\n")
+        os.utime(main, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        sources = SourcesSnapshot(self.root).scan()
+        assert sources["/main.py"] == fetchSources(self.root)["/main.py"]
+        assert b"hello" in base64.b64decode(sources["/main.py"][5])
+
+    def test_delta_per_target(self):
+        """
+        Given sources already sent to an arena
+        Only the changed files are sent again, while other arenas and new runs get everything
+        """
+        snapshot = SourcesSnapshot(self.root)
+        first = snapshot.delta("arena1")
+        assert len(first) == 3
+        snapshot.markSent("arena1", first)
+        snapshot.save()
+        assert snapshot.delta("arena1") == {}
+        assert len(SourcesSnapshot(self.root).delta("arena1")) == 3
+        time.sleep(0.01)
+        write(os.path.join(self.root, "pkg", "module.py"), "x = 22\n")
+        assert list(snapshot.delta("arena1")) == [os.path.join("/pkg", "module.py")]
+        assert len(snapshot.delta("arena2")) == 3
+        snapshot.forget("arena1")
+        assert len(snapshot.delta("arena1")) == 3
+
+    def test_fetch_in_background(self):
+        """
+        Given a project
+        The delta is computed in background, and only marked as sent when told so
+        """
+        snapshot = SourcesSnapshot(self.root)
+        delta = fetchSourcesAsync(snapshot, "arena").result(timeout=5)
+        assert len(delta) == 3
+        assert len(fetchSourcesAsync(SourcesSnapshot(self.root), "arena").result(timeout=5)) == 3
+        markSentAsync(snapshot, "arena", delta).join(5)
+        assert fetchSourcesAsync(snapshot, "arena").result(timeout=5) == {}
+        # The files index is saved, not what was sent
+        with open(snapshot.cachePath, encoding="utf-8") as cache:
+            assert "sent" not in json.load(cache)
+
+    def test_agent_marks_sent_once_published(self):
+        """
+        Given an agent joining an arena on an offline broker
+        Its sources are marked as sent only after their request was published, and only for this run
+        """
+        broker = OfflineBroker()
+        agent = Agent("bot", "arena", "user", "pass", "broker", 1883, None, waitArenaConnection=False,
+                      verbosity=0, welcomePrint=False, sourcesdir=self.root, connectionPool=broker.pool)
+        broker.publish("ludx/server/state/arena", json.dumps({"t": 1}).encode())
+        for _ in range(100):
+            agent.update(False)
+            if any(b"nExe" in payload for _, payload in broker.published):
+                break
+            time.sleep(0.01)
+        requests = [json.loads(payload) for _, payload in broker.published if b"nExe" in payload]
+        assert len(requests) == 1 and len(requests[0]["nExe"]) == 3
+        snapshot = agent._Agent__sourcesSnapshot
+        assert len(snapshot.delta("broker:1883/arena/bot")) == 3
+        agent.update(False)
+        assert snapshot.delta("broker:1883/arena/bot") == {}
+        for _ in range(100):  # Wait for the files index saved in background
+            if os.path.exists(snapshot.cachePath) and not os.path.exists(snapshot.cachePath + ".tmp"):
+                break
+            time.sleep(0.01)
+        assert len(SourcesSnapshot(self.root).delta("broker:1883/arena/bot")) == 3
+
+    def test_corrupted_cache(self):
+        """
+        A corrupted cache file is ignored
+        """
+        snapshot = SourcesSnapshot(self.root)
+        write(snapshot.cachePath, "{not json")
+        assert len(SourcesSnapshot(self.root).delta("arena")) == 3
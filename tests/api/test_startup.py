@@ -0,0 +1,67 @@
+"""
+Tests the import time of the agent, which delays every process start
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Budget for importing everything the manager needs, in seconds (about 0.3s on a dev machine)
+IMPORT_TIME_BUDGET = 1.5
+
+PROFILE_IMPORT = """
+import json, os, sys, time
+calls = []
+os.system = lambda command: calls.append(command) or 0
+start = time.perf_counter()
+import run_manager
+print(json.dumps({
+    "duration": time.perf_counter() - start,
+    "system_calls": calls,
+    "modules": [name for name in ("PIL", "requests") if name in sys.modules],
+}))
+"""
+
+
+def profile_import(**env) -> dict:
+    """
+    Import the manager in a fresh interpreter, and return what happened
+    """
+    environ = {k: v for k, v in os.environ.items() if k != "OVARENA_AUTO_INSTALL"}
+    environ.update(env)
+    result = subprocess.run([sys.executable, "-c", PROFILE_IMPORT], cwd=ROOT_DIR, env=environ,
+                            capture_output=True, text=True, timeout=60, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Ensure that importing the agent is fast and has no side effect
+    """
+
+    def test_no_install_on_import(self):
+        """
+        Given the default environment
+        Importing the manager must not run pip, nor load PIL and requests
+        """
+        profile = profile_import()
+        assert profile["system_calls"] == []
+        assert profile["modules"] == []
+
+    def test_import_time_budget(self):
+        """
+        Importing the manager must stay within the startup budget
+        """
+        duration = min(profile_import()["duration"] for _ in range(3))
+        assert duration < IMPORT_TIME_BUDGET, f"import took {duration:.2f}s"
+
+    def test_auto_install_opt_in(self):
+        """
+        Given OVARENA_AUTO_INSTALL=1
+        Requirements are installed on import
+        """
+        profile = profile_import(OVARENA_AUTO_INSTALL="1")
+        assert any("pip install" in call for call in profile["system_calls"])
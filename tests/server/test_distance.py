@@ -0,0 +1,132 @@
+"""
+Tests the distance fields from src.server.maze.distance
+"""
+import math
+import unittest
+from unittest.mock import patch
+
+from src.server.maze import ScoreRules, Tile, distance_field, generate_maze
+from tests.server.test_manager import new_2players_arena
+
+FRICTION = [1, 0, 0.5, 0.1, 1, 0]
+
+# 0 floor, 1 wall, 2 slow, 4 battery
+SMALL_MAP = [
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 4, 1],
+    [1, 0, 1, 1, 1, 2, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+]
+
+
+class TestDistanceField(unittest.TestCase):
+    """
+    Ensure that distance fields account for friction, and derive scores from it
+    """
+
+    def test_time_with_friction(self):
+        """
+        Given a map with a slow cell next to the battery
+        The time to reach the battery accounts for the slow cell
+        """
+        field = distance_field(SMALL_MAP, FRICTION, dt_move=100)
+        assert field.battery == (5, 1)
+        assert field.time[1, 5] == 0
+        assert field.time[1, 4] == 100
+        # entering the slow cell costs 200ms, then 100ms to the battery
+        assert field.time[3, 5] == 300
+        assert field.incidents[3, 5] == 1
+        assert field.incidents[3, 4] == 1
+        # going around through the top-left corridor is faster for (1, 3)
+        assert field.time[3, 1] == 600
+        assert field.incidents[3, 1] == 0
+        assert not field.reachable(0, 0)
+        assert math.isinf(field.time[0, 0])
+        assert math.isnan(field.optimal_score[0, 0])
+
+    def test_scores(self):
+        """
+        Given the scoring rules
+        The optimal score from a cell includes the battery and the streak bonus,
+         minus the incidents on the way
+        """
+        rules = ScoreRules()
+        field = distance_field(SMALL_MAP, FRICTION, dt_move=100, spawns=[(1, 3), (4, 3)])
+        bonus = rules.streak_bonus * (rules.match_duration - rules.streak_delay)
+        assert math.isclose(field.optimal_score[3, 1], rules.battery_points + bonus)
+        assert field.optimal_score[3, 4] < field.optimal_score[3, 1]
+        assert field.theoretical_max == round(rules.battery_points + bonus, 2)
+        assert field.efficiency(field.theoretical_max) == 1.0
+        assert field.efficiency(-5) == 0.0
+        assert field.efficiency(10, spawn=(4, 3)) > field.efficiency(10)
+
+    def test_unreachable_battery_in_time(self):
+        """
+        Given a match too short to reach the battery
+        The battery points are not part of the optimal score
+        """
+        rules = ScoreRules(match_duration=0.5)
+        field = distance_field(SMALL_MAP, FRICTION, dt_move=100, rules=rules)
+        assert field.optimal_score[3, 1] < rules.battery_points
+
+    def test_no_battery(self):
+        """
+        Given a map without battery, there is no distance field
+        """
+        assert distance_field([[0, 0], [0, 0]], FRICTION) is None
+
+    def test_cached_per_map(self):
+        """
+        Given the same map twice, the field is computed once
+        """
+        maze = generate_maze(11)
+        first = distance_field(maze.grid, FRICTION)
+        assert distance_field(maze.to_list(), FRICTION) is first
+        assert distance_field(maze.grid, FRICTION, dt_move=200) is not first
+        assert first.theoretical_max > 0
+        for x, y in maze.spawns:
+            assert first.reachable(x, y)
+        assert first.time[maze.battery[1], maze.battery[0]] == 0
+
+    def test_manager_efficiency(self):
+        """
+        Given a manager with a generated map
+        Each player's efficiency is reported at the end of the game
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"gridColumns": 21, "gridRows": 21, "map": [],
+                                "mapFriction": FRICTION, "dtMove": [300]})
+        assert arena_manager.report_efficiency() == {}
+        maze = arena_manager.new_map(4)
+        fake_agent.players = ["p1", "p2"]
+        arena_manager._on_update(None, "event", "p1, p2")
+        player = arena_manager.registered_players[0]
+        field = arena_manager.distance_field
+        assert field.battery == maze.battery
+        player.score = field.theoretical_max / 2
+        efficiency = arena_manager.report_efficiency()
+        assert efficiency[player.name] == 0.5
+        assert Tile(maze.grid[maze.battery[1], maze.battery[0]]) == Tile.BATTERY
+
+    def test_manager_fields_per_profile(self):
+        """
+        Given a manager with profiles moving at different speeds
+        Each profile has its own field, computed once until the map changes
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"map": SMALL_MAP, "mapFriction": FRICTION, "dtMove": [100, 50]})
+        field = arena_manager.distance_field
+        with patch("src.server.arena_manager.grid_digest") as grid_digest:
+            assert arena_manager.profile_distance_field(0) is field
+            grid_digest.assert_not_called()
+        fast = arena_manager.profile_distance_field(1)
+        assert fast.time[3, 1] == field.time[3, 1] / 2
+        # An unknown profile moves as the first one
+        assert arena_manager.profile_distance_field(5) is field
+        # The same layout in a new object keeps its fields, another layout does not
+        fake_agent.game["map"] = [list(row) for row in SMALL_MAP]
+        assert arena_manager.distance_field is field
+        fake_agent.game["map"] = [list(row) for row in SMALL_MAP]
+        fake_agent.game["map"][2][5] = Tile.FLOOR
+        assert arena_manager.distance_field.time[3, 5] == field.time[3, 5] - 100
@@ -0,0 +1,112 @@
+"""
+Tests the players' personal maps from src.server.models.known_map
+"""
+import unittest
+
+from src.server.models.known_map import KnownMap
+from src.server.models.player_state import PlayerState
+from tests.server.test_manager import new_2players_arena
+
+
+class TestKnownMap(unittest.TestCase):
+    """
+    Ensure that the fog of war is accumulated, compact and serializable
+    """
+
+    def test_reveal_disc(self):
+        """
+        Given an empty map
+        When the player sees around him, the cells in range are known
+        """
+        known = KnownMap(20, 10)
+        assert known.count() == 0
+        known.reveal(5, 5, 2)
+        assert known.is_known(5, 5) and known.is_known(7, 5) and known.is_known(5, 3)
+        assert not known.is_known(7, 7)
+        assert known.count() == 13
+        assert known.dirty
+
+    def test_reveal_clipped(self):
+        """
+        Cells out of the grid are ignored
+        """
+        known = KnownMap(9, 9)
+        known.reveal(0, 0, 1)
+        assert known.count() == 3
+        known.reveal_cells([(8, 8), (9, 9), (-1, 0)])
+        assert known.count() == 4
+        assert not known.is_known(9, 9)
+
+    def test_dirty_only_on_new_cells(self):
+        """
+        Revealing known cells again does not mark the map as changed
+        """
+        known = KnownMap(10, 10)
+        known.reveal(3, 3, 1)
+        known.serialize()
+        assert not known.dirty
+        known.reveal(3, 3, 1)
+        assert not known.dirty
+        known.reveal(4, 3, 1)
+        assert known.dirty
+
+    def test_serialize(self):
+        """
+        A serialized map can be loaded back
+        """
+        known = KnownMap(13, 7)
+        known.reveal(12, 6, 3)
+        data = known.serialize()
+        assert data.startswith("13x7:")
+        loaded = KnownMap.deserialize(data)
+        assert (loaded.to_mask() == known.to_mask()).all()
+        with self.assertRaises(ValueError):
+            KnownMap.deserialize("garbage")
+
+    def test_merge(self):
+        """
+        Two maps of the same grid can be merged
+        """
+        first, second = KnownMap(10, 10), KnownMap(10, 10)
+        first.reveal(1, 1)
+        second.reveal(8, 8)
+        first.merge(second)
+        assert first.is_known(1, 1) and first.is_known(8, 8)
+        with self.assertRaises(ValueError):
+            first.merge(KnownMap(5, 5))
+
+    def test_memory_is_small(self):
+        """
+        A 500x500 map takes one bit per cell
+        """
+        assert KnownMap(500, 500).nbytes == 500 * 63
+        with self.assertRaises(ValueError):
+            KnownMap(0, 10)
+
+    def test_player_sees(self):
+        """
+        Given a player
+        What he sees is serialized in the known_map column of his row
+        """
+        player = PlayerState("p1", x=2, y=2)
+        player.see(10, 10, 1)
+        row = player.to_row()
+        assert KnownMap.deserialize(row.known_map).is_known(2, 3)
+        assert PlayerState.from_row(row).see(10, 10, 0).is_known(2, 3)
+
+    def test_manager_updates_known_maps(self):
+        """
+        Given registered players
+        When the range of the arbiter changes, players' known maps are updated
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"gridColumns": 20, "gridRows": 20, "range": [2, 0]})
+        fake_agent.players = ["p1", "p2"]
+        arena_manager._on_update(None, "event", "p1, p2")
+        arena_manager.update_known_maps({"p1": {"x": 4, "y": 5}, "p2": {"life": 100},
+                                         "ghost": {"x": 1, "y": 1}})
+        p1, p2 = arena_manager.registered_players
+        assert (p1.x, p1.y) == (4, 5)
+        assert p1.vision.is_known(6, 5)
+        assert KnownMap.deserialize(p1.known_map).count() == p1.vision.count()
+        assert p2.vision is None
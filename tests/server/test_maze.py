@@ -0,0 +1,123 @@
+"""
+Tests the maze generator from src.server.maze
+"""
+import unittest
+
+import numpy as np
+
+from src.server.maze import Maze, MazeGenerationError, MazeParams, Tile, generate_maze
+from src.server.maze.generator import _bfs_steps
+from tests.server.test_manager import new_2players_arena
+
+
+class TestMazeGenerator(unittest.TestCase):
+    """
+    Ensure that generated mazes are playable, reproducible and cached
+    """
+
+    def test_maze_is_solvable(self):
+        """
+        Given a generated maze
+        The battery must be reachable from every spawn cell
+        """
+        maze = generate_maze(42)
+        assert maze.tile(*maze.battery) == Tile.BATTERY
+        assert len(maze.spawns) > 0
+        steps = _bfs_steps(maze.grid, [maze.battery])
+        for x, y in maze.spawns:
+            assert steps[y, x] >= 0
+
+    def test_maze_has_hazards(self):
+        """
+        Given a generated maze with slow cells and traps
+        The maze contains exactly one battery, some slow cells and traps
+        """
+        maze = generate_maze(7, columns=60, rows=60, slow_density=0.1, trap_density=0.05)
+        grid = maze.grid
+        assert grid.shape == (60, 60)
+        assert int((grid == Tile.BATTERY).sum()) == 1
+        assert int((grid == Tile.SLOW).sum()) > 0
+        assert int((grid == Tile.TRAP).sum()) > 0
+        # borders are walls
+        assert (grid[0, :] == Tile.WALL).all() and (grid[:, 0] == Tile.WALL).all()
+
+    def test_same_seed_same_maze(self):
+        """
+        Given the same seed and parameters
+        The generated maze must be identical, even when not cached
+        """
+        first = generate_maze(1234, columns=31, rows=21)
+        generate_maze.cache_clear()
+        second = generate_maze(1234, columns=31, rows=21)
+        assert first is not second
+        assert first.digest == second.digest
+        assert np.array_equal(first.grid, second.grid)
+        assert first.battery == second.battery
+        assert generate_maze(1235, columns=31, rows=21).digest != first.digest
+
+    def test_maze_is_cached(self):
+        """
+        Given a maze already generated
+        Generating it again returns the cached instance
+        """
+        params = MazeParams(columns=41, rows=41)
+        maze = generate_maze(99, params)
+        assert generate_maze(99, params) is maze
+        assert generate_maze(99, columns=41, rows=41) is maze
+
+    def test_maze_is_read_only(self):
+        """
+        Cached mazes are shared, so they must not be modified
+        """
+        maze = generate_maze(5)
+        with self.assertRaises(ValueError):
+            maze.grid[1, 1] = Tile.WALL
+        assert isinstance(maze.to_list(), list)
+
+    def test_difficulty_range(self):
+        """
+        Given a difficulty range that cannot be satisfied
+        The generation must fail instead of returning a bad maze
+        """
+        maze = generate_maze(3, min_difficulty=0.1, max_difficulty=0.9)
+        assert 0.1 <= maze.difficulty <= 0.9
+        with self.assertRaises(MazeGenerationError):
+            generate_maze(3, min_difficulty=1.0, max_difficulty=1.0, max_attempts=2)
+
+    def test_bad_params(self):
+        """
+        Invalid parameters are refused
+        """
+        with self.assertRaises(ValueError):
+            MazeParams(columns=2)
+        with self.assertRaises(ValueError):
+            MazeParams(columns=6, rows=40)
+        assert generate_maze(1, columns=7, rows=7).grid.shape == (7, 7)
+        with self.assertRaises(ValueError):
+            MazeParams(braid=2.0)
+        with self.assertRaises(ValueError):
+            MazeParams(min_difficulty=0.8, max_difficulty=0.2)
+        with self.assertRaises(ValueError):
+            generate_maze(-1)
+
+    def test_large_maze(self):
+        """
+        A 200x200 maze can be generated, with its battery and spawns
+        """
+        generate_maze.cache_clear()
+        maze = generate_maze(2024, columns=200, rows=200)
+        assert maze.grid.shape == (200, 200)
+        assert maze.grid[maze.battery[1], maze.battery[0]] == Tile.BATTERY and maze.spawns
+
+    def test_manager_new_map(self):
+        """
+        Given a manager
+        When a new map is generated, it is sent to the arena
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"gridColumns": 21, "gridRows": 15, "map": []})
+        maze = arena_manager.new_map(8)
+        assert isinstance(maze, Maze)
+        assert arena_manager.maze is maze
+        assert fake_agent.game["map"] == maze.to_list()
+        assert maze.grid.shape == (15, 21)
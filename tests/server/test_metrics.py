@@ -0,0 +1,121 @@
+"""
+Tests the metrics registry from src.server.metrics
+"""
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from src.server.metrics import Metric, MetricsRegistry, TrafficMetrics
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Ensure that metrics are counted, and exported in the Prometheus text format
+    """
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """
+        Given a counter with labels
+        Each combination of labels is counted apart, and counters never decrease
+        """
+        counter = self.registry.counter("rx_total", "Messages", ("topic",))
+        counter.inc(topic="a")
+        counter.inc(2, topic="a")
+        counter.inc(topic="b")
+        assert counter.value(topic="a") == 3
+        assert counter.value(topic="c") == 0
+        assert self.registry.counter("rx_total", "Messages", ("topic",)) is counter
+        with self.assertRaises(ValueError):
+            counter.inc(-1, topic="a")
+        with self.assertRaises(ValueError):
+            counter.inc(other="a")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("rx_total", "Messages")
+
+    def test_metric_is_abstract(self):
+        """
+        Given a metric without snapshot
+        It cannot be built
+        """
+        class Untyped(Metric):
+            pass
+
+        with self.assertRaises(TypeError):
+            Untyped("untyped", "No values")
+
+    def test_render(self):
+        """
+        Given a counter and a histogram
+        They are rendered with cumulative buckets, as Prometheus expects
+        """
+        self.registry.counter("rx_total", "Messages", ("topic",)).inc(topic='a"b')
+        histogram = self.registry.histogram("decode_seconds", "Decode", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value)
+        assert histogram.count() == 4
+        lines = self.registry.render().splitlines()
+        assert lines == [
+            "# HELP decode_seconds Decode",
+            "# TYPE decode_seconds histogram",
+            'decode_seconds_bucket{le="0.1"} 1',
+            'decode_seconds_bucket{le="1"} 3',
+            'decode_seconds_bucket{le="+Inf"} 4',
+            "decode_seconds_sum 4.05",
+            "decode_seconds_count 4",
+            "# HELP rx_total Messages",
+            "# TYPE rx_total counter",
+            'rx_total{topic="a\\"b"} 1',
+        ]
+
+    def test_traffic(self):
+        """
+        Given traffic reported by a client
+        Messages, bytes and decode times are counted per topic
+        """
+        traffic = TrafficMetrics(self.registry)
+        traffic.onRx("ludx/server/state/a", 100)
+        traffic.onDecoded("ludx/server/state/a", 2000000)
+        traffic.onTx("ludx/server/request/a", 10)
+        traffic.onTx("ludx/server/request/a", 10)
+        assert self.registry.get("arbiter_messages_received_total").value(topic="ludx/server/state/a") == 1
+        assert self.registry.get("arbiter_received_bytes_total").value(topic="ludx/server/state/a") == 100
+        assert self.registry.get("arbiter_decode_seconds").sum(topic="ludx/server/state/a") == 0.002
+        assert self.registry.get("arbiter_published_bytes_total").value(topic="ludx/server/request/a") == 20
+
+    def test_dump(self):
+        """
+        Given a dump to a .prom or a .json file
+        The file contains the metrics in the matching format
+        """
+        self.registry.histogram("update_seconds", "Update", ("state",)).observe(0.01, state="IN_GAME")
+        with tempfile.TemporaryDirectory() as tmp:
+            prom_path = os.path.join(tmp, "metrics.prom")
+            self.registry.dump(prom_path)
+            with open(prom_path, encoding="utf-8") as file:
+                assert 'update_seconds_count{state="IN_GAME"} 1' in file.read()
+            json_path = os.path.join(tmp, "metrics.json")
+            self.registry.dump(json_path)
+            with open(json_path, encoding="utf-8") as file:
+                values = json.load(file)["metrics"]["update_seconds"]["values"]
+            assert values["IN_GAME"]["count"] == 1
+            assert sorted(os.listdir(tmp)) == ["metrics.json", "metrics.prom"]
+
+    def test_serve(self):
+        """
+        Given the registry served on a local port
+        Metrics can be scraped over HTTP
+        """
+        self.registry.counter("rx_total", "Messages").inc()
+        server = self.registry.serve(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.status == 200
+                assert "rx_total 1" in response.read().decode()
+        finally:
+            self.registry.stop()
@@ -0,0 +1,203 @@
+"""
+Tests the monsters hunting players from src.server.monsters and src.server.maze.pathfinding
+"""
+import unittest
+
+from src.server.maze import distance_field, generate_maze
+from src.server.maze.pathfinding import PathFinder
+from src.server.models.player_state import PlayerState
+from src.server.monsters import MonsterController
+from src.server.spatial import SpatialGrid
+from tests.server.test_distance import FRICTION, SMALL_MAP
+from tests.server.test_manager import new_2players_arena
+
+# 0 floor, 1 wall
+CORRIDOR = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 1, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+
+
+def new_controller(grid=CORRIDOR, **params):
+    players = SpatialGrid()
+    controller = MonsterController(PathFinder(grid, FRICTION, 100), players, dt_move=100, **params)
+    return players, controller
+
+
+class TestPathFinder(unittest.TestCase):
+    """
+    Ensure that A* finds the fastest paths, and that the distance field guides it
+    """
+
+    def test_fastest_path(self):
+        """
+        Given the small map with a slow cell next to the battery
+        The path to the battery costs the time of the distance field
+        """
+        field = distance_field(SMALL_MAP, FRICTION, dt_move=100)
+        finder = PathFinder(SMALL_MAP, FRICTION, 100, field)
+        for start in [(1, 3), (5, 3), (1, 1)]:
+            result = finder.search(start, field.battery)
+            assert result.complete
+            assert result.cost == field.time[start[1], start[0]]
+            assert result.path[-1] == field.battery
+        assert finder.search((1, 1), (1, 1)).path == []
+        assert not finder.walkable(2, 2) and not finder.walkable(-1, 0)
+
+    def test_landmark_heuristic(self):
+        """
+        Given a generated maze
+        Paths are as fast with the distance field as without, and expand fewer cells
+        """
+        maze = generate_maze(7)
+        field = distance_field(maze.grid, FRICTION, dt_move=100)
+        guided = PathFinder(maze.grid, FRICTION, 100, field)
+        plain = PathFinder(maze.grid, FRICTION, 100)
+        expanded = [0, 0]
+        for start in maze.spawns[:10]:
+            for goal in [field.battery, maze.spawns[-1]]:
+                with_field, without = guided.search(start, goal), plain.search(start, goal)
+                assert with_field.cost == without.cost
+                expanded[0] += with_field.expanded
+                expanded[1] += without.expanded
+        assert expanded[0] < expanded[1]
+
+    def test_bounded_search(self):
+        """
+        Given a search limited in expanded cells
+        It stops early, and leads towards the goal
+        """
+        finder = PathFinder(CORRIDOR, FRICTION, 100)
+        result = finder.search((0, 0), (7, 0), max_expansions=3)
+        assert not result.complete and result.expanded == 3
+        assert result.path and result.path[0] == (1, 0)
+
+
+class TestMonsterController(unittest.TestCase):
+    """
+    Ensure that monsters chase players with cached paths, within the budget of a tick
+    """
+
+    def test_chase_and_repair(self):
+        """
+        Given a player stepping away along the corridor
+        The monster follows, extending its path instead of searching again
+        """
+        players, controller = new_controller()
+        monster = controller.spawn(0, 0)
+        players.update("p1", 4, 0)
+        controller.update(100)
+        assert monster.position == (1, 0) and controller.searches == 1
+        players.update("p1", 5, 0)
+        controller.update(200)
+        players.update("p1", 4, 0)
+        controller.update(300)
+        assert monster.position == (3, 0)
+        assert controller.searches == 1 and controller.repairs == 2
+        # Teleported behind the wall: search again
+        players.update("p1", 4, 2)
+        controller.update(400)
+        assert controller.searches == 2
+
+    def test_moves_follow_dt_move(self):
+        """
+        Given updates closer than dt_move
+        The monster waits before moving again
+        """
+        players, controller = new_controller()
+        monster = controller.spawn(0, 0)
+        players.update("p1", 7, 0)
+        controller.update(100)
+        controller.update(150)
+        assert monster.position == (1, 0)
+        controller.update(200)
+        assert monster.position == (2, 0)
+
+    def test_budget(self):
+        """
+        Given more monsters than the budget of a tick can plan
+        Searches are spread over the next ticks, every monster ends up chasing
+        """
+        maze = generate_maze(3)
+        field = distance_field(maze.grid, FRICTION, dt_move=100)
+        players = SpatialGrid()
+        controller = MonsterController(PathFinder(maze.grid, FRICTION, 100, field), players,
+                                       dt_move=100, sight=100, budget=500)
+        monsters = [controller.spawn(*maze.battery) for _ in range(10)]
+        players.update("p1", *maze.spawns[0])
+        controller.update(0)
+        assert sum(monster.complete for monster in monsters) < 10
+        assert all(monster.path for monster in monsters[:2])
+        for tick in range(1, 10):
+            controller.update(tick * 100)
+        assert all(monster.complete and monster.path[-1] == maze.spawns[0] for monster in monsters)
+
+    def test_hits(self):
+        """
+        Given a player staying on the monster's cell
+        It is hit once per cooldown, and eliminated at the 3rd hit
+        """
+        players, controller = new_controller(sight=2)
+        controller.spawn(1, 0)
+        players.update("p1", 1, 0)
+        players.update("far", 7, 2)
+        assert controller.update(0) == []
+        assert controller.update(500) == []
+        assert controller.update(1000) == []
+        assert controller.update(2000) == ["p1"]
+        assert controller.hits == {"p1": 3}
+        assert controller.update(3000) == []
+        controller.reset_hits()
+        assert controller.hits == {}
+
+    def test_manager_monsters(self):
+        """
+        Given a manager with a generated map, and a player next to the battery
+        Minova comes out of the battery, and eliminates the player after 3 hits
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"gridColumns": 21, "gridRows": 21, "map": [],
+                                "mapFriction": FRICTION, "dtMove": [300]})
+        assert arena_manager.update_monsters() == []
+        maze = arena_manager.new_map(4)
+        arena_manager.register_player(PlayerState("p3"))
+        arena_manager.update_known_maps({"p3": {"x": maze.battery[0], "y": maze.battery[1]}})
+        controller = arena_manager.spawn_monsters(dt_move=300)
+        assert controller.monsters[0].position == maze.battery
+        eliminated = []
+        for t in range(0, 4000, 500):
+            fake_agent.game["t"] = t
+            eliminated += arena_manager.update_monsters()
+        assert eliminated == ["p3"]
+        assert arena_manager.players_near(*maze.battery, 0)[0].health == 0
+
+    def test_game_monsters(self):
+        """
+        Given a game started with the monsters of rules.json, and a player 4 cells from the battery
+        Minova is spawned on the battery, its moves are sent to the arena, and it eliminates the player
+        """
+        fake_agent, arena_manager = new_2players_arena()
+        fake_agent.game.update({"gridColumns": 7, "gridRows": 3, "map": [[0] * 7, [0] * 6 + [4], [0] * 7]})
+        fake_agent.players = ["p1", "p2"]
+        arena_manager._on_update(None, "event", "p1, p2")
+        arena_manager._on_update(None, "event", None)
+        assert arena_manager.state == "IN_GAME" and arena_manager.monsters is None
+        arena_manager.update_known_maps({"p1": {"x": 2, "y": 1}, "p2": {"x": 0, "y": 0}})
+        arena_manager._on_update(None, "event", None)
+        assert fake_agent.game["monsters"] == [{"name": "Minova1", "x": 6, "y": 1}]
+        start = fake_agent.game["t"] - arena_manager.played_time
+        positions = set()
+        for t in range(0, 4000, 100):
+            fake_agent.game["t"] = start + t
+            arena_manager._on_update(None, "event", None)
+            positions.update((monster["x"], monster["y"]) for monster in fake_agent.game["monsters"])
+        # From the battery to the player
+        assert {(6, 1), (2, 1)} <= positions and len(positions) >= 5
+        assert len(arena_manager.monsters.monsters) == 1
+        assert arena_manager.monsters.hits["p1"] == 3
+        assert [player.health for player in arena_manager.registered_players] == [0, 100]
+        # A new game spawns its own monsters
+        arena_manager.stop()
+        arena_manager.restart()
+        assert arena_manager.monsters is None and fake_agent.game["monsters"] == []
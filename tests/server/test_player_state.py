@@ -0,0 +1,90 @@
+"""
+Tests the players' runtime state from src.server.models.player_state
+"""
+import json
+import sys
+import unittest
+
+from src.server.models.known_map import KnownMap
+from src.server.models.player import Player
+from src.server.models.player_state import PlayerState
+from src.shared.direction import Direction
+from tests.server.test_manager import new_2players_arena
+
+
+class TestPlayerState(unittest.TestCase):
+    """
+    Ensure that the runtime state is compact, and mapped to Player rows only on demand
+    """
+
+    def test_compact(self):
+        """
+        Given a runtime state and a Player row
+        The state has no __dict__, rejects unknown attributes, and is smaller than the row
+        """
+        state = PlayerState("p1")
+        row = Player("p1")
+        assert not hasattr(state, "__dict__")
+        with self.assertRaises(AttributeError):
+            state.helth = 10
+        assert sys.getsizeof(state) < sys.getsizeof(row) + sys.getsizeof(row.__dict__)
+
+    def test_updates(self):
+        """
+        Given a player moving, scoring and picking items
+        Its runtime state is updated in place
+        """
+        state = PlayerState("p1", x=2, y=2)
+        assert state.move(Direction.EAST, 2) == (4, 2)
+        assert state.add_score(1.5) == 1.5
+        assert state.sub_score(0.5) == 1.0
+        assert state.sub_health(30) == 70
+        state.add_item({"item": "key"})
+        assert state.serialize["inventory"] == [{"item": "key"}]
+
+    def test_to_row(self):
+        """
+        Given a runtime state
+        The row is written with the inventory and the map serialized in their columns
+        """
+        state = PlayerState("p1", x=3, y=4, score=12.5, player_id=7)
+        state.add_item({"item": "key"})
+        state.see(10, 10, 1)
+        row = state.to_row()
+        assert (row.id, row.name, row.x, row.y, row.score) == (7, "p1", 3, 4, 12.5)
+        assert json.loads(row.inventory) == [{"item": "key"}]
+        assert KnownMap.deserialize(row.known_map).is_known(3, 5)
+        existing = Player("p1")
+        assert state.to_row(existing) is existing
+
+    def test_from_row(self):
+        """
+        Given a row loaded with serialized columns
+        The runtime state restores the inventory, and the map when the player sees again
+        """
+        known = KnownMap(10, 10)
+        known.reveal(1, 1)
+        row = Player("p1")
+        row.x, row.y, row.health = 8, 8, 40
+        row.inventory = json.dumps([{"item": "key"}])
+        row.known_map = known.serialize()
+        state = PlayerState.from_row(row)
+        assert (state.name, state.x, state.y, state.health) == ("p1", 8, 8, 40)
+        assert state.inventory == [{"item": "key"}]
+        assert state.vision is None and state.known_map == row.known_map
+        state.see(10, 10, 0)
+        assert state.vision.is_known(1, 1) and state.vision.is_known(8, 8)
+        assert PlayerState.from_row(state.to_row()).known_map == state.known_map
+
+    def test_manager_registers_states(self):
+        """
+        Given a Player row registered to the manager
+        It is kept as a runtime state, and rows are built only when asked
+        """
+        _, arena_manager = new_2players_arena()
+        registered = arena_manager.register_player(Player("p1"))
+        assert isinstance(registered, PlayerState)
+        assert arena_manager.register_player(PlayerState("p1")) is registered
+        rows = arena_manager.player_rows()
+        assert [type(row) for row in rows] == [Player]
+        assert rows[0].name == "p1"
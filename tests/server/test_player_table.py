@@ -0,0 +1,120 @@
+"""
+Tests the structure of arrays of players from src.server.models.player_table
+"""
+import unittest
+
+import numpy as np
+
+from src.server.maze.tiles import Tile
+from src.server.models.player_state import PlayerState
+from src.server.models.player_table import PlayerTable
+from src.shared.direction import Direction
+
+
+def new_table():
+    table = PlayerTable(capacity=2)
+    table.add("p1", 1, 1, Direction.EAST)
+    table.add("p2", 3, 1, Direction.NORTH)
+    table.add("p3", 0, 0, Direction.WEST, health=5)
+    return table
+
+
+class TestPlayerTable(unittest.TestCase):
+    """
+    Ensure that rules are applied to every player at once, as the per player code would
+    """
+
+    def test_rows(self):
+        """
+        Given players added beyond the capacity, then removed
+        Rows grow, and the last row takes the place of a removed one
+        """
+        table = new_table()
+        assert len(table) == 3
+        table.remove("p1")
+        assert table.names == ["p3", "p2"]
+        assert table.index_of("p3") == 0
+        assert table.view("health").tolist() == [5, 100]
+        with self.assertRaises(ValueError):
+            table.add("p2")
+        with self.assertRaises(KeyError):
+            table.index_of("p1")
+
+    def test_move(self):
+        """
+        Given players moving in a grid with a wall
+        Everyone moves at once like Player.move, except into walls and out of the grid
+        """
+        table = new_table()
+        table.move()
+        assert list(zip(table.view("x"), table.view("y"))) == [(2, 1), (3, 2), (-1, 0)]
+        table = new_table()
+        grid = np.zeros((4, 4), dtype=np.uint8)
+        grid[2, 3] = Tile.WALL
+        collided = table.move(grid=grid)
+        assert collided.tolist() == [False, True, True]
+        assert list(zip(table.view("x"), table.view("y"))) == [(2, 1), (3, 1), (0, 0)]
+        state = PlayerState("p1", x=1, y=1)
+        state.move(Direction.EAST)
+        assert (state.x, state.y) == (2, 1)
+
+    def test_damage_and_score(self):
+        """
+        Given damages on some players
+        Health never goes below 0, and the deaths of this damage are reported
+        """
+        table = new_table()
+        died = table.damage([0, 2], 10)
+        assert died.tolist() == [False, True]
+        assert table.view("health").tolist() == [90, 100, 0]
+        assert table.damage(2, 10) == False
+        table.add_score(table.alive(), 2.5)
+        assert table.view("score").tolist() == [2.5, 2.5, 0.0]
+
+    def test_apply_tick(self):
+        """
+        Given players moving on floor, slow cells, or into walls
+        Scores follow the rules: streak bonus after 3s, incident and collision penalties
+        """
+        table = new_table()
+        grid = np.zeros((4, 4), dtype=np.uint8)
+        grid[1, 3] = Tile.SLOW
+        moved = np.array([True, True, False])
+        collided = np.array([False, False, True])
+        for _ in range(4):
+            gained = table.apply_tick(1.0, moved, collided, grid)
+        # p1 moved 4s without incident: bonus for the 4th second only
+        assert gained[0] == 0.1
+        # p2 moved on a slow cell each second: 0.2 per move and 0.1 per second
+        assert np.isclose(table.score[1], -4 * 0.3)
+        assert table.incident_time[1] == 4.0
+        # p3 hit a wall each second
+        assert table.score[2] == -4 * 0.5
+
+    def test_snapshot_restore(self):
+        """
+        Given a snapshot before a tick
+        Restoring it rolls back every column, and the players
+        """
+        table = new_table()
+        snapshot = table.snapshot()
+        table.move()
+        table.damage(None, 50)
+        table.remove("p2")
+        table.restore(snapshot)
+        assert table.names == ["p1", "p2", "p3"]
+        assert table.view("x").tolist() == [1, 3, 0]
+        assert table.view("health").tolist() == [100, 100, 5]
+
+    def test_states(self):
+        """
+        Given runtime states
+        The table is built from them, and written back after a batch update
+        """
+        states = [PlayerState("p1", x=1, y=1, direction=Direction.EAST), PlayerState("p2", health=20)]
+        table = PlayerTable.from_states(states)
+        table.move()
+        table.damage(None, 20)
+        table.write_back(states)
+        assert (states[0].x, states[0].health) == (2, 80)
+        assert (states[1].y, states[1].health) == (1, 0)
@@ -0,0 +1,101 @@
+"""
+Tests the profiling of the state handlers from src.server.state_machine.profiler
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pytest
+
+from src.server.arena_manager import ArenaManager
+from src.server.state_machine import StateMachine, StateMachineConfig, StateProfiler
+
+
+def slow_handler():
+    time.sleep(0.05)
+
+
+class TestStateProfiler(unittest.TestCase):
+    """
+    Ensure that handlers are recorded in a bounded ring buffer, and dumped as folded stacks
+    """
+
+    def test_ring_buffer(self):
+        """
+        Given more calls than the capacity
+        Every call is counted, but only the latest ones are kept
+        """
+        profiler = StateProfiler(capacity=3)
+        for _ in range(5):
+            profiler.profile("IN_GAME", lambda: None)
+        assert profiler.calls["IN_GAME"] == 5
+        assert len(profiler.handles) == 3
+        assert profiler.stats()["IN_GAME"]["calls"] == 5
+
+    def test_record_every(self):
+        """
+        Given a profiler recording 1 call out of 4
+        Every call is counted, and only the sampled ones are timed
+        """
+        profiler = StateProfiler(record_every=4)
+        for _ in range(8):
+            profiler.profile("IN_GAME", lambda: None)
+        assert profiler.calls["IN_GAME"] == 8
+        assert len(profiler.handles) == 2
+
+    def test_errors(self):
+        """
+        Given a failing handler
+        The exception is raised as before, and recorded
+        """
+        profiler = StateProfiler()
+
+        def fail():
+            raise KeyError("pause")
+
+        with pytest.raises(KeyError):
+            profiler.profile("IN_GAME", fail)
+        assert profiler.errors["IN_GAME"] == 1
+        assert profiler.handles[-1].error == "KeyError"
+        assert profiler.folded()[0].startswith("IN_GAME;handle [KeyError] ")
+
+    def test_stack_samples(self):
+        """
+        Given a sampled slow handler
+        The folded stacks show where the handler spent its time
+        """
+        profiler = StateProfiler(sample_interval_ms=1).start()
+        try:
+            profiler.profile("IN_GAME", slow_handler)
+        finally:
+            profiler.stop()
+        assert profiler.slowest(1)[0].duration_ns >= 50 * 1000000
+        stacks = profiler.folded()
+        assert any(line.startswith("IN_GAME;slow_handler ") for line in stacks), stacks
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "states.folded")
+            profiler.dump_folded(path)
+            with open(path, encoding="utf-8") as file:
+                assert file.read().splitlines() == stacks
+
+    def test_state_machine(self):
+        """
+        Given a profiled state machine switching state while handled
+        The handler and the transition are recorded, with the state which caused it
+        """
+        manager = mock.Mock(ArenaManager)
+        manager._robot = mock.Mock()
+        manager._robot.players = []
+        sm = StateMachine(manager).define_states(StateMachineConfig())
+        profiler = StateProfiler()
+        sm.set_profiler(profiler)
+        assert sm.profiler is profiler
+        with pytest.raises(TypeError):
+            sm.set_profiler("profiler")
+        sm.handle()
+        assert profiler.calls["WAIT_PLAYERS_CONNEXION"] == 1
+        transition = profiler.transitions[-1]
+        assert (transition.from_state, transition.to_state) == ("WAIT_PLAYERS_CONNEXION", sm.state)
+        assert transition.cause.startswith("WaitPlayersConnexion")
@@ -0,0 +1,117 @@
+"""
+Tests the hot reload of the arbiter configuration from src.server.reloader
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.server.arena_manager import ArenaManager
+from src.server.reloader import STATE_MACHINE_CONFIG_PATH, ConfigReloader, FileWatcher
+from src.server.rules import RULES_PATH, load_rules
+from src.server.state_machine import StateMachine, StateMachineConfig
+from src.server.state_machine.states import StateEnum
+from tests.server.test_manager import new_2players_arena
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReloader(unittest.TestCase):
+    """
+    Ensure that configuration changes are validated and applied, without restarting the arbiter
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rules_path = os.path.join(self.directory.name, "rules.json")
+        self.config_path = os.path.join(self.directory.name, "state_machine_config.json")
+        shutil.copy(RULES_PATH, self.rules_path)
+        shutil.copy(STATE_MACHINE_CONFIG_PATH, self.config_path)
+        self.mtime = 1_000_000_000
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w", encoding="utf-8") as config_file:
+            config_file.write(content if isinstance(content, str) else json.dumps(content))
+        # Distinct mtimes, whatever the resolution of the file system
+        self.mtime += 1
+        os.utime(path, ns=(self.mtime * 10 ** 9, self.mtime * 10 ** 9))
+
+    def test_file_watcher(self):
+        """
+        Given a watched file changed, then removed
+        Changes are seen once, no sooner than the interval, and a removed file is not a change
+        """
+        clock = FakeClock()
+        watcher = FileWatcher(self.rules_path, interval=1.0, clock=clock)
+        assert not watcher.changed()
+        self.write(self.rules_path, {"timeLimit": 1})
+        assert not watcher.changed()
+        clock.now = 1.0
+        assert watcher.changed()
+        assert not watcher.changed(force=True)
+        os.remove(self.rules_path)
+        assert not watcher.changed(force=True)
+
+    def test_reload_rules(self):
+        """
+        Given a manager watching its rules, and a rules file changed, then broken
+        Only the rules changed in the file are sent, rules set by the arbiter are kept,
+         and a broken file is ignored
+        """
+        fake_agent, manager = new_2players_arena()
+        reloader = manager.enable_hot_reload(0, rules_path=self.rules_path)
+        sent = []
+        fake_agent.ruleArena = lambda k, v: (sent.append(k), fake_agent.game.update({k: v}))
+        fake_agent.game["info"] = "set by the arbiter"
+        rules = load_rules(self.rules_path)
+        rules["dtMove"] = [200, 10, 300, 300]
+        self.write(self.rules_path, rules)
+        assert reloader.poll()
+        assert sent == ["dtMove"] and fake_agent.game["dtMove"][0] == 200
+        assert fake_agent.game["info"] == "set by the arbiter"
+        self.write(self.rules_path, '{"dtMove": [')
+        sent.clear()
+        assert not reloader.poll() and sent == []
+        assert len(reloader.errors) == 1
+        rules["dtMove"] = [100, 10]
+        self.write(self.rules_path, rules)
+        assert not reloader.poll() and "dtMove has 2 values" in reloader.errors[-1]
+        # Applied at the next update of the manager
+        rules["dtMove"], rules["timeLimit"] = [250, 10, 300, 300], 9000
+        self.write(self.rules_path, rules)
+        manager._on_update(fake_agent, "arenaChanged", {})
+        assert fake_agent.game["dtMove"][0] == 250 and fake_agent.game["timeLimit"] == 9000
+        assert reloader.rules["timeLimit"] == 9000
+
+    def test_reload_state_machine(self):
+        """
+        Given a running state machine whose configuration removes a link, then removes its state
+        The link is no longer allowed, and a configuration without the actual state is ignored
+        """
+        manager = mock.Mock(ArenaManager)
+        machine = StateMachine(manager).define_states(StateMachineConfig())
+        machine.handle = mock.Mock()
+        reloader = ConfigReloader(mock.Mock(), machine, self.rules_path, self.config_path, interval=0)
+        with open(self.config_path, "r", encoding="utf-8") as config_file:
+            config = json.load(config_file)
+        config["links"].remove(["WAIT_PLAYERS_CONNEXION", "WAIT_GAME_START"])
+        self.write(self.config_path, config)
+        assert reloader.poll()
+        assert machine.state == "WAIT_PLAYERS_CONNEXION"
+        with self.assertRaises(ValueError):
+            machine.set_actual_state(StateEnum.WAIT_GAME_START)
+        config["states"].remove("WAIT_PLAYERS_CONNEXION")
+        self.write(self.config_path, config)
+        assert not reloader.poll() and "WAIT_PLAYERS_CONNEXION" in reloader.errors[-1]
+        machine.set_actual_state(StateEnum.WAIT_PLAYERS_CONNEXION)
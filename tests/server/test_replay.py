@@ -0,0 +1,53 @@
+"""
+Tests the offline replay of recorded sessions from src.server.replay
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.api.j2l.pyrobotx.session import SessionRecorder
+from src.server.replay import replay_session
+
+
+class TestReplay(unittest.TestCase):
+    """
+    Ensure that a recorded session drives a SyncAgent and its ArenaManager without a server
+    """
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "session.ovarec")
+        with SessionRecorder(self.path, {"arena": "arena", "clientId": "arbitre", "robotId": "_"}) as recorder:
+            for t in range(3):
+                state = {"t": t * 100, "pause": True, "maxPlayers": 2, "players": [], "robots": []}
+                recorder.record("ludx/server/state/arena", json.dumps(state).encode())
+            recorder.record("ludx/server/state/other", json.dumps({"t": 999}).encode())
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replay_into_manager(self):
+        """
+        Given a session with arena states
+        The manager is built from the first state, handles the next ones, and what it sends is published
+        """
+        # The states wait for players with real sleeps, not relevant offline
+        with mock.patch("time.sleep"):
+            report = replay_session(self.path)
+        assert report.messages == 4
+        assert report.manager is not None
+        assert report.agent.game["t"] == 200
+        assert len(report.published) > 0
+        assert {topic for topic, payload in report.published} == {"ludx/clients/request/arena/arbitre"}
+
+    def test_replay_agent_only(self):
+        """
+        Given a replay without manager
+        Only the agent is fed
+        """
+        with mock.patch("time.sleep"):
+            report = replay_session(self.path, with_manager=False)
+        assert report.manager is None
+        assert report.agent.game["t"] == 200
@@ -0,0 +1,101 @@
+"""
+Tests the loading, validation and diff of the arena rules from src.server.rules
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from src.server.arena_manager import ArenaManager
+from src.server.rules import RulesError, diff_rules, load_rules, validate_rules
+from tests.server.test_manager import new_test_agent
+
+
+class TestRules(unittest.TestCase):
+    """
+    Ensure that invalid rules are refused at load, and that only changed rules are sent
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "rules.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, rules):
+        with open(self.path, "w", encoding="utf-8") as rules_file:
+            json.dump(rules, rules_file)
+
+    def test_default_rules(self):
+        """
+        Given the rules.json of the arbiter
+        They are valid, and each load returns a copy
+        """
+        rules = load_rules()
+        assert rules["timeLimit"] == 6000 and len(rules["map"]) == rules["gridRows"]
+        first = rules["map"][0][0]
+        rules["map"][0][0] = first + 1
+        assert load_rules()["map"][0][0] == first
+
+    def test_invalid_rules(self):
+        """
+        Given rules with wrong types, missing values per profile, and a map with unknown tiles
+        Every issue is reported at once, before anything is sent
+        """
+        rules = load_rules()
+        rules["dtMove"] = [300, 10]
+        rules["pause"] = "no"
+        rules["dxMax"][0] = True
+        rules["weapon"][0] = 7
+        rules["map"][0][0] = 9
+        with self.assertRaises(RulesError) as error:
+            validate_rules(rules)
+        issues = error.exception.issues
+        assert len(issues) == 5, issues
+        assert any("dtMove has 2 values for 4 profiles" in issue for issue in issues)
+        assert isinstance(error.exception, ValueError)
+        # Rules unknown to the schema are left to the arena
+        assert validate_rules({"newRule": "x", "range": [1]}) == {"newRule": "x", "range": [1]}
+
+    def test_cache(self):
+        """
+        Given a rules file loaded twice, then changed
+        It is parsed once per content, and a broken file raises a RulesError
+        """
+        self.write({"timeLimit": 1000, "pause": False})
+        assert load_rules(self.path) == load_rules(self.path) == {"timeLimit": 1000, "pause": False}
+        self.write({"timeLimit": 2000, "pause": False})
+        assert load_rules(self.path)["timeLimit"] == 2000
+        with open(self.path, "w", encoding="utf-8") as rules_file:
+            rules_file.write('{"timeLimit": ')
+        with self.assertRaises(RulesError):
+            load_rules(self.path)
+
+    def test_diff(self):
+        """
+        Given rules and the current state of the arena
+        Only the rules that are missing or different are kept
+        """
+        current = {"pause": True, "range": [10, 0], "t": 12}
+        rules = {"pause": True, "range": [10, 1], "info": "hi"}
+        assert diff_rules(rules, current) == {"range": [10, 1], "info": "hi"}
+        assert diff_rules(current, current) == {}
+
+    def test_manager_sends_changed_rules(self):
+        """
+        Given an arena already holding most of the rules, and echoing its state back
+        The manager only sends the rules that differ, and does not echo the state back
+        """
+        fake_agent = new_test_agent()
+        fake_agent.game.update(load_rules())
+        fake_agent.game["info"] = "other"
+        sent = []
+        fake_agent.ruleArena = Mock(side_effect=lambda k, v: (sent.append(k), fake_agent.game.update({k: v})))
+        manager = ArenaManager(fake_agent)
+        assert "map" not in sent and "dtMove" not in sent and "info" in sent
+        sent.clear()
+        manager._on_update(fake_agent, "arenaChanged", dict(fake_agent.game))
+        # Only what the current state itself sets (pause, info messages)
+        assert set(sent) <= {"pause", "info"}
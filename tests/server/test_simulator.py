@@ -0,0 +1,164 @@
+"""
+Tests the headless arena simulator from src.server.simulator
+"""
+import time
+import unittest
+
+from src.api.j2l.pytactx.agent import Agent
+from src.server.maze import Tile
+from src.server.simulator import SimulatedArena, default_rules
+
+FRICTION = [1, 0, 0.5, 0.1, 1, 0]
+
+# 0 floor, 1 wall, 2 slow, 4 battery
+SMALL_MAP = [
+    [0, 0, 0, 0, 4],
+    [0, 1, 1, 2, 0],
+    [0, 0, 0, 0, 0],
+]
+
+
+def new_arena(**kwargs):
+    rules = {"map": SMALL_MAP, "mapFriction": FRICTION, "dtMove": [300, 10], "range": [2, 0],
+             "hitCollision": [10, 0], "lifeIni": [100, 0], "canRuleArena": [False, True],
+             "canRulePlayer": [False, True], "invisible": [False, True], "collision": [True, False]}
+    return SimulatedArena(rules, seed=1, **kwargs)
+
+
+def new_agent(arena, name):
+    return Agent(name, robot=arena.robot(name), waitArenaConnection=False, welcomePrint=False,
+                 verbosity=0, sourcesdir=None)
+
+
+class TestSimulatedArena(unittest.TestCase):
+    """
+    Ensure that the simulator follows the arena rules, deterministically and faster than real time
+    """
+
+    def test_moves_and_friction(self):
+        """
+        Given a player walking through a slow cell towards the battery
+        Moves take dtMove / friction, and the battery gives its points once
+        """
+        arena = new_arena()
+        arena.join("p1")
+        arena.rule_player("p1", "x", 3)
+        arena.rule_player("p1", "y", 2)
+        arena.request("p1", "x", 4)
+        arena.request("p1", "y", 0)
+        arena.run(300)
+        assert arena.player_state("p1")["x"] == 4
+        # (4, 1) is floor, then 300ms more to the battery
+        arena.run(300)
+        state = arena.player_state("p1")
+        assert (state["x"], state["y"], state["nMove"]) == (4, 0, 3)
+        assert state["score"] >= 30
+        arena.request("p1", "x", 3)
+        arena.request("p1", "y", 0)
+        arena.run(1000)
+        assert arena.scores()["p1"] < 31
+
+    def test_streak_between_moves(self):
+        """
+        Given a player walking for several seconds on floor, with steps shorter than its moves
+        The streak is not broken between two moves, and its bonus is paid after 3s
+        """
+        rules = {"map": [[0] * 20 + [4]], "mapFriction": FRICTION, "dtMove": [300], "lifeIni": [100]}
+        arena = SimulatedArena(rules, seed=1, dt_step=50)
+        arena.join("p1")
+        arena.rule_player("p1", "x", 0)
+        arena.rule_player("p1", "y", 0)
+        arena.request("p1", "x", 19)
+        arena.request("p1", "y", 0)
+        arena.run(6000)
+        state = arena.player_state("p1")
+        assert state["x"] == 19
+        # 19 moves of 300ms, the bonus is paid for the 2.7s after the first 3s
+        assert 0.2 < state["score"] < 0.3
+        # Once stopped, the streak is broken
+        arena.run(1000)
+        assert arena.table.streak_time[0] == 0.0
+
+    def test_collisions(self):
+        """
+        Given a player moving into a wall, then into another player
+        Both moves are refused, cost life and points, and are counted
+        """
+        arena = new_arena()
+        arena.join("p1")
+        arena.join("p2")
+        arena.rule_player("p1", "x", 1)
+        arena.rule_player("p1", "y", 0)
+        arena.rule_player("p2", "x", 2)
+        arena.rule_player("p2", "y", 0)
+        arena.request("p1", "dx", 0)
+        arena.request("p1", "dy", 1)
+        arena.run(300)
+        arena.request("p1", "dx", 5)
+        arena.request("p1", "dy", 0)
+        arena.run(300)
+        state = arena.player_state("p1")
+        assert (state["x"], state["y"]) == (1, 0)
+        assert state["nCollision"] == 2 and state["life"] == 80
+        assert state["score"] == -1.0
+        assert state["range"]["p2"]["x"] == 2
+
+    def test_pause_and_rules(self):
+        """
+        Given an arbiter pausing the arena
+        Players do not move until it resumes, and are reset on demand
+        """
+        arena = new_arena()
+        arena.join("arbitre", profile=1)
+        arena.join("p1")
+        arena.request("arbitre", "ruleArena", {"pause": True})
+        arena.request("p1", "ruleArena", {"pause": False})
+        arena.request("p1", "x", 4)
+        arena.request("p1", "y", 2)
+        arena.run(1000)
+        assert arena.game["pause"] and arena.t == 1000
+        assert arena.player_state("p1")["nMove"] == 0
+        assert "arbitre" not in arena.player_state("p1")["range"]
+        arena.rule_arena("pause", False)
+        arena.run(300)
+        assert arena.player_state("p1")["nMove"] == 1
+        arena.request("arbitre", "rulePlayer", {"p1": {"reset": True}})
+        state = arena.player_state("p1")
+        assert state["nMove"] == 0 and state["score"] == 0 and state["life"] == 100
+
+    def test_seeded(self):
+        """
+        Given two arenas with the same seed and no map
+        They generate the same maze and spawn players on the same cells
+        """
+        rules = default_rules()
+        rules["map"] = []
+        first, second = SimulatedArena(rules, seed=5), SimulatedArena(rules, seed=5)
+        assert first.game["map"] == second.game["map"]
+        assert first.join("p1") == second.join("p1")
+        assert SimulatedArena(rules, seed=6).game["map"] != first.game["map"]
+        assert SimulatedArena(seed=5).game["map"] == default_rules()["map"]
+        assert Tile(first.grid[first.battery[1], first.battery[0]]) == Tile.BATTERY
+
+    def test_agents(self):
+        """
+        Given two Agents playing in the simulator
+        They are updated in lockstep, see their moves, and a match runs faster than real time
+        """
+        arena = new_arena(dt_step=100)
+        p1, p2 = new_agent(arena, "p1"), new_agent(arena, "p2")
+        seen = []
+        p1.addEventListener("x", lambda agent, name, before, after: seen.append(after))
+        start = time.perf_counter()
+        for _ in range(2000):
+            for agent in (p1, p2):
+                agent.moveTowards(4, 2) if agent is p1 else agent.moveTowards(0, 0)
+                agent.update()
+        elapsed = time.perf_counter() - start
+        assert arena.t == 200000
+        # p2 updates last, and gets the state of the step it completed
+        assert p1.isConnectedToArena() and p2.game["t"] == arena.t
+        assert (p1.x, p1.y) == (4, 2) and (p2.x, p2.y) == (0, 0)
+        assert seen and seen[-1] == 4
+        # 200s of game in much less than a second per second
+        assert elapsed < 20
@@ -0,0 +1,91 @@
+"""
+Tests the spatial index of the arena from src.server.spatial
+"""
+import math
+import random
+import unittest
+
+from src.server.models.player_state import PlayerState
+from src.server.spatial import SpatialGrid
+from tests.server.test_manager import new_2players_arena
+
+
+def brute_force(positions, x, y, r, exclude=None):
+    return {key for key, (kx, ky) in positions.items()
+            if key != exclude and math.hypot(kx - x, ky - y) <= r}
+
+
+class TestSpatialGrid(unittest.TestCase):
+    """
+    Ensure that proximity queries find the same entities as a scan of all of them
+    """
+
+    def test_within(self):
+        """
+        Given entities around a point
+        Only those within the radius are returned, nearest first
+        """
+        grid = SpatialGrid(cell_size=2)
+        grid.update("near", 1, 1)
+        grid.update("far", 10, 10)
+        grid.update("border", 3, 0)
+        assert grid.within(0, 0, 3) == ["near", "border"]
+        assert grid.within(0, 0, 3, exclude="near") == ["border"]
+        assert grid.within(0, 0, 0.5) == []
+        assert grid.nearest(9, 9) == "far"
+        assert grid.nearest(9, 9, max_r=1) is None
+        with self.assertRaises(ValueError):
+            SpatialGrid(cell_size=0)
+
+    def test_incremental_updates(self):
+        """
+        Given entities moving across buckets, and removed
+        Queries follow the last known positions
+        """
+        grid = SpatialGrid(cell_size=4)
+        grid.update("p1", 0, 0)
+        grid.update("p1", 1, 0)
+        grid.update("p1", 20, 20)
+        assert grid.within(0, 0, 5) == []
+        assert grid.within(20, 20, 1) == ["p1"]
+        assert grid.position("p1") == (20, 20)
+        assert grid.remove("p1") and not grid.remove("p1")
+        assert len(grid) == 0 and "p1" not in grid
+        assert grid.nearest(0, 0) is None
+
+    def test_many_entities(self):
+        """
+        Given 200 entities moving randomly on a 40x40 grid
+        Radius queries and colliding pairs match a brute force scan after every move
+        """
+        rnd = random.Random(42)
+        grid = SpatialGrid()
+        positions = {}
+        for i in range(200):
+            positions[i] = (rnd.randrange(40), rnd.randrange(40))
+            grid.update(i, *positions[i])
+        for _ in range(5):
+            for i in rnd.sample(range(200), 50):
+                positions[i] = (rnd.randrange(40), rnd.randrange(40))
+                grid.update(i, *positions[i])
+            for _ in range(20):
+                x, y, r = rnd.randrange(40), rnd.randrange(40), rnd.choice([0, 1, 3, 7, 60])
+                assert set(grid.within(x, y, r)) == brute_force(positions, x, y, r)
+        pairs = {frozenset(pair) for pair in grid.pairs_within(1)}
+        expected = {frozenset((a, b)) for a in positions for b in brute_force(positions, *positions[a], 1, a)}
+        assert pairs == expected
+
+    def test_manager_index(self):
+        """
+        Given players registered and seen moving in range of the arbiter
+        The manager finds the players near a point, and forgets unregistered ones
+        """
+        agent, arena_manager = new_2players_arena()
+        arena_manager.register_player(PlayerState("p1"))
+        arena_manager.register_player(PlayerState("p2", x=30, y=30))
+        assert arena_manager.players_near(30, 31, 1)[0].name == "p2"
+        arena_manager.update_known_maps({"p1": {"x": 1, "y": 1}, "p2": {"x": 2, "y": 1}})
+        assert [player.name for player in arena_manager.players_near(1, 1, 2)] == ["p1", "p2"]
+        assert [player.name for player in arena_manager.players_near(1, 1, 2, exclude="p1")] == ["p2"]
+        arena_manager.unregister_player("p2")
+        assert "p2" not in arena_manager.spatial_index
@@ -0,0 +1,178 @@
+"""
+Tests the timer wheel from src.server.timers, and the game timers of the manager
+"""
+import math
+import random
+import unittest
+from unittest import mock
+
+from src.server.arena_manager import ArenaManager
+from src.server.models.player_state import PlayerState
+from src.server.state_machine.states import InGame
+from src.server.timers import TimerWheel
+from tests.server.test_manager import new_2players_arena
+
+
+class TestTimerWheel(unittest.TestCase):
+    """
+    Ensure that timers fire once their deadline is reached, in order, whatever their distance
+    """
+
+    def test_deadlines(self):
+        """
+        Given timers within the same tick, and timers far away in the upper levels
+        Each fires at the first advance reaching its deadline, with its deadline, in order
+        """
+        wheel = TimerWheel(tick=10)
+        fired = []
+        for deadline in (35, 31, 30, 5000, 10 ** 6, 10 ** 9):
+            wheel.schedule(deadline, fired.append)
+        wheel.advance(30)
+        assert fired == [30]
+        wheel.advance(34)
+        assert fired == [30, 31]
+        wheel.advance(999_999)
+        assert fired == [30, 31, 35, 5000]
+        assert wheel.advance(10 ** 9) == 2
+        assert fired[-2:] == [10 ** 6, 10 ** 9] and len(wheel) == 0
+        # Time does not go backwards, and a past deadline fires at the next advance
+        assert wheel.advance(10) == 0
+        wheel.schedule(5, fired.append)
+        wheel.advance(10 ** 9)
+        assert fired[-1] == 5
+
+    def test_periodic_and_cancel(self):
+        """
+        Given a periodic timer advanced past several periods at once, and cancelled timers
+        The periodic timer fires once per period, and cancelled timers never fire
+        """
+        wheel = TimerWheel(tick=10)
+        periodic, once = [], []
+        every = wheel.schedule_every(1000, periodic.append)
+        fast = wheel.schedule_every(3, once.append, start=5)
+        cancelled = wheel.schedule(2000, once.append)
+        wheel.cancel(cancelled)
+        wheel.advance(20)
+        wheel.cancel(fast)
+        assert once == [5, 8, 11, 14, 17, 20]
+        wheel.advance(3500)
+        assert periodic == [1000, 2000, 3000]
+        assert every.active and not cancelled.active and len(wheel) == 1
+        wheel.cancel(every)
+        wheel.advance(10000)
+        assert periodic == [1000, 2000, 3000] and len(wheel) == 0
+        wheel.schedule_every(500, periodic.append)
+        wheel.advance(10500)
+        assert periodic[-1] == 10500
+
+    def test_random_deadlines(self):
+        """
+        Given random deadlines, some cancelled, and random advances
+        Exactly the due timers have fired, in deadline order
+        """
+        rng = random.Random(4)
+        for _ in range(20):
+            wheel = TimerWheel(tick=10)
+            fired = []
+            timers = [(wheel.schedule(deadline, lambda d, i=i: fired.append((d, i))), deadline, i)
+                      for i, deadline in enumerate(rng.randint(0, 10 ** rng.randint(2, 9)) for _ in range(100))]
+            for timer, _, _ in timers[::5]:
+                wheel.cancel(timer)
+            cancelled = {i for _, _, i in timers[::5]}
+            now = 0
+            while len(wheel):
+                now += rng.choice((1, 40, 5000, 10 ** 6, 10 ** 8))
+                wheel.advance(now)
+                due = sorted((deadline, i) for _, deadline, i in timers if deadline <= now and i not in cancelled)
+                assert fired == due
+
+
+class TestGameTimers(unittest.TestCase):
+    """
+    Ensure that the manager ends the game at its time limit, scores incidents and streaks every second,
+     and that minutes are announced on time
+    """
+
+    def test_time_limit(self):
+        """
+        Given a game of 6000ms with its players connected
+        It runs until its time limit, and not after, whatever the updates
+        """
+        fake_agent, manager = new_2players_arena()
+        fake_agent.players = ["p1", "p2"]
+        manager._on_update(None, "event", "p1, p2")
+        assert manager.game_loop_running is True
+        start = fake_agent.game["t"] - manager.played_time
+        fake_agent.game["t"] = start + 6000
+        assert manager.game_loop_running is True
+        fake_agent.game["t"] = start + 6037
+        assert manager.game_loop_running is False
+        # A new time limit is counted from the start of the game
+        manager.apply_rules({"timeLimit": 9000})
+        assert manager.game_loop_running is True
+        manager.restart()
+        # The match end and the scoring ticks
+        assert manager.played_time == 0 and len(manager.timers) == 2
+
+    def test_incidents_and_streaks(self):
+        """
+        Given a player seen every 100ms, crossing a slow cell, then walking a move every 300ms, then stopping
+        Moving onto the slow cell costs 0.2 point and each second on it 0.1,
+         each second of walk after 3s without incident earns 0.1, and stopping ends the streak
+        """
+        fake_agent, manager = new_2players_arena()
+        fake_agent.game["map"] = [[0, 0, 2, 0, 0, 0, 0, 0, 0, 0]]
+        player = manager.register_player(PlayerState("p1"))
+        start = fake_agent.game["t"] - manager.played_time
+
+        def position(t):
+            if t < 1900:
+                return min(t // 300, 2)
+            # Back and forth on the floor until 7000ms, then stopped
+            return 9 - (min(t, 7000) - 1900) // 300 % 2
+
+        scores = {}
+        for t in range(0, 10100, 100):
+            fake_agent.game["t"] = start + t
+            manager.update_known_maps({"p1": {"x": position(t), "y": 0}})
+            scores[t] = player.score
+        # On the slow cell for the ticks of 700ms to 1900ms
+        assert math.isclose(scores[1900], -0.2 - 0.13)
+        # The streak started at 1900ms is rewarded from 4900ms, until 400ms after the last move
+        assert math.isclose(scores[4900], -0.33)
+        assert math.isclose(scores[6000], -0.33 + 0.11)
+        assert math.isclose(scores[7500], -0.33 + 0.26)
+        assert scores[10000] == scores[7600]
+        # Collisions cost 0.5, and unregistered players are not scored anymore
+        fake_agent.game["t"] = start + 11000
+        manager.update_known_maps({"p1": {"x": 9, "y": 0, "nCollision": 1}})
+        fake_agent.game["t"] = start + 11100
+        manager.update_known_maps({"p1": {"x": 9, "y": 0, "nCollision": 1}})
+        assert math.isclose(player.score, -0.07 - 0.5)
+        manager.unregister_player("p1")
+        fake_agent.game["t"] = start + 12000
+        manager.timers.advance(manager.played_time)
+        assert math.isclose(player.score, -0.57)
+        # The match end of 6000ms already fired, the scoring ticks are left
+        assert len(manager.timers) == 1
+
+    def test_announces(self):
+        """
+        Given a game in progress, updated at irregular times
+        Each minute is announced once, even when no update happens on the minute
+        """
+        manager = mock.Mock(ArenaManager)
+        manager.timers = TimerWheel()
+        manager.get_rules = {"pause": False}
+        manager._robot = mock.Mock()
+        manager._robot.game = {"t": 0}
+        manager.all_players_connected = True
+        manager.game_loop_running = True
+        state = InGame(manager)
+        state.set_context(mock.Mock())
+        for now in (0, 59990, 60010, 60300, 130000, 185000):
+            manager._robot.game["t"] = now
+            manager.timers.advance(now)
+            state.handle()
+        announces = [call.args[0] for call in manager.display.call_args_list]
+        assert announces == ["🟢 1 minutes écoulées", "🟢 2 minutes écoulées", "🟢 3 minutes écoulées"]
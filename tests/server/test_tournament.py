@@ -0,0 +1,102 @@
+"""
+Tests the offline tournaments of bots from src.server.tournament
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from src.server.maze import ScoreRules
+from src.server.simulator import default_rules
+from src.server.tournament import Leaderboard, MatchConfig, MatchResult, MatchSpec, Tournament, load_results, \
+    run_match
+
+
+def small_config(**kwargs):
+    rules = default_rules()
+    rules["gridColumns"], rules["gridRows"] = 15, 15
+    kwargs.setdefault("duration_ms", 20000)
+    return MatchConfig(rules, **kwargs)
+
+
+def stuck(rng):
+    """ A bot that never moves """
+    return lambda agent: None
+
+
+class TestTournament(unittest.TestCase):
+    """
+    Ensure that tournaments play every match deterministically, stream their results and resume
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_match(self):
+        """
+        Given the same match played twice, and another trial on the same maze
+        The results are the same, and the explorer finds the battery
+        """
+        config = small_config()
+        first = run_match(MatchSpec("explorer", 4, 0), config)
+        again = run_match(MatchSpec("explorer", 4, 0), config)
+        assert (first.score, first.n_move) == (again.score, again.n_move)
+        assert first.charged and first.score >= ScoreRules().battery_points - 5
+        assert first.config == config.digest() != small_config(duration_ms=None).digest()
+        other = run_match(MatchSpec(__name__ + ":stuck", 4, 1), config)
+        assert other.n_move == 0 and not other.charged
+
+    def test_resume(self):
+        """
+        Given a tournament interrupted after some matches, with a truncated last line
+        Resuming only plays the missing matches, and the leaderboard covers all of them
+        """
+        config = small_config()
+        tournament = Tournament(["explorer", "random_walker"], [1, 2], trials=2, config=config,
+                                results_path=self.path, workers=0)
+        played = []
+        tournament.run(played.append)
+        assert len(played) == 8
+        with open(self.path, "r", encoding="utf-8") as results_file:
+            lines = results_file.readlines()
+        assert [json.loads(line)["bot"] for line in lines] == [result.bot for result in played]
+        with open(self.path, "w", encoding="utf-8") as results_file:
+            results_file.writelines(lines[:5])
+            results_file.write(lines[5][:20])
+        replayed = []
+        leaderboard = tournament.run(replayed.append)
+        assert sorted(result.key for result in replayed) == sorted(result.key for result in played[5:])
+        assert len(list(load_results(self.path, config.digest()))) == 8
+        assert leaderboard["explorer"].matches == leaderboard["random_walker"].matches == 4
+        assert leaderboard.standings[0].bot == "explorer"
+        assert leaderboard["explorer"].charge_rate == 1.0
+        # Another config plays everything again
+        assert len(list(load_results(self.path, small_config(dt_step=50).digest()))) == 0
+
+    def test_process_pool(self):
+        """
+        Given a tournament played by a pool of processes
+        It gives the same results as in a single process
+        """
+        config = small_config()
+        pooled = Tournament(["explorer"], [3], trials=3, config=config, workers=2).run()
+        single = Leaderboard(run_match(spec, config) for spec in
+                             Tournament(["explorer"], [3], trials=3, config=config, workers=0).matches())
+        assert pooled["explorer"].total == single["explorer"].total
+        assert pooled["explorer"].matches == 3
+        assert "explorer" in pooled.render()
+
+    def test_leaderboard(self):
+        """
+        Given results of two bots
+        Bots are ranked by their mean score
+        """
+        results = [MatchResult("a", 0, trial, score, score > 30, 0, 0, 0.0, "") for trial, score in enumerate((10, 40))]
+        results.append(MatchResult("b", 0, 0, 30, True, 0, 0, 0.0, ""))
+        leaderboard = Leaderboard(results)
+        assert [standing.bot for standing in leaderboard.standings] == ["b", "a"]
+        assert leaderboard["a"].best == 40 and leaderboard["a"].charge_rate == 0.5